@@ -0,0 +1,287 @@
+"""Captcha OCR accuracy/latency benchmark.
+
+Runs a labeled captcha corpus through every available OCR backend and batch
+size and writes the results as JSON so runs can be compared across commits.
+
+Corpus layout: a directory of images. Labels come from `labels.csv`
+(`filename,label` per line) when present, otherwise from the file name stem
+(`0X51.png` or `0X51_017.png` -> `0X51`).
+
+Usage:
+  python -m ai_model.benchmark /path/to/corpus --batch-sizes 1,8,32 --output bench.json
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".bmp"}
+
+Predictor = Callable[[list[tuple[Path, bytes]]], list[str]]
+
+
+def load_corpus(corpus_dir: Path) -> list[tuple[Path, str]]:
+    labels_file = corpus_dir / "labels.csv"
+    labels: dict[str, str] = {}
+    if labels_file.exists():
+        with open(labels_file, newline="", encoding="utf-8") as fh:
+            for row in csv.reader(fh):
+                if len(row) >= 2 and row[0].strip() and row[0].strip().lower() != "filename":
+                    labels[row[0].strip()] = row[1].strip()
+
+    samples: list[tuple[Path, str]] = []
+    for path in sorted(corpus_dir.iterdir()):
+        if path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        label = labels.get(path.name) if labels else path.stem.split("_", 1)[0]
+        if label:
+            samples.append((path, label.upper()))
+    return samples
+
+
+def char_matches(expected: str, predicted: str) -> tuple[int, int]:
+    """Position-wise character matches and the number of positions compared."""
+    total = max(len(expected), len(predicted))
+    hits = sum(1 for a, b in zip(expected, predicted) if a == b)
+    return hits, total
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[k]
+
+
+class _RssSampler:
+    """Track the peak resident set size of this process while a run is active."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def current_rss() -> int:
+        try:
+            with open("/proc/self/statm") as fh:
+                return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except Exception:
+            # ru_maxrss is KiB on Linux and bytes on macOS; it is a lifetime peak.
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return rss if sys.platform == "darwin" else rss * 1024
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, self.current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "_RssSampler":
+        self.peak_bytes = self.current_rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, self.current_rss())
+
+
+def _local_backend(model_path: str) -> Predictor:
+    from .predict_image_api import PredictImageAPI
+
+    model = PredictImageAPI(model_path=model_path)
+
+    def predict(batch: list[tuple[Path, bytes]]) -> list[str]:
+        return model.predict_images_bytes([content for _, content in batch])
+
+    return predict
+
+
+def _http_backend(base_url: str, timeout_seconds: int) -> Predictor:
+    import requests
+
+    url = f"{base_url.rstrip('/')}/predict"
+    pool = ThreadPoolExecutor(max_workers=64, thread_name_prefix="ocr_bench")
+
+    def _one(item: tuple[Path, bytes]) -> str:
+        path, content = item
+        r = requests.post(url, files={"file": (path.name, content, "image/png")}, timeout=timeout_seconds)
+        r.raise_for_status()
+        data = r.json() if r.content else {}
+        return str(data.get("text") or "")
+
+    def predict(batch: list[tuple[Path, bytes]]) -> list[str]:
+        # The service takes one image per request; a "batch" is that many requests in flight.
+        return list(pool.map(_one, batch))
+
+    return predict
+
+
+def available_backends(args: argparse.Namespace) -> dict[str, Callable[[], Predictor]]:
+    backends: dict[str, Callable[[], Predictor]] = {}
+    if args.model_path and os.path.exists(args.model_path):
+        try:
+            import tensorflow  # noqa: F401
+
+            backends["local"] = lambda: _local_backend(args.model_path)
+        except ImportError:
+            print("skipping local backend: tensorflow is not installed", file=sys.stderr)
+    if args.url:
+        backends["http"] = lambda: _http_backend(args.url, args.timeout)
+    return backends
+
+
+def run_case(predict: Predictor, samples: list[tuple[Path, str]], batch_size: int, warmup: int) -> dict:
+    payloads = [(path, path.read_bytes()) for path, _ in samples]
+    labels = [label for _, label in samples]
+
+    for start in range(0, min(warmup, len(payloads)), batch_size):
+        predict(payloads[start:start + batch_size])
+
+    latencies_ms: list[float] = []
+    image_latencies_ms: list[float] = []
+    predictions: list[str] = []
+    errors = 0
+    with _RssSampler() as rss:
+        t0 = time.perf_counter()
+        for start in range(0, len(payloads), batch_size):
+            batch = payloads[start:start + batch_size]
+            b0 = time.perf_counter()
+            try:
+                out = predict(batch)
+            except Exception as e:
+                print(f"batch at {start} failed: {e}", file=sys.stderr)
+                out = [""] * len(batch)
+                errors += len(batch)
+            batch_ms = (time.perf_counter() - b0) * 1000.0
+            latencies_ms.append(batch_ms)
+            # The last batch can be short
+            image_latencies_ms.append(batch_ms / len(batch))
+            if len(out) != len(batch):
+                # Predictions must stay aligned with labels; score the whole batch as failed
+                print(f"batch at {start} returned {len(out)} predictions for {len(batch)} images", file=sys.stderr)
+                out = [""] * len(batch)
+                errors += len(batch)
+            predictions.extend(out)
+        elapsed = time.perf_counter() - t0
+
+    exact = sum(1 for p, l in zip(predictions, labels) if p.upper() == l)
+    char_hits = char_total = 0
+    for p, l in zip(predictions, labels):
+        hits, total = char_matches(l, p.upper())
+        char_hits += hits
+        char_total += total
+
+    n = len(labels)
+    return {
+        "batch_size": batch_size,
+        "images": n,
+        "errors": errors,
+        "exact_match_accuracy": round(exact / n, 4) if n else 0.0,
+        "char_accuracy": round(char_hits / char_total, 4) if char_total else 0.0,
+        "images_per_sec": round(n / elapsed, 2) if elapsed > 0 else 0.0,
+        "batch_latency_ms": {
+            "p50": round(percentile(latencies_ms, 50), 2),
+            "p99": round(percentile(latencies_ms, 99), 2),
+            "mean": round(statistics.fmean(latencies_ms), 2) if latencies_ms else 0.0,
+        },
+        "image_latency_ms": {
+            "p50": round(percentile(image_latencies_ms, 50), 2),
+            "p99": round(percentile(image_latencies_ms, 99), 2),
+        },
+        "peak_rss_mb": round(rss.peak_bytes / (1024 * 1024), 1),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            timeout=10,
+        )
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark captcha OCR accuracy and latency.")
+    parser.add_argument("corpus", type=Path, help="Directory of labeled captcha images")
+    parser.add_argument("--model-path", default=os.getenv("MODEL_PATH", "ocr_crnn_model.keras"))
+    parser.add_argument("--url", default=os.getenv("AI_MODEL_URL", ""), help="OCR service base URL")
+    parser.add_argument("--backends", default="", help="Comma-separated subset of: local,http")
+    parser.add_argument("--batch-sizes", default="1,8,32")
+    parser.add_argument("--warmup", type=int, default=8, help="Images to run before timing")
+    parser.add_argument("--limit", type=int, default=0, help="Use only the first N samples")
+    parser.add_argument("--timeout", type=int, default=15)
+    parser.add_argument("--output", type=Path, default=None, help="JSON output path (default: stdout)")
+    args = parser.parse_args(argv)
+
+    samples = load_corpus(args.corpus)
+    if args.limit > 0:
+        samples = samples[: args.limit]
+    if not samples:
+        raise SystemExit(f"No labeled images found in {args.corpus}")
+
+    backends = available_backends(args)
+    wanted = {b.strip() for b in args.backends.split(",") if b.strip()}
+    if wanted:
+        backends = {k: v for k, v in backends.items() if k in wanted}
+    if not backends:
+        raise SystemExit("No OCR backend available (set --model-path with tensorflow installed, or --url)")
+
+    batch_sizes = sorted({max(1, int(b)) for b in args.batch_sizes.split(",") if b.strip()})
+
+    results = []
+    for name, factory in backends.items():
+        load_t0 = time.perf_counter()
+        predict = factory()
+        load_s = time.perf_counter() - load_t0
+        for batch_size in batch_sizes:
+            case = run_case(predict, samples, batch_size, args.warmup)
+            case.update({"backend": name, "load_seconds": round(load_s, 3)})
+            results.append(case)
+            print(
+                f"{name:<6} batch={batch_size:<3} exact={case['exact_match_accuracy']:.3f} "
+                f"char={case['char_accuracy']:.3f} {case['images_per_sec']:.1f} img/s "
+                f"p50={case['batch_latency_ms']['p50']}ms p99={case['batch_latency_ms']['p99']}ms "
+                f"rss={case['peak_rss_mb']}MB",
+                file=sys.stderr,
+            )
+
+    report = {
+        "commit": _git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "corpus": {"path": str(args.corpus), "images": len(samples)},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -25,32 +25,37 @@ class PredictImageAPI:
             custom_objects={"TransposeLayer": TransposeLayer},
         )
 
-    def __decode_predictions(self, pred) -> str:
-        input_len = tf.fill((1,), 25)
+    def __decode_predictions(self, pred) -> list[str]:
+        batch_size = int(pred.shape[0])
+        input_len = tf.fill((batch_size,), 25)
         decoded, _ = tf.keras.backend.ctc_decode(pred, input_length=input_len, greedy=True)
 
         try:
-            seq = decoded[0][0, :4].numpy()
+            rows = decoded[0][:, :4].numpy()
         except Exception:
             try:
-                seq = decoded[0].numpy().ravel()
+                # One row per image, so callers can zip predictions with their inputs
+                rows = decoded[0].numpy().reshape(batch_size, -1)[:, :4]
             except Exception:
-                return ""
+                return [""] * batch_size
 
-        decoded_labels: list[str] = []
-        for x in seq:
-            try:
-                xi = int(x)
-            except Exception:
-                continue
-            if xi < 0:
-                continue
-            ch = self._int_to_char.get(xi)
-            if ch is None:
-                continue
-            decoded_labels.append(ch)
+        texts: list[str] = []
+        for seq in rows:
+            decoded_labels: list[str] = []
+            for x in seq:
+                try:
+                    xi = int(x)
+                except Exception:
+                    continue
+                if xi < 0:
+                    continue
+                ch = self._int_to_char.get(xi)
+                if ch is None:
+                    continue
+                decoded_labels.append(ch)
+            texts.append("".join(decoded_labels))
 
-        return "".join(decoded_labels)
+        return texts
 
     def __preprocess_image_bytes(self, image_bytes: bytes):
         # Accept common formats (png/jpg). decode_image returns uint8.
@@ -66,7 +71,12 @@ class PredictImageAPI:
         return yellow_enhanced
 
     def predict_image_bytes(self, image_bytes: bytes) -> str:
-        processed_image = self.__preprocess_image_bytes(image_bytes)
-        processed_image = tf.expand_dims(processed_image, axis=0)
-        prediction = self.model.predict(processed_image, verbose=0)
+        return self.predict_images_bytes([image_bytes])[0]
+
+    def predict_images_bytes(self, images: list[bytes]) -> list[str]:
+        """Run one forward pass over several captcha images."""
+        if not images:
+            return []
+        batch = tf.stack([self.__preprocess_image_bytes(b) for b in images])
+        prediction = self.model.predict(batch, batch_size=len(images), verbose=0)
         return self.__decode_predictions(prediction)
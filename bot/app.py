@@ -5,6 +5,7 @@ from concurrent.futures import ThreadPoolExecutor
 
 from aiogram import Bot, Dispatcher
 
+from bot.send_gateway import install as send_gateway_install
 from config import BOT_TOKEN
 
 LOG_FORMAT = "%(asctime)s | %(levelname)-8s | %(name)s | %(message)s"
@@ -14,6 +15,8 @@ logger = logging.getLogger("YemenNetBot")
 # Bot and dispatcher singletons used across handler modules
 bot = Bot(token=BOT_TOKEN)
 dp = Dispatcher()
+# Every outbound send goes through the shared rate-limited gateway
+send_gateway_install(bot)
 
 # Executor and concurrency limits
 _MAX_WORKERS = min(32, (os.cpu_count() or 1) * 5)
@@ -0,0 +1,175 @@
+"""Native async PostgreSQL access (psycopg 3) for the bot's hot read paths.
+
+Mirrors the `bot.local_postgres` surface (`fetch_all`, `fetch_one`,
+`fetch_value`, `execute`, `call_function`) so queries keep their `%s`
+placeholders and callers still get `DBResponse` objects, but runs directly on
+the event loop instead of hopping through the shared thread pool.
+
+The layer is optional: when psycopg 3 is not installed (or LOCAL_PG_ASYNC=0),
+`is_available()` returns False and callers keep using the psycopg2 helpers.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Iterable, Mapping, Optional
+
+from bot.local_postgres import DBResponse, _db_config, _env_int, _validate_ident, _validate_type_name
+
+try:
+    import psycopg
+    from psycopg import sql
+    from psycopg.conninfo import make_conninfo
+    from psycopg.rows import dict_row
+    from psycopg.types.string import TextLoader
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:  # pragma: no cover - optional dependency
+    psycopg = None
+    sql = None
+    AsyncConnectionPool = None
+
+# psycopg 3 errors meaning the schema changed under a cached query (psycopg2's are different classes)
+SCHEMA_ERRORS: tuple = (psycopg.errors.UndefinedTable, psycopg.errors.UndefinedColumn) if psycopg else ()
+
+logger = logging.getLogger("YemenNetBot.async_postgres")
+
+_pool: Optional["AsyncConnectionPool"] = None
+_pool_lock: Optional[asyncio.Lock] = None  # created on first use, inside the running loop
+
+
+def is_available() -> bool:
+    if psycopg is None or AsyncConnectionPool is None:
+        return False
+    return os.getenv("LOCAL_PG_ASYNC", "1").strip().lower() not in {"0", "false", "no"}
+
+
+def _conninfo() -> str:
+    cfg = _db_config()
+    statement_timeout_ms = _env_int("LOCAL_PG_STATEMENT_TIMEOUT_MS", 30000)
+    if statement_timeout_ms > 0:
+        # Server-side cap replaces the client-side 30s wait_for used by run_blocking.
+        cfg["options"] = f"-c statement_timeout={statement_timeout_ms}"
+    return make_conninfo(**cfg)
+
+
+async def _configure(conn) -> None:
+    # psycopg2 hands uuid columns back as str; keep that so rows look the same on both paths.
+    conn.adapters.register_loader("uuid", TextLoader)
+
+
+async def get_pool() -> "AsyncConnectionPool":
+    global _pool, _pool_lock
+    if _pool is not None:
+        return _pool
+    if not is_available():
+        raise RuntimeError("psycopg 3 is not installed; async database access is unavailable")
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if _pool is None:
+            pool = AsyncConnectionPool(
+                _conninfo(),
+                min_size=_env_int("LOCAL_PG_ASYNC_POOL_MIN", 1),
+                max_size=_env_int("LOCAL_PG_ASYNC_POOL_MAX", 10),
+                timeout=float(_env_int("LOCAL_PG_POOL_TIMEOUT", 30)),
+                max_idle=float(_env_int("LOCAL_PG_POOL_MAX_IDLE", 300)),
+                kwargs={"autocommit": True, "row_factory": dict_row},
+                configure=_configure,
+                check=AsyncConnectionPool.check_connection,
+                name="yemen_net_async",
+                open=False,
+            )
+            await pool.open(wait=False)
+            _pool = pool
+            logger.info("Async PostgreSQL pool opened")
+    return _pool
+
+
+async def close_pool() -> None:
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        try:
+            await pool.close()
+        except Exception:
+            logger.debug("Failed to close async PostgreSQL pool", exc_info=True)
+
+
+def pool_stats() -> dict[str, Any]:
+    return dict(_pool.get_stats()) if _pool is not None else {}
+
+
+async def fetch_all(query: Any, params: Optional[Iterable[Any]] = None) -> list[dict[str, Any]]:
+    pool = await get_pool()
+    async with pool.connection() as conn:
+        cur = await conn.execute(query, params)
+        rows = await cur.fetchall()
+        return [dict(r) for r in rows or []]
+
+
+async def fetch_one(query: Any, params: Optional[Iterable[Any]] = None) -> Optional[dict[str, Any]]:
+    pool = await get_pool()
+    async with pool.connection() as conn:
+        cur = await conn.execute(query, params)
+        row = await cur.fetchone()
+        return dict(row) if row else None
+
+
+async def fetch_value(query: Any, params: Optional[Iterable[Any]] = None) -> Any:
+    row = await fetch_one(query, params)
+    if not row:
+        return None
+    return next(iter(row.values()), None)
+
+
+async def execute(query: Any, params: Optional[Iterable[Any]] = None) -> int:
+    pool = await get_pool()
+    async with pool.connection() as conn:
+        cur = await conn.execute(query, params)
+        return cur.rowcount
+
+
+async def call_function(
+    function_name: str,
+    params: Optional[Mapping[str, Any]] = None,
+    *,
+    schema: str = "public",
+    param_types: Optional[Mapping[str, str]] = None,
+) -> DBResponse:
+    """Async counterpart of `local_postgres.call_function`."""
+
+    _validate_ident(schema)
+    _validate_ident(function_name)
+
+    params = params or {}
+    param_types = param_types or {}
+    for k in params.keys():
+        _validate_ident(k)
+    for k, t in param_types.items():
+        _validate_ident(k)
+        _validate_type_name(t)
+
+    keys = list(params.keys())
+    values = [params[k] for k in keys]
+
+    parts = []
+    for k in keys:
+        cast = param_types.get(k)
+        if cast:
+            parts.append(sql.SQL("{} => %s::{}").format(sql.Identifier(k), sql.SQL(cast)))
+        else:
+            parts.append(sql.SQL("{} => %s").format(sql.Identifier(k)))
+
+    q = sql.SQL("SELECT * FROM {}.{}({})").format(
+        sql.Identifier(schema),
+        sql.Identifier(function_name),
+        sql.SQL(", ").join(parts),
+    )
+
+    pool = await get_pool()
+    async with pool.connection() as conn:
+        cur = await conn.execute(q, values)
+        if cur.description is None:
+            # No results (e.g. VOID function)
+            return DBResponse(data=[])
+        rows = await cur.fetchall()
+        return DBResponse(data=[dict(r) for r in rows or []])
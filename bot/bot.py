@@ -53,9 +53,13 @@ from bot.handlers import (
     background_tasks as background_tasks_module,
     partners_handlers,      # ✅ أضف هذا
 )
-from bot.handlers.background_tasks import periodic_daily_report, cache_cleaner, periodic_all_users_refresh
+from bot.handlers.background_tasks import periodic_daily_report, cache_cleaner, periodic_all_users_refresh, JOB_HANDLERS, job_queue_enabled
 
 from bot.cache import CacheManager, set_freshness
+from bot.font_manager import font_manager
+from bot import job_queue, leader, render_farm
+from bot.local_postgres import close_pool
+from bot.async_postgres import close_pool as close_async_pool
 from bot.utils_shared import (
     run_blocking,
     save_scraped_account,
@@ -65,6 +69,7 @@ from bot.utils_shared import (
     update_user_status,
     get_all_users_by_network_id,
     count_table,
+    refresh_schema_cache,
     get_networks,
     insert_pending_request,
     get_pending_request,
@@ -131,6 +136,37 @@ async def main() -> None:
         logger.exception("PostgreSQL connection failed ❌: %s", e)
         return
 
+    try:
+        await refresh_schema_cache()
+    except Exception as e:
+        # Not fatal: the cache loads lazily on first use.
+        logger.warning("Schema cache preload failed: %s", e)
+
+    try:
+        loaded = await run_blocking(font_manager.preload)
+        logger.info("Preloaded %d report fonts", loaded)
+    except Exception as e:
+        logger.warning("Font preload failed: %s", e)
+
+    try:
+        workers = await render_farm.start()
+        logger.info("Render farm ready (%d workers)", workers)
+    except Exception as e:
+        # Not fatal: reports fall back to in-process rendering.
+        logger.warning("Render farm warm-up failed: %s", e)
+
+    job_worker = None
+    if job_queue_enabled():
+        try:
+            await run_blocking(job_queue.ensure_schema)
+            job_worker = job_queue.JobWorker(
+                JOB_HANDLERS, concurrency=int(os.getenv("JOB_WORKER_CONCURRENCY", "4") or 4)
+            )
+            job_worker.start()
+        except Exception as e:
+            # Not fatal: queued jobs wait for a worker (this one after a restart, or bot/worker.py)
+            logger.warning("Job queue worker failed to start: %s", e)
+
     # nicer command menu (use emojis for visual appeal) and optional startup message to admin
     async def _set_commands_with_retry():
         cmds = [
@@ -221,9 +257,11 @@ async def main() -> None:
         logger.debug("Couldn't send startup command list to admins", exc_info=True)
 
     # asyncio.create_task(periodic_sync())
-    asyncio.create_task(periodic_daily_report())
+    # Scheduled loops run on one replica only (leader election); every replica serves handlers.
+    # The cache cleaner sweeps this process's own memory, so it runs everywhere.
+    asyncio.create_task(leader.run_as_leader("daily-report", periodic_daily_report))
     asyncio.create_task(cache_cleaner())
-    asyncio.create_task(periodic_all_users_refresh())
+    asyncio.create_task(leader.run_as_leader("all-users-refresh", periodic_all_users_refresh))
     # asyncio.create_task(periodic_send_image())
 
     try:
@@ -236,8 +274,14 @@ async def main() -> None:
         add_log('start')
         await dp.start_polling(bot)
     finally:
+        if job_worker is not None:
+            job_worker.stop()
+        leader.stop_all()
         await bot.session.close()
         shutdown_executor(wait=False)
+        render_farm.shutdown(wait=False)
+        close_pool()
+        await close_async_pool()
 
 if __name__ == "__main__":
     add_log('start')
@@ -1,8 +1,32 @@
-import logging
-from datetime import datetime, timezone, timedelta
-from typing import Any, Dict, Optional
+"""In-memory cache for DB lookups.
+
+`CacheManager` used to be a global dict whose TTL was only checked on read,
+and `cache_cleaner` wiped it every hour so every key missed at once. The
+store behind it is now a bounded cache:
+
+- LRU eviction by entry count (CACHE_MAX_ENTRIES) and approximate size
+  (CACHE_MAX_MB);
+- a TTL per key, jittered by +/- CACHE_TTL_JITTER so keys set together do not
+  all expire together;
+- `expire()` sweeps expired entries (`cache_cleaner` calls it periodically);
+- tags for group invalidation, e.g. everything cached for ``network:<id>``;
+- hit / miss / eviction / expiry counters;
+- `get_or_load(key, loader, ttl)`: concurrent misses for a key share one
+  load, and with `stale_ttl` an expired value is served while a background
+  load refreshes it (stale-while-revalidate). Loader errors are not cached.
 
-from bot.utils import utcnow
+`CacheManager.get/set/clear` keep their old behaviour.
+"""
+import asyncio
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -10,33 +34,268 @@ logger = logging.getLogger(__name__)
 FRESHNESS = timedelta(minutes=1)
 CACHE_TTL = timedelta(minutes=5)
 
-# Simple in-memory cache
-CACHE: Dict[str, Dict[str, Any]] = {}
-
 
 def set_freshness(delta: timedelta) -> None:
     global FRESHNESS
     FRESHNESS = delta
 
 
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def approx_size(value: Any, _depth: int = 0) -> int:
+    """Rough deep size in bytes of a cached value (rows are lists/dicts of scalars)."""
+    size = sys.getsizeof(value)
+    if _depth >= 4:
+        return size
+    if isinstance(value, dict):
+        size += sum(approx_size(k, _depth + 1) + approx_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(approx_size(v, _depth + 1) for v in value)
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "stale_until", "size", "tags")
+
+    def __init__(self, value: Any, expires_at: float, stale_until: float, size: int, tags: Tuple[str, ...]):
+        self.value = value
+        self.expires_at = expires_at
+        # Past expires_at but before stale_until the value may still be served by get_or_load
+        self.stale_until = stale_until
+        self.size = size
+        self.tags = tags
+
+
+class TTLCache:
+    """Thread-safe LRU with per-key jittered TTLs, tags and counters."""
+
+    def __init__(self, max_entries: int = 10000, max_bytes: Optional[int] = None, default_ttl: float = 300.0,
+                 jitter: float = 0.1):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max_bytes if max_bytes and max_bytes > 0 else None
+        self.default_ttl = default_ttl
+        self.jitter = max(0.0, min(0.5, jitter))
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        # key -> (load task, tags the loaded value will be cached under)
+        self._inflight: Dict[str, Tuple["asyncio.Task[Any]", Tuple[str, ...]]] = {}
+        self._stats = {
+            "hits": 0, "misses": 0, "stale_hits": 0, "loads": 0, "load_errors": 0, "joined_loads": 0,
+            "sets": 0, "evictions": 0, "expirations": 0, "invalidations": 0,
+        }
+
+    def _expiry(self, ttl: Optional[float], now: float) -> float:
+        ttl = self.default_ttl if ttl is None else ttl
+        if self.jitter:
+            ttl *= 1.0 + random.uniform(-self.jitter, self.jitter)
+        return now + ttl
+
+    def _drop(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return entry
+
+    def _lookup(self, key: str, allow_stale: bool) -> Tuple[bool, bool, Any]:
+        """(found, fresh, value); counts the lookup."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return True, True, entry.value
+            if entry is not None and allow_stale and entry.stale_until > now:
+                self._entries.move_to_end(key)
+                self._stats["stale_hits"] += 1
+                return True, False, entry.value
+            if entry is not None and entry.stale_until <= now:
+                self._drop(key)
+                self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            return False, False, None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        found, _fresh, value = self._lookup(key, allow_stale=False)
+        return value if found else default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = (),
+            stale_ttl: float = 0.0) -> None:
+        """Cache value under key for ttl seconds (default_ttl when None), optionally under tags.
+
+        `stale_ttl` keeps the value around that much longer for `get_or_load` to serve while it reloads.
+        """
+        now = time.monotonic()
+        tags = tuple(dict.fromkeys(tags))
+        size = approx_size(value) if self.max_bytes else 0
+        with self._lock:
+            self._drop(key)
+            if self.max_bytes and size > self.max_bytes:
+                return
+            expires_at = self._expiry(ttl, now)
+            self._entries[key] = _Entry(value, expires_at, expires_at + max(0.0, stale_ttl), size, tags)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            self._stats["sets"] += 1
+            while self._entries and (
+                len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes)
+            ):
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def _start_load(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[float],
+                    stale_ttl: float, tags: Tuple[str, ...]) -> "asyncio.Task[Any]":
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._stats["joined_loads"] += 1
+            return inflight[0]
+
+        async def _load() -> Any:
+            self._stats["loads"] += 1
+            value = await loader()
+            # An invalidation while loading wins: the value may predate it, so do not cache it
+            if self._inflight.get(key, (None,))[0] is task:
+                self.set(key, value, ttl=ttl, tags=tags, stale_ttl=stale_ttl)
+            return value
+
+        def _done(t: "asyncio.Task[Any]") -> None:
+            if self._inflight.get(key, (None,))[0] is t:
+                del self._inflight[key]
+            if not t.cancelled() and t.exception() is not None:
+                self._stats["load_errors"] += 1
+                logger.warning("Cache load for %s failed: %s", key, t.exception())
+
+        task = asyncio.get_running_loop().create_task(_load())
+        self._inflight[key] = (task, tags)
+        task.add_done_callback(_done)
+        return task
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[float] = None,
+                          stale_ttl: float = 0.0, tags: Iterable[str] = ()) -> Any:
+        """Cached value for key, loading it with `await loader()` on a miss.
+
+        Concurrent callers missing the same key share one load. With `stale_ttl`, a value that expired
+        less than stale_ttl seconds ago is returned at once while a background load refreshes it.
+        Loader exceptions propagate to the callers waiting on that load and nothing is cached.
+        """
+        found, fresh, value = self._lookup(key, allow_stale=stale_ttl > 0)
+        if found and fresh:
+            return value
+        task = self._start_load(key, loader, ttl, stale_ttl, tuple(dict.fromkeys(tags)))
+        if found:
+            return value
+        # Shielded: one caller being cancelled must not cancel the load the others are waiting on
+        return await asyncio.shield(task)
+
+    def _forget_load(self, key: str) -> None:
+        self._inflight.pop(key, None)
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            self._forget_load(key)
+            return self._drop(key) is not None
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Drop every entry cached under tag; returns how many were dropped."""
+        with self._lock:
+            keys = list(self._tags.get(tag, ()))
+            for key in keys:
+                self._drop(key)
+            # Loads in flight for these keys started before the change; their result is not cached
+            for key in [k for k, (_task, load_tags) in self._inflight.items() if tag in load_tags]:
+                self._forget_load(key)
+            self._stats["invalidations"] += len(keys)
+            return len(keys)
+
+    def expire(self) -> int:
+        """Drop expired entries (past their stale window) now instead of waiting for them to be read."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry.stale_until <= now]
+            for key in expired:
+                self._drop(key)
+            self._stats["expirations"] += len(expired)
+            return len(expired)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._inflight.clear()
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.expires_at > time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "inflight": len(self._inflight),
+                "bytes": self._bytes,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+            }
+
+
+cache = TTLCache(
+    max_entries=int(_env_number("CACHE_MAX_ENTRIES", 10000)),
+    max_bytes=int(_env_number("CACHE_MAX_MB", 32) * 1024 * 1024),
+    default_ttl=CACHE_TTL.total_seconds(),
+    jitter=_env_number("CACHE_TTL_JITTER", 0.1),
+)
+
+
 class CacheManager:
     @staticmethod
     def get(key: str) -> Optional[Any]:
-        entry = CACHE.get(key)
-        if not entry:
-            return None
-        if utcnow() - entry["ts"] > CACHE_TTL:
-            CACHE.pop(key, None)
-            return None
-        return entry["data"]
+        return cache.get(key)
 
     @staticmethod
-    def set(key: str, value: Any) -> None:
-        CACHE[key] = {"data": value, "ts": utcnow()}
+    def set(key: str, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()) -> None:
+        cache.set(key, value, ttl=ttl, tags=tags)
 
     @staticmethod
     def clear(key: Optional[str] = None) -> None:
         if key:
-            CACHE.pop(key, None)
+            cache.delete(key)
         else:
-            CACHE.clear()
+            cache.clear()
+
+    @staticmethod
+    async def get_or_load(key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[float] = None,
+                          stale_ttl: float = 0.0, tags: Iterable[str] = ()) -> Any:
+        return await cache.get_or_load(key, loader, ttl=ttl, stale_ttl=stale_ttl, tags=tags)
+
+    @staticmethod
+    def invalidate(tag: str) -> int:
+        return cache.invalidate_tag(tag)
+
+    @staticmethod
+    def expire() -> int:
+        return cache.expire()
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        return cache.stats()
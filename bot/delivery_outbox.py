@@ -0,0 +1,214 @@
+"""Delivery outbox for scheduled reports.
+
+`send_images` used to track sent/skipped pages only in a local dict, so a crash
+halfway through a wave left no record of which chats got which pages. With an
+outbox run key it now records every page in `report_outbox`:
+
+- `plan` registers the pages of one (run, network, recipient) before sending and
+  returns the pages already delivered, which are not sent again. A resume
+  renders again from current data, so each page carries a hash of the lines it
+  shows: a page counts as delivered only if a page with the same lines was;
+- `mark` records each page's outcome with the Telegram message id and file_id;
+- `open_deliveries` lists recipients with unsent pages from recent runs, so the
+  daily report leader can resume them after a restart (`context` carries what
+  is needed to render the report again).
+
+The page in flight when the process dies may be delivered twice (Telegram gives
+no way to tell); every other page is delivered once.
+"""
+import json
+import logging
+from functools import partial
+from typing import Any, Dict, List, Optional, Set
+
+from psycopg2.extras import Json
+
+from bot.local_postgres import execute, fetch_all
+from bot.utils_shared import run_blocking
+
+logger = logging.getLogger("YemenNetBot.delivery_outbox")
+
+PENDING, SENT, FAILED, SKIPPED, EXPIRED = "pending", "sent", "failed", "skipped", "expired"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS report_outbox (
+    run_key TEXT NOT NULL,
+    network_id TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    page_count INTEGER NOT NULL,
+    content_hash TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 1,
+    message_id BIGINT,
+    file_id TEXT,
+    last_error TEXT,
+    context JSONB,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    sent_at TIMESTAMPTZ,
+    PRIMARY KEY (run_key, network_id, recipient, page)
+);
+ALTER TABLE report_outbox ADD COLUMN IF NOT EXISTS content_hash TEXT;
+CREATE INDEX IF NOT EXISTS report_outbox_open_idx ON report_outbox (created_at) WHERE status IN ('pending', 'failed');
+"""
+
+# A page is delivered when the page under its number had the same lines (or was recorded without a
+# hash), or when its lines went out under another page number (the earlier render was paginated
+# differently); anything else is (re)sent.
+_PLAN = """
+INSERT INTO report_outbox (run_key, network_id, recipient, page, page_count, content_hash, status, context)
+SELECT %s, %s, %s, p.page, %s, p.content_hash,
+       CASE WHEN p.content_hash = ANY(%s::text[]) THEN 'sent' ELSE 'pending' END, %s
+FROM unnest(%s::text[]) WITH ORDINALITY AS p(content_hash, page)
+ON CONFLICT (run_key, network_id, recipient, page) DO UPDATE
+SET attempts = report_outbox.attempts + 1,
+    page_count = EXCLUDED.page_count,
+    context = EXCLUDED.context,
+    status = CASE
+        WHEN report_outbox.status IN ('sent', 'skipped')
+             AND (report_outbox.content_hash IS NULL OR report_outbox.content_hash IS NOT DISTINCT FROM EXCLUDED.content_hash)
+            THEN report_outbox.status
+        ELSE EXCLUDED.status
+    END,
+    content_hash = EXCLUDED.content_hash,
+    updated_at = now()
+"""
+
+_OPEN = """
+SELECT run_key, network_id, recipient, max(attempts) AS attempts, count(*) AS open_pages,
+       (array_agg(context ORDER BY page))[1] AS context
+FROM report_outbox
+WHERE status IN ('pending', 'failed') AND created_at > now() - make_interval(hours => %s)
+GROUP BY run_key, network_id, recipient
+HAVING max(attempts) < %s
+ORDER BY min(created_at)
+"""
+
+_SUMMARY = """
+SELECT run_key,
+       count(*) AS recipients,
+       count(*) FILTER (WHERE open_pages = 0) AS complete,
+       sum(sent_pages) AS pages_sent,
+       sum(pages) AS pages,
+       sum(failed_pages) AS pages_failed,
+       max(updated_at) AS updated_at
+FROM (
+    SELECT run_key, network_id, recipient,
+           count(*) FILTER (WHERE status IN ('pending', 'failed')) AS open_pages,
+           count(*) FILTER (WHERE status = 'sent') AS sent_pages,
+           count(*) FILTER (WHERE status = 'failed') AS failed_pages,
+           count(*) FILTER (WHERE status <> 'expired') AS pages,
+           max(updated_at) AS updated_at
+    FROM report_outbox
+    WHERE created_at > now() - make_interval(hours => %s)
+    GROUP BY run_key, network_id, recipient
+) per_recipient
+GROUP BY run_key
+ORDER BY max(updated_at) DESC
+LIMIT %s
+"""
+
+_schema_ready = False
+
+
+def ensure_schema() -> None:
+    """Create the outbox table if it does not exist yet (idempotent; runs once per process)."""
+    global _schema_ready
+    if not _schema_ready:
+        execute(_SCHEMA)
+        _schema_ready = True
+
+
+def _json(value: Any) -> Json:
+    return Json(value, dumps=partial(json.dumps, default=str, ensure_ascii=False))
+
+
+def _sync_plan(run_key: str, network_id: str, recipient: str, page_hashes: List[Optional[str]],
+               context: Optional[Dict[str, Any]]) -> Set[int]:
+    ensure_schema()
+    page_count = len(page_hashes)
+    delivered = fetch_all(
+        "SELECT content_hash FROM report_outbox WHERE run_key = %s AND network_id = %s AND recipient = %s "
+        "AND status IN ('sent', 'skipped') AND content_hash IS NOT NULL",
+        [run_key, network_id, recipient],
+    )
+    execute(_PLAN, [
+        run_key, network_id, recipient, page_count, [row["content_hash"] for row in delivered],
+        _json(context) if context else None, list(page_hashes),
+    ])
+    # A re-render with fewer pages leaves the extra pages of the earlier attempt behind
+    execute(
+        "UPDATE report_outbox SET status = 'expired', updated_at = now() "
+        "WHERE run_key = %s AND network_id = %s AND recipient = %s AND page > %s AND status IN ('pending', 'failed')",
+        [run_key, network_id, recipient, page_count],
+    )
+    rows = fetch_all(
+        "SELECT page FROM report_outbox WHERE run_key = %s AND network_id = %s AND recipient = %s AND status IN ('sent', 'skipped')",
+        [run_key, network_id, recipient],
+    )
+    return {row["page"] for row in rows}
+
+
+def _sync_mark(run_key: str, network_id: str, recipient: str, page: int, status: str,
+               message_id: Optional[int], file_id: Optional[str], error: Optional[str]) -> None:
+    execute(
+        """
+        UPDATE report_outbox
+        SET status = %s, message_id = COALESCE(%s, message_id), file_id = COALESCE(%s, file_id),
+            last_error = COALESCE(%s, last_error), updated_at = now(),
+            sent_at = CASE WHEN %s = 'sent' THEN now() ELSE sent_at END
+        WHERE run_key = %s AND network_id = %s AND recipient = %s AND page = %s
+        """,
+        [status, message_id, file_id, error[:2000] if error else None, status, run_key, network_id, recipient, page],
+    )
+
+
+def _sync_open_deliveries(max_age_hours: float, max_attempts: int) -> List[Dict[str, Any]]:
+    ensure_schema()
+    return fetch_all(_OPEN, [max_age_hours, max_attempts])
+
+
+def _sync_expire(max_age_hours: float) -> int:
+    ensure_schema()
+    return execute(
+        "UPDATE report_outbox SET status = 'expired', updated_at = now() "
+        "WHERE status IN ('pending', 'failed') AND created_at <= now() - make_interval(hours => %s)",
+        [max_age_hours],
+    )
+
+
+def _sync_summary(max_age_hours: float, limit: int) -> List[Dict[str, Any]]:
+    ensure_schema()
+    return fetch_all(_SUMMARY, [max_age_hours, limit])
+
+
+async def plan(run_key: str, network_id: Any, recipient: Any, page_count: int,
+               context: Optional[Dict[str, Any]] = None, page_hashes: Optional[List[Optional[str]]] = None) -> Set[int]:
+    """Register the pages of a delivery; returns the page numbers already delivered for this run.
+
+    `page_hashes` (one per page, see `report_sender.page_line_hashes`) identifies what each page shows;
+    without it pages are matched by number only.
+    """
+    hashes = list(page_hashes) if page_hashes and len(page_hashes) == page_count else [None] * page_count
+    return await run_blocking(partial(_sync_plan, run_key, str(network_id), str(recipient), hashes, context))
+
+
+async def mark(run_key: str, network_id: Any, recipient: Any, page: int, status: str, *,
+               message_id: Optional[int] = None, file_id: Optional[str] = None, error: Optional[str] = None) -> None:
+    await run_blocking(partial(_sync_mark, run_key, str(network_id), str(recipient), page, status, message_id, file_id, error))
+
+
+async def open_deliveries(max_age_hours: float = 6.0, max_attempts: int = 3) -> List[Dict[str, Any]]:
+    """Recipients of recent runs with pages still pending or failed (one row per run/network/recipient)."""
+    return await run_blocking(partial(_sync_open_deliveries, max_age_hours, max_attempts))
+
+
+async def expire(max_age_hours: float = 6.0) -> int:
+    """Give up on unsent pages older than max_age_hours (a late report would be misleading)."""
+    return await run_blocking(partial(_sync_expire, max_age_hours))
+
+
+async def summary(max_age_hours: float = 48.0, limit: int = 8) -> List[Dict[str, Any]]:
+    """Delivery completeness per recent run, newest first."""
+    return await run_blocking(partial(_sync_summary, max_age_hours, limit))
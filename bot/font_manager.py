@@ -1,12 +1,25 @@
 from PIL import ImageFont
 import os
+import threading
 import requests
 from pathlib import Path
 
+# (font_type, sizes) used by TableReportGenerator / ReportImageGenerator, including the
+# digits fonts TableReportGenerator._pick_font_for_text swaps in for numeric cells.
+PRELOAD_SIZES = {
+    "arabic": (14, 15, 16, 18, 20),
+    "arabic_bold": (18, 22, 28, 30, 32, 34, 44),
+    "digits": (15, 18, 20),
+    "digits_bold": (30, 34, 44),
+}
 
 
 class FontManager:
     def __init__(self):
+        # (font_type, size) -> FreeTypeFont; fonts are read-only once loaded, so one
+        # instance is shared by every generator and executor thread.
+        self._fonts = {}
+        self._fonts_lock = threading.Lock()
         self.fonts_dir = Path("fonts")
         self.fonts_dir.mkdir(exist_ok=True)
         # Preferred local filenames inside the project.
@@ -131,8 +144,7 @@ class FontManager:
                 'arabic_bold': None,
             }
     
-    def get_font(self, font_type: str, size: int):
-        """Get font with specified size"""
+    def _load_font(self, font_type: str, size: int):
         font_path = self.font_files.get(font_type)
         try:
             if font_path and os.path.exists(font_path):
@@ -142,6 +154,29 @@ class FontManager:
         except:
             return ImageFont.load_default()
 
+    def get_font(self, font_type: str, size: int):
+        """Get font with specified size"""
+        key = (font_type, size)
+        font = self._fonts.get(key)
+        if font is None:
+            with self._fonts_lock:
+                font = self._fonts.get(key)
+                if font is None:
+                    font = self._load_font(font_type, size)
+                    self._fonts[key] = font
+        return font
+
+    def preload(self, sizes=None):
+        """Parse the report fonts up front so the first report wave does not pay for it."""
+        for font_type, font_sizes in (sizes or PRELOAD_SIZES).items():
+            for size in font_sizes:
+                self.get_font(font_type, size)
+        return len(self._fonts)
+
+    def clear_cache(self):
+        with self._fonts_lock:
+            self._fonts.clear()
+
 
 # Global font manager instance
 font_manager = FontManager()
\ No newline at end of file
@@ -16,7 +16,12 @@ from aiogram.exceptions import TelegramBadRequest
 from bot.app import dp, bot, EXEC, SCRAPE_SEMAPHORE
 from bot.utils import BotUtils
 from bot.cache import CacheManager
-from bot.user_manager import UserManager
+from bot import delivery_outbox, leader
+from bot.local_postgres import pool_stats
+from bot.refresh_coordinator import refresh_coordinator
+from bot.render_cache import render_cache
+from bot.send_gateway import send_gateway
+from bot.user_manager import STALE_CACHE_TTL, TAG_CHAT_NETWORKS, UserManager
 from scraper.runner import fetch_users
 from bot.chat_user_manager import chat_user_manager
 from bot.utils_shared import (
@@ -27,6 +32,7 @@ from bot.utils_shared import (
     delete_user_account,
     update_user_status,
     get_active_users,
+    get_chats_users,
     get_networks,
     get_pending_requests,
     get_pending_request,
@@ -48,9 +54,11 @@ PAGE_SIZE_REQUESTS = 20
 PAGE_SIZE_ACCOUNTS2 = 20
 PAYMENT_METHOD_OPTIONS = ["جيب", "كريمي", "حوالة محلية", "نقدي", "بدون دفع"]
 
-# Global cache for chat users to avoid repeated fetches during pagination flows
-_CACHED_CHATS_USERS: Optional[list] = None
-_CACHED_CHATS_LOCK = asyncio.Lock()
+# Chat user / network lists are cached (CacheManager.get_or_load) to avoid repeated fetches during
+# pagination flows; admin actions clear them, UserManager writes invalidate them by tag.
+_CHATS_USERS_KEY = "admin:chats_users"
+_NETWORKS_KEY = "admin:networks"
+_ADMIN_LISTS_TTL = 300.0
 
 # Track current pagination page for chat/network pickers so we can refresh without jumping back to page 0
 _CHAT_PAGE_STATE = {"activate": 0, "deactivate": 0}
@@ -60,27 +68,25 @@ _REQUEST_FILTER_STATE = {"status": "pending", "type": "all"}
 _ACCOUNTS2_PAGE_STATE = {"list": 0, "search": 0}
 _ACCOUNTS2_SEARCH_QUERY: Optional[str] = None
 
-# Global cache for networks
-_CACHED_NETWORKS: Optional[list] = None
-_CACHED_NETWORKS_LOCK = asyncio.Lock()
+
+async def _load_list(fetch) -> list:
+    resp = await fetch()
+    return getattr(resp, "data", None) or []
 
 
 async def _get_cached_chats_users() -> list:
-    global _CACHED_CHATS_USERS
-    if _CACHED_CHATS_USERS is not None:
-        return _CACHED_CHATS_USERS
-    async with _CACHED_CHATS_LOCK:
-        # Double-check inside lock
-        if _CACHED_CHATS_USERS is not None:
-            return _CACHED_CHATS_USERS
-        resp = await UserManager.get_chats_users()
-        _CACHED_CHATS_USERS = resp or []
-        return _CACHED_CHATS_USERS
+    try:
+        return await CacheManager.get_or_load(
+            _CHATS_USERS_KEY, partial(_load_list, get_chats_users),
+            ttl=_ADMIN_LISTS_TTL, stale_ttl=STALE_CACHE_TTL, tags=(TAG_CHAT_NETWORKS,),
+        )
+    except Exception as e:
+        logger.error("get_chats_users error: %s", e)
+        return []
 
 
 def _clear_cached_chats_users() -> None:
-    global _CACHED_CHATS_USERS
-    _CACHED_CHATS_USERS = None
+    CacheManager.clear(_CHATS_USERS_KEY)
 
 
 def _set_chat_page(action: str, page: int) -> None:
@@ -92,20 +98,18 @@ def _get_chat_page(action: str) -> int:
 
 
 async def _get_cached_networks() -> list:
-    global _CACHED_NETWORKS
-    if _CACHED_NETWORKS is not None:
-        return _CACHED_NETWORKS
-    async with _CACHED_NETWORKS_LOCK:
-        if _CACHED_NETWORKS is not None:
-            return _CACHED_NETWORKS
-        resp = await get_networks()
-        _CACHED_NETWORKS = getattr(resp, "data", []) or []
-        return _CACHED_NETWORKS
+    try:
+        return await CacheManager.get_or_load(
+            _NETWORKS_KEY, partial(_load_list, get_networks),
+            ttl=_ADMIN_LISTS_TTL, stale_ttl=STALE_CACHE_TTL, tags=(TAG_CHAT_NETWORKS,),
+        )
+    except Exception as e:
+        logger.error("get_networks error: %s", e)
+        return []
 
 
 def _clear_cached_networks() -> None:
-    global _CACHED_NETWORKS
-    _CACHED_NETWORKS = None
+    CacheManager.clear(_NETWORKS_KEY)
 
 
 def _set_network_page(action: str, page: int) -> None:
@@ -164,6 +168,7 @@ def _build_admin_menu_kb() -> InlineKeyboardMarkup:
         [InlineKeyboardButton(text="🔎 بحث خطوط accounts2", callback_data="admin:accounts2")],
         [InlineKeyboardButton(text="📊 إحصائيات", callback_data="admin:stats"),
          InlineKeyboardButton(text="🔄 مزامنة", callback_data="admin:sync")],
+        [InlineKeyboardButton(text="📬 تسليم التقارير", callback_data="admin:outbox")],
         [InlineKeyboardButton(text="❌ إغلاق", callback_data="admin:close")],
     ]
     return InlineKeyboardMarkup(inline_keyboard=rows)
@@ -1463,6 +1468,28 @@ async def admin_stats(call: types.CallbackQuery):
             f"🟢 الشبكات النشطة: {active_networks_count}\n"
             f"🔴 الشبكات المعطلة: {disabled_networks_count}\n\n"
         )
+        pool = pool_stats()
+        if pool:
+            text += (
+                f"🗄️ اتصالات قاعدة البيانات: {pool['in_use']}/{pool['size']} (الحد {pool['max']})\n"
+                f"⏳ متوسط الانتظار: {pool['wait_ms_avg']:.1f}ms | الأقصى: {pool['wait_ms_max']:.0f}ms | مهلات: {pool['timeouts']}\n"
+            )
+        gw = send_gateway.stats()
+        text += (
+            f"📤 طابور الإرسال: {gw['queued']} | متوسط الانتظار: {gw['wait_ms_avg']:.0f}ms | "
+            f"RetryAfter: {gw['retry_after']}\n"
+        )
+        rf = refresh_coordinator.stats()
+        text += f"🔄 التحديث: {rf['scrapes']} سحب | تم تخطي (حديثة): {rf['skipped_fresh']} | جارية: {rf['inflight']}\n"
+        rc = render_cache.stats()
+        text += f"🖼️ كاش التقارير: {rc['entries']} تقرير | إصابات: {rc['hits']} | file_id: {rc['file_ids']}\n"
+        cs = CacheManager.stats()
+        text += f"🧠 الكاش: {cs['entries']} عنصر | نسبة الإصابة: {cs['hit_rate']:.0%} | طرد: {cs['evictions']}\n"
+        roles = leader.stats()
+        if roles:
+            text += "👑 القيادة: " + " | ".join(
+                f"{name}: {'قائد (term ' + str(r['term']) + ')' if r['leader'] else 'احتياطي'}" for name, r in roles.items()
+            ) + "\n"
         await safe_edit_text(call.message, text, _build_admin_menu_kb())
         await call.answer()
     except Exception as e:
@@ -1470,6 +1497,31 @@ async def admin_stats(call: types.CallbackQuery):
         await call.answer("❌ حدث خطأ أثناء قراءة الإحصائيات.", show_alert=True)
 
 
+@dp.callback_query(F.data == "admin:outbox")
+async def admin_outbox(call: types.CallbackQuery):
+    if not BotUtils.is_admin(call.from_user.id):
+        await call.answer("⛔ غير مسموح", show_alert=True)
+        return
+    try:
+        runs = await delivery_outbox.summary()
+        lines = ["📬 تسليم التقارير المجدولة (آخر 48 ساعة)\n"]
+        for run in runs:
+            complete, recipients = int(run["complete"]), int(run["recipients"])
+            icon = "✅" if complete == recipients else "⚠️"
+            lines.append(
+                f"{icon} {run['run_key'].removeprefix('daily:').replace('T', ' ')}: "
+                f"{complete}/{recipients} مستلم | صفحات {int(run['pages_sent'])}/{int(run['pages'])}"
+                + (f" | فشل {int(run['pages_failed'])}" if run["pages_failed"] else "")
+            )
+        if not runs:
+            lines.append("لا توجد عمليات تسليم مسجلة.")
+        await safe_edit_text(call.message, "\n".join(lines), _build_admin_menu_kb(), markdown=False)
+        await call.answer()
+    except Exception as e:
+        logger.exception("/admin outbox error: %s", e)
+        await call.answer("❌ حدث خطأ أثناء قراءة حالة التسليم.", show_alert=True)
+
+
 @dp.callback_query(F.data == "admin:sync")
 async def admin_sync(call: types.CallbackQuery):
     if not BotUtils.is_admin(call.from_user.id):
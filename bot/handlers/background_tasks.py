@@ -7,15 +7,19 @@ from typing import Any, Dict
 
 from zoneinfo import ZoneInfo
 
-from bot.chat_user_manager import chat_user_manager
-from bot.app import SCRAPE_SEMAPHORE
+from bot.chat_user_manager import ChatUser, chat_user_manager
 from bot.cache import CacheManager
 # run_blocking and save_scraped_account imported lazily inside functions to avoid circular imports
 from bot.user_manager import UserManager
-from bot.report_sender import collect_saved_user_reports, generate_images, send_images
+from bot.report_sender import collect_saved_user_reports, generate_images_parallel, send_images
 from bot.app import bot
-from bot.utils_shared import run_blocking, save_scraped_account, get_all_users
+from bot.utils_shared import run_blocking, get_all_users
+from bot import delivery_outbox, job_queue, render_farm
+from bot.font_manager import font_manager
+from bot.leader import still_leader
+from bot.refresh_coordinator import refresh_coordinator
 from bot.selected_network_manager import SelectedNetwork, selected_network_manager
+from bot.send_gateway import Priority, send_gateway, send_priority
 
 # from config import SECONDARY_ADMIN
 logger = logging.getLogger(__name__)
@@ -23,6 +27,162 @@ logger = logging.getLogger(__name__)
 _all_users_refresh_lock = asyncio.Lock()
 
 
+def _network_from_row(network: Dict[str, Any]) -> SelectedNetwork:
+    return SelectedNetwork(
+        id = network.get("id"),
+        network_id=network.get("network_id"),
+        network_name=network.get("network_name"),
+        user_name=network.get("user_name"),
+        # Use the correct DB field name (times_to_send_reports)
+        times_to_send_reports=network.get("times_to_send_reports", 15),
+        warning_count_remaining_days=network.get("warning_count_remaining_days", 7),
+        danger_count_remaining_days=network.get("danger_count_remaining_days", 3),
+        warning_percentage_remaining_balance=network.get("warning_percentage_remaining_balance", 30),
+        danger_percentage_remaining_balance=network.get("danger_percentage_remaining_balance", 10),
+        is_active=network.get("is_network_active", False),
+        expiration_date=network.get("expiration_date", None),
+        telegram_id=network.get("telegram_id"),
+        chat_user_id=network.get("chat_user_id"),
+        permissions=network.get("permissions", ""),
+        network_type=network.get("network_type", ""),
+    )
+
+
+def _chat_user_from_row(row: Dict[str, Any]) -> ChatUser:
+    """Recipient of a daily report plan row (see utils_shared._DUE_REPORT_DELIVERIES_SQL)."""
+    return ChatUser(
+        row["chat_user_id"], str(row["telegram_id"]), row["chat_user_name"], row["receive_partnered_report"],
+        row["chat_user_is_active"], row["order_by"],
+    )
+
+
+# -- durable jobs (bot.job_queue) ------------------------------------------------------------------
+# With JOB_QUEUE_ENABLED=1 the daily report enqueues one report-network job per due network, keyed
+# by network and slot. The job refreshes the lines, renders and delivers in one go, so the pages
+# sent are exactly the ones rendered from that data, on whichever worker claimed the job. A retry
+# after a crash or failure skips the pages the delivery outbox already records as sent.
+
+def _slot_key(token: str, network_id: Any, scheduled: Any, report_day: str) -> str:
+    h, m, sec = (list(scheduled or []) + [0, 0, 0])[:3]
+    return f"{token}:{network_id}:{report_day}:{int(h):02d}{int(m):02d}{int(sec):02d}"
+
+
+def _outbox_run(scheduled: Any, report_day: str) -> str:
+    """Delivery outbox run key of a daily report slot, e.g. daily:2024-05-01T06:00:00."""
+    h, m, sec = (list(scheduled or []) + [0, 0, 0])[:3]
+    return f"daily:{report_day}T{int(h):02d}:{int(m):02d}:{int(sec):02d}"
+
+
+async def _report_inputs(payload: Dict[str, Any]):
+    token = str(payload["token"])
+    chat_user = await chat_user_manager.get(token)
+    if not chat_user:
+        raise RuntimeError(f"No chat user found for token {token}")
+    network = _network_from_row(payload["network"])
+    users = await UserManager.get_users_by_network(network.network_id)
+    return token, chat_user, network, users
+
+
+async def _deliver_report(payload: Dict[str, Any], token: str, chat_user: ChatUser, network: SelectedNetwork,
+                          users: list) -> Dict[str, Any]:
+    user_reports = await collect_saved_user_reports(users, asyncio.Semaphore(24), UserManager, chat_user.order_by) if users else []
+    if not user_reports:
+        return {"sent": 0, "skipped": 0, "chat_not_found": False}
+    images, cleanup_dir = await generate_images_parallel(user_reports, network, chat_user)
+    try:
+        tz = ZoneInfo("Asia/Aden")
+    except Exception:
+        tz = timezone.utc
+    scheduled = tuple(payload.get("scheduled") or ()) or None
+    context = {k: payload[k] for k in ("token", "network", "scheduled", "report_day")}
+    with send_priority(Priority.BULK):
+        return await send_images(
+            bot, network, token, images, user_reports, tz, cleanup_dir, True, True, scheduled,
+            outbox_run=_outbox_run(payload.get("scheduled"), payload.get("report_day", "")), outbox_context=context,
+        )
+
+
+async def job_report_network(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Refresh, render and deliver one network's scheduled report."""
+    token, chat_user, network, users = await _report_inputs(payload)
+    if not users:
+        return {"sent": 0, "skipped": 0, "chat_not_found": False}
+    fresh, total = await refresh_coordinator.ensure_fresh_many(
+        network.network_id, [u.get("username") for u in users],
+        max_age=float(payload.get("max_age", 120)), timeout=float(payload.get("refresh_timeout", 240)),
+    )
+    result = await _deliver_report(payload, token, chat_user, network, users)
+    return {**result, "fresh": fresh, "lines": total}
+
+
+async def resume_undelivered_reports() -> int:
+    """Finish daily report deliveries a previous process left half done (per the delivery outbox).
+
+    Unsent pages older than REPORT_OUTBOX_RESUME_HOURS are given up; returns the deliveries resumed.
+    """
+    max_age = float(os.getenv("REPORT_OUTBOX_RESUME_HOURS", "6") or 6)
+    expired = await delivery_outbox.expire(max_age)
+    if expired:
+        logger.info("📭 Outbox: gave up on %d pages older than %.0fh", expired, max_age)
+    resumed = 0
+    for row in await delivery_outbox.open_deliveries(max_age):
+        context = row.get("context")
+        if not context:
+            continue
+        logger.info("📬 Resuming delivery %s for network %s (%d pages open)", row["run_key"], row["network_id"], row["open_pages"])
+        try:
+            token, chat_user, network, users = await _report_inputs(context)
+            result = await _deliver_report(context, token, chat_user, network, users)
+            logger.info("Resumed delivery %s for network %s: %s", row["run_key"], row["network_id"], result)
+            resumed += 1
+        except Exception:
+            logger.exception("❌ Resuming delivery %s for network %s failed", row["run_key"], row["network_id"])
+    return resumed
+
+
+async def warm_up_report_slot(slot: datetime, max_age: float, timeout: float) -> Dict[str, int]:
+    """Load what the daily wave at `slot` needs ahead of time, so the wave itself only does delta work.
+
+    Runs the slot's planning query, warms the renderer (fonts here and in the render farm workers)
+    and refreshes due lines not refreshed within `max_age` seconds, which also re-validates their
+    scraper sessions.
+    """
+    slot_bit = SelectedNetwork.from_times_list_to_bitmask([slot.strftime("%H:%M:%S")])
+    due = await UserManager.get_due_report_deliveries(slot_bit, slot.date())
+
+    await run_blocking(font_manager.preload)
+    try:
+        await render_farm.start()
+    except Exception as e:
+        logger.warning("Render farm warm-up before %s failed: %s", slot.strftime("%H:%M"), e)
+
+    lines_by_network: Dict[Any, set] = {}
+    for row in due:
+        lines_by_network.setdefault(row["network_id"], set()).update(
+            line.get("username") for line in row.get("lines") or [] if line.get("username")
+        )
+    results = await asyncio.gather(
+        *(refresh_coordinator.ensure_fresh_many(network_id, usernames, max_age=max_age, timeout=timeout)
+          for network_id, usernames in lines_by_network.items()),
+        return_exceptions=True,
+    )
+    counts = [r for r in results if isinstance(r, tuple)]
+    return {
+        "networks": len(due),
+        "lines": sum(total for _fresh, total in counts),
+        "fresh": sum(fresh for fresh, _total in counts),
+    }
+
+
+JOB_HANDLERS = {
+    job_queue.JOB_REPORT_NETWORK: job_report_network,
+}
+
+
+def job_queue_enabled() -> bool:
+    return os.getenv("JOB_QUEUE_ENABLED", "0").strip().lower() in {"1", "true", "yes"}
+
+
 async def _retry_async(op, *, attempts: int = 3, base_delay: float = 2.0, max_delay: float = 20.0, task_name: str = "async operation"):
     """Simple exponential backoff helper for async callables."""
     last_exc = None
@@ -72,7 +232,6 @@ async def periodic_sync() -> None:
 async def periodic_all_users_refresh() -> None:
     await asyncio.sleep(5)
     interval = max(10, int(os.getenv("ALL_USERS_REFRESH_INTERVAL", "60")))
-    sem_users = asyncio.Semaphore(24)
 
     async def _run_refresh() -> None:
         try:
@@ -89,30 +248,15 @@ async def periodic_all_users_refresh() -> None:
                 logger.warning("No users found for periodic refresh")
                 return
 
-            async def fetch_and_save_user(user: Dict[str, Any]) -> bool:
-                async with sem_users:
-                    username = user.get("username")
-                    network_id = user.get("network_id", "")
-                    try:
-                        await _retry_async(
-                            lambda: asyncio.wait_for(save_scraped_account(username, network_id), timeout=30),
-                            attempts=3,
-                            base_delay=2.0,
-                            max_delay=15.0,
-                            task_name=f"save_scraped_account {username}",
-                        )
-                        return True
-                    except asyncio.TimeoutError:
-                        logger.warning("⏰ Timeout fetching data for %s", username)
-                        return False
-                    except Exception as e:
-                        logger.warning("❌ Failed to fetch data for %s: %s", username, e)
-                        return False
-
-            tasks = [asyncio.create_task(fetch_and_save_user(user)) for user in all_users]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            # Lines refreshed within the last half interval (by a report or /reports) are skipped; a full
+            # interval would also skip this loop's own lines from the previous tick and halve the rate
+            results = await asyncio.gather(
+                *(refresh_coordinator.ensure_fresh(user.get("network_id", ""), user.get("username"), max_age=interval / 2)
+                  for user in all_users),
+                return_exceptions=True,
+            )
             success_count = sum(1 for result in results if result is True)
-            logger.info("Periodic refresh done: %d/%d users updated", success_count, len(all_users))
+            logger.info("Periodic refresh done: %d/%d users fresh (%s)", success_count, len(all_users), refresh_coordinator.stats())
         except Exception as e:
             logger.exception("Error in periodic_all_users_refresh: %s", e)
 
@@ -138,237 +282,98 @@ async def periodic_daily_report() -> None:
     sem_tokens = asyncio.Semaphore(6)
     sem_users = asyncio.Semaphore(24)
 
-    async def fetch_all_users_data() -> bool:
-        try:
-            logger.info("Starting Phase 1: Fetching all user data from YemenNet...")
-            resp = await _retry_async(
-                lambda: get_all_users(),
-                attempts=3,
-                base_delay=2.0,
-                max_delay=20.0,
-                task_name="get_all_users",
-            )
-            all_users = getattr(resp, "data", None) or []
-            if not all_users:
-                logger.warning("No users found for data fetching")
-                return False
-
-            async def fetch_and_save_user(user: Dict[str, Any]) -> bool:
-                async with sem_users:
-                    username = user.get("username")
-                    network_id = user.get("network_id", "")
-                    try:
-                        # async with SCRAPE_SEMAPHORE:
-                        try:
-                            await _retry_async(
-                                lambda: asyncio.wait_for(save_scraped_account(username, network_id), timeout=30),
-                                attempts=3,
-                                base_delay=2.0,
-                                max_delay=15.0,
-                                task_name=f"save_scraped_account {username}",
-                            )
-                            logger.debug("✅ Successfully fetched data for %s", username)
-                            return True
-                        except asyncio.TimeoutError:
-                            logger.warning("⏰ Timeout fetching data for %s", username)
-                            return False
-                        except Exception as e:
-                            logger.warning("❌ Failed to fetch data for %s: %s", username, e)
-                            return False
-                    except Exception as e:
-                        logger.warning("❌ Error in fetch_and_save_user for %s: %s", username, e)
-                        return False
-
-            tasks = [asyncio.create_task(fetch_and_save_user(user)) for user in all_users]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            success_count = sum(1 for result in results if result is True)
-            total_count = len(all_users)
-            logger.info("Phase 1 completed: %d/%d users successfully fetched", success_count, total_count)
-            return success_count > 0
-        except Exception as e:
-            logger.exception("Error in fetch_all_users_data: %s", e)
-            return False
-
-    def _time_allowed_for_network(times_field: Any, scheduled_hour: int, scheduled_minute: int, scheduled_second: int) -> bool:
-        """
-        Windowed schedule check: allow when an entry is within ±60 seconds of the scheduled time.
-        If times_field is falsy (None/empty), treat as "no restriction" -> allow.
-        Accepted input formats are normalized to HH:MM:SS:
-            - list/tuple/set of strings (e.g., "06", "06:00", "06:00:00")
-            - comma-separated string (e.g., "06:00,18:00:00")
-            - integers representing hours (e.g., 6)
-            - list/tuple entries like (6,), (6, 0), (6, 0, 0)
-        """
-        if not times_field:
-            return True
-
-        def _normalize_item_to_full(item: Any) -> str | None:
-            try:
-                # tuple/list like (h,), (h,m), (h,m,s)
-                if isinstance(item, (list, tuple)):
-                    if len(item) == 0:
-                        return None
-                    h = int(item[0])
-                    m = int(item[1]) if len(item) >= 2 else 0
-                    s = int(item[2]) if len(item) >= 3 else 0
-                    return f"{h:02d}:{m:02d}:{s:02d}"
-                # integer hour
-                if isinstance(item, int):
-                    return f"{item:02d}:00:00"
-                # string: may be comma-separated or single time
-                s = str(item).strip()
-                if not s:
-                    return None
-                parts = s.split(":")
-                if len(parts) == 1:  # HH
-                    h = int(parts[0])
-                    return f"{h:02d}:00:00"
-                if len(parts) == 2:  # HH:MM
-                    h = int(parts[0])
-                    m = int(parts[1])
-                    return f"{h:02d}:{m:02d}:00"
-                # HH:MM:SS (or longer, ignore extras)
-                h = int(parts[0])
-                m = int(parts[1])
-                ssec = int(parts[2])
-                return f"{h:02d}:{m:02d}:{ssec:02d}"
-            except Exception:
-                return None
-
-        # Build normalized set of allowed times (HH:MM:SS)
-        normalized: set[str] = set()
-        if isinstance(times_field, str):
-            raw_items = [i.strip() for i in times_field.split(",") if i.strip()]
-        elif isinstance(times_field, (list, tuple, set)):
-            raw_items = list(times_field)
+    # Lines are refreshed per network; a network renders as soon as its own lines are fresh
+    # (or the refresh deadline passes), so scraping of later networks overlaps rendering/sending.
+    # Lines the periodic loop refreshed within DAILY_REPORT_MAX_AGE are not scraped again.
+    refresh_deadline_s = max(30, int(os.getenv("DAILY_REPORT_REFRESH_DEADLINE", "240")))
+    report_max_age_s = max(0, int(os.getenv("DAILY_REPORT_MAX_AGE", "120")))
+    # Warm-up stage up to this many minutes before each slot (0 disables it). It starts at most half of
+    # DAILY_REPORT_MAX_AGE ahead and skips lines refreshed within a quarter of it, so every line it
+    # leaves fresh is still within DAILY_REPORT_MAX_AGE when the wave checks it and is not scraped again.
+    warmup_s = min(max(0.0, float(os.getenv("DAILY_REPORT_WARMUP_MINUTES", "3") or 0) * 60), report_max_age_s / 2)
+
+    async def refresh_network_lines(network: SelectedNetwork, users: list, deadline: float) -> None:
+        timeout = max(0.0, deadline - asyncio.get_running_loop().time())
+        fresh, total = await refresh_coordinator.ensure_fresh_many(
+            network.network_id, [u.get("username") for u in users], max_age=report_max_age_s, timeout=timeout
+        )
+        if fresh < total:
+            # Lines still scraping at the deadline finish in the background; this report uses their last saved data
+            logger.warning("⏰ Network %s: %d/%d lines fresh at the refresh deadline", network.network_name, fresh, total)
         else:
-            raw_items = [times_field]
+            logger.info("🔄 Network %s: all %d lines fresh", network.network_name, total)
 
-        for it in raw_items:
-            norm = _normalize_item_to_full(it)
-            if norm:
-                normalized.add(norm)
+    async def process_network(row: Dict[str, Any], scheduled: list, report_day: str, deadline: float) -> None:
+        """Refresh, render and deliver one planned (recipient, network) report."""
+        token = str(row["telegram_id"])
+        network_row = {k: v for k, v in row.items() if k != "lines"}
+        network = _network_from_row(network_row)
 
-        # Convert times to seconds-of-day and allow a small tolerance window
-        scheduled_sod = scheduled_hour * 3600 + scheduled_minute * 60 + scheduled_second
-        logger.debug("Normalized schedule entries: %s", sorted(normalized))
-        for t in normalized:
-            try:
-                h, m, s = [int(x) for x in t.split(":", 2)]
-                target_sod = h * 3600 + m * 60 + s
-                if abs(target_sod - scheduled_sod) <= 60:
-                    return True
-            except Exception:
-                continue
-        return False
-
-    async def process_token(token: str, scheduled_hour: int, scheduled_minute: int, scheduled_second: int) -> None:
-        # Get all networks for this user/token
-        chat_user = await chat_user_manager.get(token)
-        if not chat_user:
-            logger.warning("No chat user found for token %s", token)
-            return
-        user_networks = await UserManager.get_networks_for_user(chat_user.chat_user_id)
-        if not user_networks:
-            logger.warning("No networks found for user %s", token)
+        # Fencing: a replica that lost leadership mid-wave must not deliver (the new leader does)
+        if not await still_leader():
+            logger.warning("⏭ Not leader any more; skipping network %s (%s)", network.network_name, token)
             return
-        def fix_network_dict(network: Dict[str, Any]) -> SelectedNetwork:
-            return SelectedNetwork(
-                id = network.get("id"),
-                network_id=network.get("network_id"),
-                network_name=network.get("network_name"),
-                user_name=network.get("user_name"),
-                # Use the correct DB field name (times_to_send_reports)
-                times_to_send_reports=network.get("times_to_send_reports", 15),
-                warning_count_remaining_days=network.get("warning_count_remaining_days", 7),
-                danger_count_remaining_days=network.get("danger_count_remaining_days", 3),
-                warning_percentage_remaining_balance=network.get("warning_percentage_remaining_balance", 30),
-                danger_percentage_remaining_balance=network.get("danger_percentage_remaining_balance", 10),
-                is_active=network.get("is_network_active", False),
-                expiration_date=network.get("expiration_date", None),
-                telegram_id=network.get("telegram_id"),
-                chat_user_id=network.get("chat_user_id"),
-                permissions=network.get("permissions", ""),
-                network_type=network.get("network_type", ""),
+
+        if job_queue_enabled():
+            await job_queue.enqueue(
+                job_queue.JOB_REPORT_NETWORK,
+                {
+                    "token": token,
+                    "network": network_row,
+                    "scheduled": scheduled,
+                    "report_day": report_day,
+                    "max_age": report_max_age_s,
+                    "refresh_timeout": max(0.0, deadline - asyncio.get_running_loop().time()),
+                },
+                idempotency_key=f"report:{_slot_key(token, network.network_id, scheduled, report_day)}",
             )
-        async def process_network(network):
-            network = fix_network_dict(network)
-            # Skip expired networks based on expiration_date (compare dates in Asia/Aden)
+            return
+
+        chat_user = _chat_user_from_row(row)
+        users = row.get("lines") or []
+        try:
+            await refresh_network_lines(network, users, deadline)
+        except Exception:
+            logger.exception("❌ Refreshing lines failed for network %s; reporting last saved data", network.network_name)
+
+        async with sem_tokens:
             try:
-                exp_raw = network.expiration_date
-                if exp_raw:
-                    exp_date = None
-                    if isinstance(exp_raw, str):
-                        try:
-                            exp_date = datetime.fromisoformat(exp_raw).date()
-                        except Exception:
-                            try:
-                                d, m, y = [int(x) for x in exp_raw.replace("/", "-").split("-")]
-                                exp_date = datetime(y, m, d).date()
-                            except Exception:
-                                exp_date = None
-
-                    if exp_date is not None:
-                        today_local = datetime.now(tz).date()
-                        if exp_date < today_local:
-                            logger.info("⏭ Skipping network %s (%s) - expired on %s", network.network_name, token, exp_date.isoformat())
-                            return
-            except Exception:
-                # Do not block processing on parse errors; proceed as if not expired
-                pass
-            if not network.is_active:
-                logger.info("⏭ Skipping network %s (%s) - marked inactive", network.network_name, token)
-                return
-            times_field = SelectedNetwork.from_bitmask_to_times_list(network.times_to_send_reports)
-            logger.info("Network %s times_to_send_reports: %s", network.network_name, times_field)
-            if times_field:
-                allowed = _time_allowed_for_network(times_field, scheduled_hour, scheduled_minute, scheduled_second)
-                logger.info("Network %s (%s) allowed to send at %02d:%02d:%02d: %s", network.network_name, token, scheduled_hour, scheduled_minute, scheduled_second, allowed)
-                if not allowed:
-                    logger.info("⏭ Skipping network %s (%s) for scheduled time %02d:%02d:%02d due to times_to_send setting",
-                                network.network_name, token, scheduled_hour, scheduled_minute, scheduled_second)
+                user_reports = await collect_saved_user_reports(users, sem_users, UserManager, chat_user.order_by)
+                if not user_reports:
+                    logger.info("📭 No data available for network %s", network.network_name)
                     return
 
-            async with sem_tokens:
+                # Backpressure: do not render further ahead while the send queue is saturated
+                if not await send_gateway.wait_for_capacity(timeout=300):
+                    logger.warning("Send queue still congested after 300s; rendering network %s anyway", network.network_name)
+                logger.info("📄 Generating report for network %s with %d users", network.network_name, len(user_reports))
                 try:
-                    users = await UserManager.get_users_by_network(network.network_id)
-                    if not users:
-                        return
-
-                    user_reports = await collect_saved_user_reports(users, sem_users, UserManager,chat_user.order_by)
-                    if not user_reports:
-                        logger.info("📭 No data available for network %s", network.network_name)
-                        return
-
-                    logger.info("📄 Generating report for network %s with %d users", network.network_name, len(user_reports))
-                    try:
-                        images, cleanup_dir = await run_blocking(lambda: generate_images(user_reports, network, chat_user))
-                    except Exception:
-                        logger.exception("❌ Report generation failed for network %s", network.network_name)
-                        return
-
-                    try:
-                        result = await send_images(
-                            bot,
-                            network,
-                            token,
-                            images,
-                            user_reports,
-                            tz,
-                            cleanup_dir,
-                            True,
-                            True,
-                            (scheduled_hour, scheduled_minute, scheduled_second),
-                        )
-                        logger.info("Report send result for network %s: %s", network.network_name, result)
-                    except Exception:
-                        logger.exception("❌ Failed to send images for network %s", network.network_name)
+                    images, cleanup_dir = await generate_images_parallel(user_reports, network, chat_user)
+                except Exception:
+                    logger.exception("❌ Report generation failed for network %s", network.network_name)
+                    return
 
+                try:
+                    result = await send_images(
+                        bot,
+                        network,
+                        token,
+                        images,
+                        user_reports,
+                        tz,
+                        cleanup_dir,
+                        True,
+                        True,
+                        tuple(scheduled),
+                        outbox_run=_outbox_run(scheduled, report_day),
+                        outbox_context={"token": token, "network": network_row, "scheduled": scheduled, "report_day": report_day},
+                    )
+                    logger.info("Report send result for network %s: %s", network.network_name, result)
                 except Exception:
-                    logger.exception("❌ process_network error for network %s", network.network_name)
+                    logger.exception("❌ Failed to send images for network %s", network.network_name)
 
-        # Run all networks for this user concurrently
-        await asyncio.gather(*(process_network(network) for network in user_networks), return_exceptions=True)
+            except Exception:
+                logger.exception("❌ process_network error for network %s", network.network_name)
 
     # Times to send reports each day (hour, minute, second)
     report_times = [
@@ -378,6 +383,13 @@ async def periodic_daily_report() -> None:
         (23, 50, 0),
     ]
 
+    # Queued deliveries resume through the job queue itself; otherwise finish what a previous process left unsent
+    if not job_queue_enabled():
+        try:
+            await resume_undelivered_reports()
+        except Exception:
+            logger.exception("❌ Resuming undelivered reports failed")
+
     while True:
         now = datetime.now(tz)
         # Find the next scheduled time
@@ -390,47 +402,66 @@ async def periodic_daily_report() -> None:
         next_target = min(next_times)
         wait_seconds = (next_target - now).total_seconds()
         logger.info("🕒 Next daily report scheduled at %s (in %.0f seconds)", next_target.strftime("%Y-%m-%d %H:%M:%S"), wait_seconds)
-        await asyncio.sleep(wait_seconds)
+        if warmup_s and wait_seconds > warmup_s:
+            await asyncio.sleep(wait_seconds - warmup_s)
+            try:
+                # Leave a little headroom so the wave starts on time
+                warmed = await asyncio.wait_for(
+                    warm_up_report_slot(next_target, max_age=warmup_s / 2, timeout=warmup_s * 0.8),
+                    timeout=warmup_s * 0.9,
+                )
+                logger.info("🔥 Warmed up for the %s report: %s", next_target.strftime("%H:%M"), warmed)
+            except asyncio.TimeoutError:
+                logger.warning("Warm-up for the %s report did not finish in time", next_target.strftime("%H:%M"))
+            except Exception:
+                logger.exception("❌ Warm-up for the %s report failed", next_target.strftime("%H:%M"))
+            wait_seconds = (next_target - datetime.now(tz)).total_seconds()
+        await asyncio.sleep(max(0.0, wait_seconds))
 
         try:
             logger.info("🚀 Starting daily report process...")
-            fetch_success = await fetch_all_users_data()
-            if not fetch_success:
-                logger.warning("⚠️ Data fetching phase failed, but continuing with available data")
-
-            await asyncio.sleep(5)
-            logger.info("📖 Starting Phase 2: Reading saved data and generating reports...")
+            deadline = asyncio.get_running_loop().time() + refresh_deadline_s
 
-            # determine scheduled time that just fired
-            scheduled_hour = next_target.hour
-            scheduled_minute = next_target.minute
-            scheduled_second = next_target.second
+            if not await still_leader():
+                logger.warning("⏭ Not leader any more; skipping this daily report wave")
+                continue
 
-            tokens = await UserManager.get_all_tokens()
-            logger.info("Fetched %d networks for daily report processing", len(tokens))
-            logger.info("Networks: %s", tokens)
+            # One planning query: every (recipient, network) due at this slot, with its lines;
+            # expiry, is_active and times_to_send_reports are filtered in SQL
+            scheduled = [next_target.hour, next_target.minute, next_target.second]
+            slot_bit = SelectedNetwork.from_times_list_to_bitmask([next_target.strftime("%H:%M:%S")])
+            report_day = next_target.date().isoformat()
+            due = await UserManager.get_due_report_deliveries(slot_bit, next_target.date())
 
-            if not tokens:
-                logger.info("📭 No networks found for daily report")
+            if not due:
+                logger.info("📭 No networks due for the daily report")
                 continue
 
-            logger.info("👥 Processing %d networks for report generation", len(tokens))
-            tasks = [asyncio.create_task(process_token(net, scheduled_hour, scheduled_minute, scheduled_second)) for net in tokens]
+            logger.info("👥 %d network reports due for %d recipients", len(due), len({row["telegram_id"] for row in due}))
+            # Report sends queue behind interactive replies in the send gateway
+            with send_priority(Priority.BULK):
+                tasks = [asyncio.create_task(process_network(row, scheduled, report_day, deadline)) for row in due]
             await asyncio.gather(*tasks, return_exceptions=True)
             logger.info("✅ Daily report process completed")
 
         except Exception as e:
             logger.exception("❌ Error in periodic_daily_report: %s", e)
 
+
 async def cache_cleaner() -> None:
-    """Periodically clear in-memory cache to avoid stale data accumulation."""
+    """Periodically sweep expired entries from the in-memory cache.
+
+    Entries expire on their own (jittered) TTLs; wiping the whole cache at once made every
+    key miss at the same moment and stampede the DB.
+    """
     # initial short delay so startup can finish
     await asyncio.sleep(5)
+    interval = max(5, int(os.getenv("CACHE_SWEEP_INTERVAL", "60") or 60))
     while True:
         try:
-            logger.info("🧹 Running cache cleaner: clearing in-memory cache")
-            CacheManager.clear()
+            expired = CacheManager.expire()
+            if expired:
+                logger.debug("🧹 Cache sweep: %d expired entries dropped (%s)", expired, CacheManager.stats())
         except Exception as e:
             logger.exception("Error in cache_cleaner: %s", e)
-        # run every hour
-        await asyncio.sleep(60 * 60)
+        await asyncio.sleep(interval)
@@ -44,6 +44,7 @@ from bot.user_manager import UserManager
 from bot.utils_shared import save_scraped_account
 from bot.table_report import TableReportGenerator
 from bot.report_sender import collect_saved_user_reports, generate_images, send_images
+from bot.refresh_coordinator import refresh_coordinator
 from zoneinfo import ZoneInfo
 from html import escape
 import pytz
@@ -3726,7 +3727,7 @@ async def _run_reportdate_for_scope(message: types.Message, scope: str, report_d
             waiting = await message.answer(f"📊 جاري تجهيز تقرير {report_date} للشبكة {net_name}...")
             try:
                 loop = __import__('asyncio').get_running_loop()
-                image_paths, out_dir = await loop.run_in_executor(EXEC, lambda: generate_images(reports, net_obj, chat_user,report_date))
+                images, out_dir = await loop.run_in_executor(EXEC, lambda: generate_images(reports, net_obj, chat_user,report_date))
             except Exception as e:
                 logger.exception("Failed to generate historical report images: %s", e)
                 try:
@@ -3740,7 +3741,7 @@ async def _run_reportdate_for_scope(message: types.Message, scope: str, report_d
                     tz = ZoneInfo("Asia/Aden")
                 except Exception:
                     tz = pytz.timezone("Asia/Aden")
-                result = await send_images(bot, net_obj, token_id, image_paths, reports, tz, cleanup_dir=out_dir, sendToAdmin=False, isDailyReport=False, report_date=report_date)
+                result = await send_images(bot, net_obj, token_id, images, reports, tz, cleanup_dir=out_dir, sendToAdmin=False, isDailyReport=False, report_date=report_date)
                 if result.get("sent", 0) == 0 and not result.get("chat_not_found"):
                     await bot.send_message(chat_id=int(token_id), text="⚠️ لم يتم إرسال أي صفحات من التقرير.")
             finally:
@@ -4031,11 +4032,11 @@ async def mysummary_command_core(message: types.Message, network, chat_user,toke
         add_log(f"mysummary_start")
         async def fetch_and_collect(u: dict) -> None:
             try:
-                # async with SCRAPE_SEMAPHORE:
+                # Skips the scrape when the line was refreshed in the last minute (periodic loop or a report)
                 try:
-                    await asyncio.wait_for(save_scraped_account(u["username"], network_id), timeout=30)
-                except asyncio.TimeoutError:
-                    logger.warning("Timeout while saving scraped account %s", u.get("username"))
+                    fresh = await refresh_coordinator.ensure_fresh(network_id, u["username"], max_age=60, timeout=30)
+                    if not fresh:
+                        logger.warning("Line %s not refreshed in time; using last saved data", u.get("username"))
                 except Exception:
                     logger.debug("Failed to fetch/save live for %s", u.get("username"), exc_info=True)
 
@@ -4061,9 +4062,9 @@ async def mysummary_command_core(message: types.Message, network, chat_user,toke
             return
         # Use the current running loop to run blocking image generation in the executor
         loop = __import__('asyncio').get_running_loop()
-        # generate_images returns (images, out_dir) and writes into a unique invocation directory
+        # generate_images returns (page bytes, cleanup_dir); pages stay in memory so cleanup_dir is None
         try:
-            image_paths, out_dir = await loop.run_in_executor(EXEC, lambda: generate_images(reports,network,chat_user))
+            images, out_dir = await loop.run_in_executor(EXEC, lambda: generate_images(reports,network,chat_user))
         except Exception as e:
             logger.exception("Failed to generate report images for reports: %s", e)
             try:
@@ -4079,7 +4080,7 @@ async def mysummary_command_core(message: types.Message, network, chat_user,toke
                 tz = ZoneInfo("Asia/Aden")
             except Exception:
                 tz = pytz.timezone("Asia/Aden")
-            result = await send_images(bot,network, token_id, image_paths, reports, tz, cleanup_dir=out_dir, sendToAdmin=False,isDailyReport=False)
+            result = await send_images(bot,network, token_id, images, reports, tz, cleanup_dir=out_dir, sendToAdmin=False,isDailyReport=False)
             # Optionally inform the user about the result
             try:
                 if result.get('sent', 0) == 0 and not result.get('chat_not_found'):
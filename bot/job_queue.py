@@ -0,0 +1,291 @@
+"""Durable job queue on the bot's PostgreSQL database.
+
+Background work (scraping lines, rendering a network, delivering a report)
+used to live only in in-process tasks, so a restart mid-wave lost it and it
+could not be spread over more processes. Jobs are rows in `bot_jobs`:
+
+- `enqueue` takes an optional idempotency key; enqueueing the same key again
+  returns the existing job instead of creating a duplicate;
+- workers claim due jobs with `FOR UPDATE SKIP LOCKED`, so any number of
+  processes can poll the same table without handing a job out twice;
+- a claimed job carries a lease that the worker extends by heartbeat; jobs
+  whose lease expires (worker crashed or hung) go back to the queue;
+- failures are retried with exponential backoff until `max_attempts`, then
+  the job is marked `dead` with its last error.
+
+`JobWorker` runs registered async handlers (`handler(payload) -> result`) for
+the job types it serves.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from psycopg2.extras import Json
+
+from bot.local_postgres import execute, fetch_all, fetch_one
+from bot.utils_shared import run_blocking
+
+logger = logging.getLogger("YemenNetBot.job_queue")
+
+JOB_REPORT_NETWORK = "report-network"
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bot_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    job_type TEXT NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    idempotency_key TEXT UNIQUE,
+    status TEXT NOT NULL DEFAULT 'queued',
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    locked_by TEXT,
+    lease_until TIMESTAMPTZ,
+    last_error TEXT,
+    result JSONB,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    finished_at TIMESTAMPTZ
+);
+CREATE INDEX IF NOT EXISTS bot_jobs_due_idx ON bot_jobs (priority, run_at, id) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS bot_jobs_lease_idx ON bot_jobs (lease_until) WHERE status = 'running';
+"""
+
+_CLAIM = """
+UPDATE bot_jobs j
+SET status = 'running',
+    locked_by = %s,
+    lease_until = now() + make_interval(secs => %s),
+    attempts = j.attempts + 1,
+    updated_at = now()
+WHERE j.id IN (
+    SELECT id FROM bot_jobs
+    WHERE status = 'queued' AND run_at <= now() AND job_type = ANY(%s)
+    ORDER BY priority, run_at, id
+    FOR UPDATE SKIP LOCKED
+    LIMIT %s
+)
+RETURNING j.*
+"""
+
+# Expired leases: back to the queue (after backoff) or dead when out of attempts
+_REAP = """
+UPDATE bot_jobs
+SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END,
+    run_at = now() + make_interval(secs => LEAST(%s, %s * power(2, GREATEST(attempts - 1, 0)))),
+    last_error = concat_ws(E'\\n', last_error, 'lease expired (worker ' || COALESCE(locked_by, '?') || ')'),
+    locked_by = NULL,
+    lease_until = NULL,
+    finished_at = CASE WHEN attempts >= max_attempts THEN now() ELSE NULL END,
+    updated_at = now()
+WHERE status = 'running' AND lease_until < now()
+"""
+
+_FAIL = """
+UPDATE bot_jobs
+SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END,
+    run_at = now() + make_interval(secs => LEAST(%s, %s * power(2, GREATEST(attempts - 1, 0)))),
+    last_error = %s,
+    locked_by = NULL,
+    lease_until = NULL,
+    finished_at = CASE WHEN attempts >= max_attempts THEN now() ELSE NULL END,
+    updated_at = now()
+WHERE id = %s AND locked_by = %s AND status = 'running'
+RETURNING status
+"""
+
+RETRY_BASE_SECONDS = 10.0
+RETRY_MAX_SECONDS = 600.0
+
+
+def _json(value: Any) -> Json:
+    # Payloads carry DB rows; dates and Decimals are stored as strings
+    return Json(value, dumps=partial(json.dumps, default=str, ensure_ascii=False))
+
+
+def ensure_schema() -> None:
+    """Create the jobs table and its indexes if they do not exist yet (idempotent)."""
+    execute(_SCHEMA)
+
+
+def _sync_enqueue(job_type: str, payload: Dict[str, Any], idempotency_key: Optional[str],
+                  run_at: Optional[datetime], priority: int, max_attempts: int) -> int:
+    row = fetch_one(
+        """
+        INSERT INTO bot_jobs (job_type, payload, idempotency_key, run_at, priority, max_attempts)
+        VALUES (%s, %s, %s, COALESCE(%s, now()), %s, %s)
+        ON CONFLICT (idempotency_key) DO NOTHING
+        RETURNING id
+        """,
+        [job_type, _json(payload or {}), idempotency_key, run_at, priority, max_attempts],
+    )
+    if row:
+        return row["id"]
+    existing = fetch_one("SELECT id FROM bot_jobs WHERE idempotency_key = %s", [idempotency_key])
+    return existing["id"]
+
+
+def _sync_claim(worker_id: str, job_types: List[str], limit: int, lease_seconds: float) -> List[Dict[str, Any]]:
+    execute(_REAP, [RETRY_MAX_SECONDS, RETRY_BASE_SECONDS])
+    return fetch_all(_CLAIM, [worker_id, lease_seconds, list(job_types), limit])
+
+
+def _sync_heartbeat(job_id: int, worker_id: str, lease_seconds: float) -> bool:
+    return execute(
+        "UPDATE bot_jobs SET lease_until = now() + make_interval(secs => %s), updated_at = now() "
+        "WHERE id = %s AND locked_by = %s AND status = 'running'",
+        [lease_seconds, job_id, worker_id],
+    ) == 1
+
+
+def _sync_complete(job_id: int, worker_id: str, result: Any) -> bool:
+    return execute(
+        "UPDATE bot_jobs SET status = 'done', result = %s, locked_by = NULL, lease_until = NULL, "
+        "finished_at = now(), updated_at = now() WHERE id = %s AND locked_by = %s AND status = 'running'",
+        [_json(result) if result is not None else None, job_id, worker_id],
+    ) == 1
+
+
+def _sync_fail(job_id: int, worker_id: str, error: str) -> Optional[str]:
+    row = fetch_one(_FAIL, [RETRY_MAX_SECONDS, RETRY_BASE_SECONDS, error[:4000], job_id, worker_id])
+    return row["status"] if row else None
+
+
+def _sync_stats() -> List[Dict[str, Any]]:
+    return fetch_all("SELECT job_type, status, count(*) AS n FROM bot_jobs GROUP BY job_type, status ORDER BY job_type, status")
+
+
+async def enqueue(job_type: str, payload: Optional[Dict[str, Any]] = None, *, idempotency_key: Optional[str] = None,
+                  run_at: Optional[datetime] = None, priority: int = 0, max_attempts: int = 5) -> int:
+    """Add a job (lower priority runs first); returns its id, or the existing job's id for a known idempotency key."""
+    return await run_blocking(partial(_sync_enqueue, job_type, payload or {}, idempotency_key, run_at, priority, max_attempts))
+
+
+async def claim(worker_id: str, job_types: Iterable[str], limit: int = 1, lease_seconds: float = 60.0) -> List[Dict[str, Any]]:
+    return await run_blocking(partial(_sync_claim, worker_id, list(job_types), limit, lease_seconds))
+
+
+async def heartbeat(job_id: int, worker_id: str, lease_seconds: float = 60.0) -> bool:
+    """Extend the lease; False means the job is no longer ours (lease expired and was reclaimed)."""
+    return await run_blocking(partial(_sync_heartbeat, job_id, worker_id, lease_seconds))
+
+
+async def complete(job_id: int, worker_id: str, result: Any = None) -> bool:
+    return await run_blocking(partial(_sync_complete, job_id, worker_id, result))
+
+
+async def fail(job_id: int, worker_id: str, error: str) -> Optional[str]:
+    """Record a failure; returns the new status ('queued' for a retry, 'dead' when out of attempts)."""
+    return await run_blocking(partial(_sync_fail, job_id, worker_id, error))
+
+
+async def stats() -> Dict[str, Dict[str, int]]:
+    out: Dict[str, Dict[str, int]] = {}
+    for row in await run_blocking(_sync_stats):
+        out.setdefault(row["job_type"], {})[row["status"]] = int(row["n"])
+    return out
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class JobWorker:
+    """Claims and runs jobs for the registered types with bounded concurrency."""
+
+    def __init__(self, handlers: Optional[Dict[str, JobHandler]] = None, concurrency: int = 4,
+                 lease_seconds: float = 60.0, poll_interval: float = 2.0, worker_id: Optional[str] = None):
+        self.handlers: Dict[str, JobHandler] = dict(handlers or {})
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or default_worker_id()
+        self._running: Dict[int, asyncio.Task] = {}
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, job_type: str, handler: JobHandler) -> None:
+        self.handlers[job_type] = handler
+
+    async def _heartbeat(self, job_id: int, job_task: asyncio.Task) -> None:
+        while not job_task.done():
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if not await heartbeat(job_id, self.worker_id, self.lease_seconds):
+                    # Another worker may already have re-claimed it; two copies must not run side by side
+                    logger.warning("Lost lease on job %s; cancelling it here", job_id)
+                    job_task.cancel()
+                    return
+            except Exception:
+                logger.warning("Heartbeat for job %s failed", job_id, exc_info=True)
+
+    async def _run_job(self, job: Dict[str, Any]) -> None:
+        job_id, job_type = job["id"], job["job_type"]
+        handler = self.handlers[job_type]
+        task = asyncio.current_task()
+        beat = asyncio.create_task(self._heartbeat(job_id, task))
+        try:
+            result = await handler(job.get("payload") or {})
+        except asyncio.CancelledError:
+            # Shutdown: leave the row as is; its lease expires and another worker picks it up
+            raise
+        except Exception as e:
+            try:
+                status = await fail(job_id, self.worker_id, f"{type(e).__name__}: {e}")
+            except Exception:
+                # The lease expires and the job is re-claimed, which counts as the retry
+                logger.error("Recording failure of job %s (%s) failed: %s", job_id, job_type, e, exc_info=True)
+            else:
+                log = logger.error if status == "dead" else logger.warning
+                log("Job %s (%s) attempt %s failed: %s -> %s", job_id, job_type, job.get("attempts"), e, status)
+        else:
+            try:
+                await complete(job_id, self.worker_id, result)
+            except Exception:
+                # Left running: its lease expires and the job runs again (handlers are idempotent)
+                logger.error("Completing job %s (%s) failed; it will be re-claimed after its lease", job_id, job_type, exc_info=True)
+            else:
+                logger.debug("Job %s (%s) done", job_id, job_type)
+        finally:
+            beat.cancel()
+
+    async def run(self) -> None:
+        logger.info("Job worker %s serving %s", self.worker_id, ", ".join(sorted(self.handlers)))
+        while not self._stopping.is_set():
+            free = self.concurrency - len(self._running)
+            jobs: List[Dict[str, Any]] = []
+            if free > 0 and self.handlers:
+                try:
+                    jobs = await claim(self.worker_id, self.handlers.keys(), free, self.lease_seconds)
+                except Exception:
+                    logger.warning("Claiming jobs failed", exc_info=True)
+            for job in jobs:
+                task = asyncio.create_task(self._run_job(job))
+                self._running[job["id"]] = task
+                task.add_done_callback(lambda _t, job_id=job["id"]: self._running.pop(job_id, None))
+            if not jobs:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        for task in list(self._running.values()):
+            task.cancel()
+        await asyncio.gather(*self._running.values(), return_exceptions=True)
+
+    def start(self) -> asyncio.Task:
+        """Run the worker in the background; the task is kept on the worker so it is not garbage-collected."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    def stop(self) -> None:
+        self._stopping.set()
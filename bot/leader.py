@@ -0,0 +1,299 @@
+"""Leader election for scheduled loops across bot replicas.
+
+Every replica of `bot.bot` serves interactive handlers, but a scheduled loop
+(daily reports, the all-users refresh) must run on exactly one of them or
+customers get duplicate reports and the portal is scraped twice. Each loop
+has its own `LeaderElector`:
+
+- leadership is a session-level Postgres advisory lock held on a dedicated
+  connection (not a pooled one), so it is released when the holder's session
+  ends, including when the replica dies (TCP keepalives bound how long that
+  takes);
+- candidates retry the lock every LEADER_RETRY_INTERVAL seconds; the leader
+  re-checks that it still holds it every LEADER_CHECK_INTERVAL seconds and
+  cancels the loop as soon as the database says it does not (or the lock
+  connection is gone). A check that merely fails or times out is retried at
+  the next interval. The lock connection is only used from the elector's own
+  thread, so checks never queue behind scraper work in the shared executor;
+- every new leader bumps a term in `bot_leader_terms`. That term is the fencing
+  token: before a side effect, the loop calls `still_leader()`, which fails
+  for a deposed leader whose check has not noticed yet (a term read that
+  errors is retried, not taken as a lost term).
+
+Set LEADER_ELECTION_ENABLED=0 to run the loops directly (single replica).
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import socket
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import psycopg2
+
+from bot.local_postgres import _db_config, fetch_one
+from bot.utils_shared import run_blocking
+
+logger = logging.getLogger("YemenNetBot.leader")
+
+# First half of the two-int advisory lock key; keeps our locks apart from any other user of the database
+_LOCK_CLASS = 0x59_4E_42  # "YNB"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bot_leader_terms (
+    name TEXT PRIMARY KEY,
+    term BIGINT NOT NULL DEFAULT 0,
+    holder TEXT,
+    acquired_at TIMESTAMPTZ NOT NULL DEFAULT now()
+)
+"""
+
+_BUMP_TERM = """
+INSERT INTO bot_leader_terms (name, term, holder, acquired_at) VALUES (%s, 1, %s, now())
+ON CONFLICT (name) DO UPDATE SET term = bot_leader_terms.term + 1, holder = EXCLUDED.holder, acquired_at = now()
+RETURNING term
+"""
+
+_HOLDS_LOCK = """
+SELECT EXISTS (
+    SELECT 1 FROM pg_locks
+    WHERE locktype = 'advisory' AND classid = %s AND objid = %s AND objsubid = 2
+      AND pid = pg_backend_pid() AND granted
+)
+"""
+
+_current: contextvars.ContextVar[Optional["LeaderElector"]] = contextvars.ContextVar("leader_elector", default=None)
+
+
+def election_enabled() -> bool:
+    return os.getenv("LEADER_ELECTION_ENABLED", "1").strip().lower() not in {"0", "false", "no"}
+
+
+def _lock_key(name: str) -> int:
+    # Postgres advisory lock keys are int4; keep it positive so it reads the same in pg_locks.objid (oid)
+    return zlib.crc32(name.encode("utf-8")) & 0x7FFFFFFF
+
+
+def _connect():
+    conn = psycopg2.connect(
+        **_db_config(),
+        keepalives=1,
+        keepalives_idle=int(os.getenv("LEADER_KEEPALIVE_IDLE", "10") or 10),
+        keepalives_interval=5,
+        keepalives_count=3,
+    )
+    conn.autocommit = True
+    return conn
+
+
+def _sync_acquire(name: str, holder: str):
+    """Try the lock on a fresh connection; returns (conn, term) when we became leader, else None."""
+    conn = _connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(%s, %s)", [_LOCK_CLASS, _lock_key(name)])
+            if not cur.fetchone()[0]:
+                conn.close()
+                return None
+            cur.execute(_SCHEMA)
+            cur.execute(_BUMP_TERM, [name, holder])
+            return conn, cur.fetchone()[0]
+    except Exception:
+        conn.close()
+        raise
+
+
+def _sync_check(conn, name: str) -> bool:
+    with conn.cursor() as cur:
+        cur.execute(_HOLDS_LOCK, [_LOCK_CLASS, _lock_key(name)])
+        return bool(cur.fetchone()[0])
+
+
+def _sync_release(conn, name: str) -> None:
+    try:
+        if not conn.closed:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(%s, %s)", [_LOCK_CLASS, _lock_key(name)])
+    finally:
+        conn.close()
+
+
+def _sync_current_term(name: str) -> Optional[int]:
+    row = fetch_one("SELECT term FROM bot_leader_terms WHERE name = %s", [name])
+    return row["term"] if row else None
+
+
+class LeaderElector:
+    """Runs one scheduled loop on whichever replica holds the loop's advisory lock."""
+
+    def __init__(self, name: str, holder: Optional[str] = None, retry_interval: float = 10.0,
+                 check_interval: float = 5.0):
+        self.name = name
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.retry_interval = retry_interval
+        self.check_interval = check_interval
+        self.term: Optional[int] = None
+        self._conn = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stopping = asyncio.Event()
+        self._stats = {"elections_won": 0, "leadership_lost": 0, "loop_restarts": 0, "failed_checks": 0}
+
+    @property
+    def is_leader(self) -> bool:
+        return self.term is not None
+
+    async def _call(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a lock-connection call on this elector's own thread, bounded by a timeout."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"leader-{self.name}")
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(
+            loop.run_in_executor(self._executor, partial(func, *args)), timeout=max(5.0, self.check_interval)
+        )
+
+    async def _try_acquire(self) -> bool:
+        try:
+            acquired = await self._call(_sync_acquire, self.name, self.holder)
+        except Exception as e:
+            logger.warning("Leader election for %s failed: %s", self.name, e)
+            return False
+        if not acquired:
+            return False
+        self._conn, self.term = acquired
+        self._stats["elections_won"] += 1
+        logger.info("👑 %s: this replica is leader (term %s)", self.name, self.term)
+        return True
+
+    def _conn_lost(self) -> bool:
+        return self._conn is None or bool(getattr(self._conn, "closed", 0))
+
+    async def _holds_lock(self) -> Optional[bool]:
+        """Whether the lock is still ours; None when the check itself failed and leadership is unknown."""
+        if self._conn_lost():
+            return False
+        try:
+            return await self._call(_sync_check, self._conn, self.name)
+        except Exception as e:
+            # A closed session has released its advisory locks; anything else (timeout, transient error) is unknown
+            if self._conn_lost():
+                return False
+            self._stats["failed_checks"] += 1
+            logger.warning("Leadership check for %s failed, retrying at the next interval: %s", self.name, e or type(e).__name__)
+            return None
+
+    async def _resign(self) -> None:
+        conn, self._conn, self.term = self._conn, None, None
+        if conn is not None:
+            try:
+                await self._call(_sync_release, conn, self.name)
+            except Exception:
+                logger.debug("Releasing leadership of %s failed", self.name, exc_info=True)
+
+    async def still_leader(self, attempts: int = 3, backoff: float = 0.5) -> bool:
+        """Fencing check: False once the database records a newer term than ours.
+
+        A check that fails is retried; if it keeps failing while our lock connection is open we
+        keep going (the lock check deposes us as soon as the lock is really gone).
+        """
+        for attempt in range(1, attempts + 1):
+            term = self.term
+            if term is None:
+                return False
+            try:
+                return await run_blocking(partial(_sync_current_term, self.name)) == term
+            except Exception as e:
+                self._stats["failed_checks"] += 1
+                logger.warning("Fencing check for %s failed (attempt %d/%d): %s", self.name, attempt, attempts, e)
+            if attempt < attempts:
+                await asyncio.sleep(backoff * attempt)
+        return self.term is not None and not self._conn_lost()
+
+    async def _lead(self, loop_factory: Callable[[], Awaitable[Any]]) -> None:
+        token = _current.set(self)
+        try:
+            task = asyncio.create_task(loop_factory())
+        finally:
+            _current.reset(token)
+        try:
+            while not self._stopping.is_set():
+                try:
+                    await asyncio.wait_for(asyncio.shield(task), timeout=self.check_interval)
+                except asyncio.TimeoutError:
+                    pass
+                except Exception:
+                    logger.exception("%s loop crashed", self.name)
+                if task.done():
+                    self._stats["loop_restarts"] += 1
+                    await asyncio.sleep(self.retry_interval)
+                    token = _current.set(self)
+                    try:
+                        task = asyncio.create_task(loop_factory())
+                    finally:
+                        _current.reset(token)
+                    continue
+                if await self._holds_lock() is False:
+                    self._stats["leadership_lost"] += 1
+                    logger.warning("%s: lost leadership (term %s); stopping the loop", self.name, self.term)
+                    return
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await self._resign()
+
+    async def run(self, loop_factory: Callable[[], Awaitable[Any]]) -> None:
+        """Campaign until stopped; while leader, run `loop_factory()` (restarted if it exits)."""
+        try:
+            while not self._stopping.is_set():
+                if await self._try_acquire():
+                    await self._lead(loop_factory)
+                    continue
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.retry_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "leader": self.is_leader, "term": self.term}
+
+
+_electors: Dict[str, LeaderElector] = {}
+
+
+async def run_as_leader(name: str, loop_factory: Callable[[], Awaitable[Any]]) -> None:
+    """Run a scheduled loop on one replica only (or directly when election is disabled)."""
+    if not election_enabled():
+        await loop_factory()
+        return
+    elector = LeaderElector(
+        name,
+        retry_interval=float(os.getenv("LEADER_RETRY_INTERVAL", "10") or 10),
+        check_interval=float(os.getenv("LEADER_CHECK_INTERVAL", "5") or 5),
+    )
+    _electors[name] = elector
+    await elector.run(loop_factory)
+
+
+async def still_leader() -> bool:
+    """Fencing check for code running inside a `run_as_leader` loop; always True outside one."""
+    elector = _current.get()
+    return True if elector is None else await elector.still_leader()
+
+
+def stop_all() -> None:
+    for elector in _electors.values():
+        elector.stop()
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return {name: elector.stats() for name, elector in _electors.items()}
@@ -1,13 +1,20 @@
+import logging
 import os
 import re
 import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Any, Iterable, Mapping, Optional
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional
 
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
 from psycopg2.extras import RealDictCursor
 
+logger = logging.getLogger("YemenNetBot.local_postgres")
+
 
 @dataclass
 class DBResponse:
@@ -45,18 +52,298 @@ def _db_config() -> dict[str, Any]:
     }
 
 
-_thread = threading.local()
+class PoolTimeoutError(psycopg2.OperationalError):
+    """Raised when no pooled connection becomes available within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Bounded, thread-safe psycopg2 connection pool.
 
+    - At most `maxconn` connections exist at once; callers beyond that wait up
+      to `timeout` seconds for one to be returned.
+    - Connections are health-checked on checkout and replaced transparently
+      when broken.
+    - Idle connections above `minconn` are closed after `max_idle` seconds.
+    """
 
-def get_conn():
-    conn = getattr(_thread, "conn", None)
-    if conn is None or getattr(conn, "closed", 1):
-        conn = psycopg2.connect(**_db_config())
+    def __init__(
+        self,
+        minconn: int,
+        maxconn: int,
+        *,
+        timeout: float = 30.0,
+        max_idle: float = 300.0,
+        check_after: float = 5.0,
+        connect: Optional[Callable[[], Any]] = None,
+    ):
+        if maxconn < 1:
+            raise ValueError("maxconn must be >= 1")
+        self.minconn = max(0, min(minconn, maxconn))
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self._connect_fn = connect or (lambda: psycopg2.connect(**_db_config()))
+        self._cond = threading.Condition()
+        self._idle: deque = deque()  # (conn, returned_at)
+        self._in_use: set[int] = set()
+        self._opening = 0
+        self._waiting = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "connects": 0,
+            "reconnects": 0,
+            "discarded": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+            "peak_in_use": 0,
+        }
+
+    def _size(self) -> int:
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def _new_conn(self):
+        conn = self._connect_fn()
         # Autocommit reduces the chance of leaked open transactions when running
         # many short queries in threadpool workers.
         conn.autocommit = True
-        _thread.conn = conn
-    return conn
+        return conn
+
+    @staticmethod
+    def _close_quietly(conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn, idle_for: float) -> bool:
+        if getattr(conn, "closed", 1):
+            return False
+        try:
+            status = conn.get_transaction_status()
+        except Exception:
+            return False
+        if status == TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if idle_for < self.check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+                cur.fetchone()
+            return True
+        except Exception:
+            return False
+
+    def _reap_idle_locked(self, now: float) -> list:
+        stale = []
+        while len(self._idle) + len(self._in_use) > self.minconn and self._idle:
+            conn, returned_at = self._idle[0]
+            if now - returned_at <= self.max_idle:
+                break
+            self._idle.popleft()
+            stale.append(conn)
+        return stale
+
+    def getconn(self, timeout: Optional[float] = None):
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+        with self._cond:
+            stale = self._reap_idle_locked(started)
+            while True:
+                if self._closed:
+                    raise psycopg2.InterfaceError("connection pool is closed")
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    self._in_use.add(id(conn))
+                    break
+                if self._size() < self.maxconn:
+                    conn, returned_at = None, None
+                    self._opening += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeoutError(
+                        f"no database connection available within {timeout:.1f}s "
+                        f"(pool size {self.maxconn}, in use {len(self._in_use)})"
+                    )
+                waited = True
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        for c in stale:
+            self._close_quietly(c)
+
+        if conn is None:
+            try:
+                conn = self._new_conn()
+            except Exception:
+                with self._cond:
+                    self._opening -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._opening -= 1
+                self._in_use.add(id(conn))
+                self._stats["connects"] += 1
+        elif not self._is_healthy(conn, time.monotonic() - returned_at):
+            self._close_quietly(conn)
+            try:
+                fresh = self._new_conn()
+            except Exception:
+                with self._cond:
+                    self._in_use.discard(id(conn))
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._in_use.discard(id(conn))
+                self._in_use.add(id(fresh))
+                self._stats["reconnects"] += 1
+            logger.info("Replaced broken pooled database connection")
+            conn = fresh
+
+        wait_ms = (time.monotonic() - started) * 1000.0
+        with self._cond:
+            st = self._stats
+            st["checkouts"] += 1
+            st["waits"] += 1 if waited else 0
+            st["wait_ms_total"] += wait_ms
+            st["wait_ms_max"] = max(st["wait_ms_max"], wait_ms)
+            st["peak_in_use"] = max(st["peak_in_use"], len(self._in_use))
+        if waited and wait_ms > 1000:
+            logger.warning("Waited %.0f ms for a database connection (pool saturated at %d)", wait_ms, self.maxconn)
+        return conn
+
+    def putconn(self, conn, discard: bool = False) -> None:
+        if not discard and not getattr(conn, "closed", 1):
+            try:
+                if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+        else:
+            discard = True
+
+        now = time.monotonic()
+        with self._cond:
+            self._in_use.discard(id(conn))
+            if discard or self._closed:
+                self._stats["discarded"] += 1 if discard else 0
+                to_close = [conn]
+            else:
+                self._idle.append((conn, now))
+                to_close = []
+            to_close.extend(self._reap_idle_locked(now))
+            self._cond.notify()
+        for c in to_close:
+            self._close_quietly(c)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        conn = self.getconn(timeout)
+        discard = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # The connection may be dead; never hand it out again.
+            discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    def fill(self) -> None:
+        """Open connections until `minconn` exist (best effort)."""
+        while True:
+            with self._cond:
+                if self._closed or self._size() >= self.minconn:
+                    return
+                self._opening += 1
+            try:
+                conn = self._new_conn()
+            except Exception:
+                with self._cond:
+                    self._opening -= 1
+                logger.warning("Could not pre-open pooled database connection", exc_info=True)
+                return
+            with self._cond:
+                self._opening -= 1
+                self._stats["connects"] += 1
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle = [c for c, _ in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for c in idle:
+            self._close_quietly(c)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            st = dict(self._stats)
+            in_use = len(self._in_use)
+            st.update(
+                {
+                    "min": self.minconn,
+                    "max": self.maxconn,
+                    "size": self._size(),
+                    "in_use": in_use,
+                    "idle": len(self._idle),
+                    "waiting": self._waiting,
+                    "saturation": round(in_use / self.maxconn, 3),
+                    "wait_ms_avg": round(st["wait_ms_total"] / st["checkouts"], 3) if st["checkouts"] else 0.0,
+                }
+            )
+            return st
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                pool = ConnectionPool(
+                    _env_int("LOCAL_PG_POOL_MIN", 1),
+                    _env_int("LOCAL_PG_POOL_MAX", 16),
+                    timeout=float(_env_int("LOCAL_PG_POOL_TIMEOUT", 30)),
+                    max_idle=float(_env_int("LOCAL_PG_POOL_MAX_IDLE", 300)),
+                )
+                pool.fill()
+                _pool = pool
+    return _pool
+
+
+def connection(timeout: Optional[float] = None):
+    """Context manager yielding a pooled connection: `with connection() as conn: ...`."""
+    return get_pool().connection(timeout)
+
+
+def pool_stats() -> dict[str, Any]:
+    """Checkout/wait/saturation counters for the shared pool."""
+    return get_pool().stats() if _pool is not None else {}
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
 
 
 def _validate_ident(name: str) -> None:
@@ -70,39 +357,34 @@ def _validate_type_name(name: str) -> None:
 
 
 def fetch_all(query: str, params: Optional[Iterable[Any]] = None) -> list[dict[str, Any]]:
-    conn = get_conn()
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
         cur.execute(query, params)
         rows = cur.fetchall() or []
         return [dict(r) for r in rows]
 
 
 def fetch_one(query: str, params: Optional[Iterable[Any]] = None) -> Optional[dict[str, Any]]:
-    conn = get_conn()
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
         cur.execute(query, params)
         row = cur.fetchone()
         return dict(row) if row else None
 
 
 def execute(query: str, params: Optional[Iterable[Any]] = None) -> int:
-    conn = get_conn()
-    with conn.cursor() as cur:
+    with connection() as conn, conn.cursor() as cur:
         cur.execute(query, params)
         return cur.rowcount
 
 
 def fetch_value(query: str, params: Optional[Iterable[Any]] = None) -> Any:
-    conn = get_conn()
-    with conn.cursor() as cur:
+    with connection() as conn, conn.cursor() as cur:
         cur.execute(query, params)
         row = cur.fetchone()
         return row[0] if row else None
 
 
 def insert_returning_one(query: str, params: Optional[Iterable[Any]] = None) -> Optional[dict[str, Any]]:
-    conn = get_conn()
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
         cur.execute(query, params)
         row = cur.fetchone()
         return dict(row) if row else None
@@ -153,8 +435,7 @@ def call_function(
         args_sql,
     )
 
-    conn = get_conn()
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
         cur.execute(q, values)
         try:
             rows = cur.fetchall()
@@ -174,7 +455,7 @@ def count_table(table: str, filter_column: Optional[str] = None, filter_value: A
             sql.Identifier(table),
             sql.Identifier(filter_column),
         )
-        return int(fetch_value(q.as_string(get_conn()), [filter_value]) or 0)
+        return int(fetch_value(q, [filter_value]) or 0)
 
     q = sql.SQL("SELECT COUNT(*) FROM {}" ).format(sql.Identifier(table))
-    return int(fetch_value(q.as_string(get_conn())) or 0)
+    return int(fetch_value(q) or 0)
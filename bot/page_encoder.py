@@ -0,0 +1,136 @@
+"""Output encoding for rendered report pages.
+
+Report pages are large (2339x1654) but mostly flat colour, so how they are
+encoded decides both CPU time and upload size. `PageEncoder` picks between:
+
+- ``jpeg``: configurable quality and chroma subsampling (4:4:4 keeps coloured
+  text crisp), ``optimize`` off by default since it triples encode time for ~8%;
+- ``png``: palette-quantized PNG, by far the smallest for table pages (near-white
+  shades such as the row striping can merge);
+- ``webp``: lossy WebP (small, but slow to encode at this size);
+- ``auto``: palette PNG, falling back to JPEG when the PNG misses the size target.
+
+With a size target (``target_kb``) the JPEG quality is stepped down until the
+page fits, never below ``min_quality``. ``scale`` < 1 downsizes pages first,
+e.g. for mobile previews.
+
+Configured from the environment: REPORT_IMAGE_FORMAT, REPORT_JPEG_QUALITY,
+REPORT_JPEG_SUBSAMPLING (444/422/420), REPORT_JPEG_OPTIMIZE, REPORT_PNG_COLORS,
+REPORT_IMAGE_TARGET_KB, REPORT_IMAGE_SCALE.
+"""
+import io
+import logging
+import os
+from typing import Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger("YemenNetBot.page_encoder")
+
+FORMATS = ("jpeg", "png", "webp", "auto")
+_SUBSAMPLING = {"444": 0, "4:4:4": 0, "422": 1, "4:2:2": 1, "420": 2, "4:2:0": 2}
+
+
+def _env(name: str, default: str) -> str:
+    return (os.getenv(name, "") or default).strip().lower()
+
+
+def _env_num(name: str, default: float) -> float:
+    try:
+        return float(_env(name, str(default)))
+    except ValueError:
+        return default
+
+
+def image_extension(data: bytes) -> str:
+    """File extension matching the encoded bytes (jpg when unknown)."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return "jpg"
+
+
+class PageEncoder:
+    def __init__(
+        self,
+        format: str = "jpeg",
+        quality: int = 90,
+        subsampling: int = 0,
+        optimize: bool = False,
+        png_colors: int = 128,
+        target_kb: Optional[float] = None,
+        min_quality: int = 60,
+        scale: float = 1.0,
+    ):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown report image format {format!r}; expected one of {', '.join(FORMATS)}")
+        self.format = format
+        self.quality = int(quality)
+        self.subsampling = subsampling
+        self.optimize = optimize
+        self.png_colors = max(2, min(256, int(png_colors)))
+        self.target_bytes = int(target_kb * 1024) if target_kb else None
+        self.min_quality = int(min_quality)
+        self.scale = scale
+
+    @classmethod
+    def from_env(cls) -> "PageEncoder":
+        fmt = _env("REPORT_IMAGE_FORMAT", "jpeg")
+        if fmt not in FORMATS:
+            logger.warning("Ignoring REPORT_IMAGE_FORMAT=%r; using jpeg", fmt)
+            fmt = "jpeg"
+        target_kb = _env_num("REPORT_IMAGE_TARGET_KB", 0)
+        return cls(
+            format=fmt,
+            quality=int(_env_num("REPORT_JPEG_QUALITY", 90)),
+            subsampling=_SUBSAMPLING.get(_env("REPORT_JPEG_SUBSAMPLING", "444"), 0),
+            optimize=_env("REPORT_JPEG_OPTIMIZE", "0") in {"1", "true", "yes"},
+            png_colors=int(_env_num("REPORT_PNG_COLORS", 128)),
+            target_kb=target_kb or None,
+            scale=min(1.0, max(0.1, _env_num("REPORT_IMAGE_SCALE", 1.0))),
+        )
+
+    def _prepare(self, image: Image.Image) -> Image.Image:
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        if self.scale < 1.0:
+            size = (max(1, round(image.width * self.scale)), max(1, round(image.height * self.scale)))
+            image = image.resize(size, Image.Resampling.LANCZOS)
+        return image
+
+    def _jpeg(self, image: Image.Image, quality: int) -> bytes:
+        buf = io.BytesIO()
+        image.save(buf, "JPEG", quality=quality, subsampling=self.subsampling, optimize=self.optimize)
+        return buf.getvalue()
+
+    def _jpeg_to_target(self, image: Image.Image, quality: int) -> bytes:
+        data = self._jpeg(image, quality)
+        while self.target_bytes and len(data) > self.target_bytes and quality > self.min_quality:
+            quality = max(self.min_quality, quality - 10)
+            data = self._jpeg(image, quality)
+        return data
+
+    def _png(self, image: Image.Image) -> bytes:
+        buf = io.BytesIO()
+        image.quantize(self.png_colors, method=Image.Quantize.FASTOCTREE).save(buf, "PNG", compress_level=6)
+        return buf.getvalue()
+
+    def _webp(self, image: Image.Image, quality: int) -> bytes:
+        buf = io.BytesIO()
+        image.save(buf, "WEBP", quality=quality, method=4)
+        return buf.getvalue()
+
+    def encode(self, image: Image.Image, quality: Optional[int] = None) -> Tuple[bytes, str]:
+        """Encode a page; returns (bytes, file extension)."""
+        image = self._prepare(image)
+        quality = self.quality if quality is None else int(quality)
+        if self.format == "png":
+            return self._png(image), "png"
+        if self.format == "webp":
+            return self._webp(image, quality), "webp"
+        if self.format == "auto":
+            data = self._png(image)
+            if not self.target_bytes or len(data) <= self.target_bytes:
+                return data, "png"
+        return self._jpeg_to_target(image, quality), "jpg"
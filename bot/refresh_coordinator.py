@@ -0,0 +1,139 @@
+"""Single owner of line scraping.
+
+The 60s all-users loop, the daily report job and `/reports` each used to
+scrape on their own, with their own semaphores, and could hit the portal for
+the same line two or three times within a minute. They now ask the
+coordinator to make lines "fresh by a deadline" instead:
+
+- every scrape goes through one concurrency limit (REFRESH_CONCURRENCY);
+- a line refreshed less than `max_age` seconds ago is not scraped again;
+- concurrent requests for the same line share one in-flight scrape;
+- callers stop waiting at their deadline while the scrape finishes in the
+  background (its result still counts for the next caller).
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from bot.utils_shared import save_scraped_account
+
+logger = logging.getLogger("YemenNetBot.refresh_coordinator")
+
+LineKey = Tuple[str, str]
+
+
+def _key(network_id: Any, username: Any) -> LineKey:
+    return (str(network_id), str(username))
+
+
+class RefreshCoordinator:
+    def __init__(self, concurrency: int = 24, attempts: int = 3, scrape_timeout: float = 30.0):
+        self.concurrency = concurrency
+        self.attempts = attempts
+        self.scrape_timeout = scrape_timeout
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._refreshed_at: Dict[LineKey, float] = {}
+        self._refreshed_wall: Dict[LineKey, datetime] = {}
+        self._inflight: Dict[LineKey, "asyncio.Task[bool]"] = {}
+        self._stats = {"scrapes": 0, "failures": 0, "skipped_fresh": 0, "joined": 0, "deadline_misses": 0}
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.concurrency)
+        return self._sem
+
+    # -- freshness -------------------------------------------------------------------------------
+
+    def age(self, network_id: Any, username: Any) -> Optional[float]:
+        """Seconds since the line was last refreshed successfully, or None if never (this process)."""
+        at = self._refreshed_at.get(_key(network_id, username))
+        return None if at is None else time.monotonic() - at
+
+    def last_refreshed(self, network_id: Any, username: Any) -> Optional[datetime]:
+        return self._refreshed_wall.get(_key(network_id, username))
+
+    def is_fresh(self, network_id: Any, username: Any, max_age: float) -> bool:
+        age = self.age(network_id, username)
+        return age is not None and age <= max_age
+
+    def mark_refreshed(self, network_id: Any, username: Any) -> None:
+        key = _key(network_id, username)
+        self._refreshed_at[key] = time.monotonic()
+        self._refreshed_wall[key] = datetime.now(timezone.utc)
+
+    # -- scraping --------------------------------------------------------------------------------
+
+    async def _scrape(self, network_id: Any, username: str) -> bool:
+        # Only exceptions and timeouts are retried: False from save_scraped_account is a final answer
+        # (unauthorized line, unknown network, lock timeout) and scraping it again only loads the portal.
+        for attempt in range(1, self.attempts + 1):
+            async with self._semaphore():
+                self._stats["scrapes"] += 1
+                try:
+                    ok = await asyncio.wait_for(save_scraped_account(username, network_id), timeout=self.scrape_timeout)
+                except asyncio.TimeoutError:
+                    logger.warning("⏰ Timeout fetching data for %s (attempt %d/%d)", username, attempt, self.attempts)
+                    ok = None
+                except Exception as e:
+                    logger.warning("❌ Failed to fetch data for %s (attempt %d/%d): %s", username, attempt, self.attempts, e)
+                    ok = None
+            if ok:
+                self.mark_refreshed(network_id, username)
+                return True
+            if ok is not None or attempt == self.attempts:
+                break
+            # Back off outside the semaphore so the slot serves other lines meanwhile
+            await asyncio.sleep(min(15.0, 2.0 * (2 ** (attempt - 1))) + random.uniform(0, 2.0))
+        self._stats["failures"] += 1
+        return False
+
+    def _start(self, network_id: Any, username: str) -> "asyncio.Task[bool]":
+        key = _key(network_id, username)
+        task = self._inflight.get(key)
+        if task is not None:
+            self._stats["joined"] += 1
+            return task
+        task = asyncio.get_running_loop().create_task(self._scrape(network_id, username))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _t, key=key: self._inflight.pop(key, None))
+        return task
+
+    async def ensure_fresh(self, network_id: Any, username: str, max_age: float = 60.0,
+                           timeout: Optional[float] = None) -> bool:
+        """Make sure the line was refreshed within max_age seconds, waiting at most `timeout`.
+
+        Returns True when the line is fresh, False when the scrape failed or is still running at the deadline.
+        """
+        if not network_id or not username:
+            return False
+        if self.is_fresh(network_id, username, max_age):
+            self._stats["skipped_fresh"] += 1
+            return True
+        task = self._start(network_id, username)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+        except asyncio.TimeoutError:
+            self._stats["deadline_misses"] += 1
+            return False
+
+    async def ensure_fresh_many(self, network_id: Any, usernames: Iterable[str], max_age: float = 60.0,
+                                timeout: Optional[float] = None) -> Tuple[int, int]:
+        """Refresh a group of lines by a shared deadline; returns (fresh, total)."""
+        usernames = [u for u in dict.fromkeys(usernames) if u]
+        if not usernames:
+            return 0, 0
+        results = await asyncio.gather(
+            *(self.ensure_fresh(network_id, u, max_age=max_age, timeout=timeout) for u in usernames),
+            return_exceptions=True,
+        )
+        return sum(1 for r in results if r is True), len(usernames)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "inflight": len(self._inflight), "tracked_lines": len(self._refreshed_at)}
+
+
+refresh_coordinator = RefreshCoordinator(concurrency=max(1, int(os.getenv("REFRESH_CONCURRENCY", "24") or 24)))
@@ -0,0 +1,171 @@
+"""Content-addressed cache for rendered report pages and their Telegram file_ids.
+
+Tapping "instant report" twice, or several partners asking for the same
+network, used to re-render identical pages. Pages are cached under a hash of
+what the renderer actually reads: the (already ordered) rows, the network's
+threshold/display settings, `order_by` and the report date. Entries expire
+after REPORT_RENDER_CACHE_TTL seconds (default 120) and the cache is bounded by
+REPORT_RENDER_CACHE_MB of page bytes (default 64).
+
+Independently, each page's bytes are hashed to remember the Telegram file_id
+of its first upload, so a repeated report is sent by file_id instead of being
+uploaded again.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("YemenNetBot.render_cache")
+
+# SelectedNetwork fields that change how a page looks
+_NETWORK_FIELDS = (
+    "network_id",
+    "network_name",
+    "user_name",
+    "expiration_date",
+    "warning_count_remaining_days",
+    "danger_count_remaining_days",
+    "warning_percentage_remaining_balance",
+    "danger_percentage_remaining_balance",
+)
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def render_key(user_reports: Sequence[Tuple[str, Dict[str, Any]]], network: Any, chat_user: Any, report_date: str = "") -> str:
+    """Stable digest of everything a rendered report depends on."""
+    payload = {
+        "rows": [[username, data] for username, data in user_reports],
+        "network": {name: getattr(network, name, None) for name in _NETWORK_FIELDS},
+        "order_by": getattr(chat_user, "order_by", None),
+        # Live reports compute remaining days against today
+        "report_date": report_date or f"live:{date.today().isoformat()}",
+    }
+    raw = json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def page_digest(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+class RenderCache:
+    """Thread-safe TTL + size-bounded LRU of rendered pages, plus a page-digest -> file_id map."""
+
+    def __init__(self, ttl: float = 120.0, max_bytes: int = 64 * 1024 * 1024,
+                 file_id_ttl: float = 86400.0, max_file_ids: int = 4096):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.file_id_ttl = file_id_ttl
+        self.max_file_ids = max_file_ids
+        self._pages: "OrderedDict[str, Tuple[float, List[bytes], int]]" = OrderedDict()
+        self._file_ids: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_bytes > 0
+
+    def get(self, key: str) -> Optional[List[bytes]]:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+
+    def put(self, key: str, pages: Iterable[bytes]) -> None:
+        pages = [bytes(p) for p in pages]
+        size = sum(len(p) for p in pages)
+        if not self.enabled or not pages or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._pages:
+                self._drop(key)
+            self._pages[key] = (time.monotonic() + self.ttl, pages, size)
+            self._bytes += size
+            self._evict()
+
+    def _drop(self, key: str) -> None:
+        _expires, _pages, size = self._pages.pop(key)
+        self._bytes -= size
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, (expires, _p, _s) in self._pages.items() if expires <= now]:
+            self._drop(key)
+        while self._bytes > self.max_bytes and self._pages:
+            self._drop(next(iter(self._pages)))
+
+    def file_id_for(self, data: bytes) -> Optional[str]:
+        if not data:
+            return None
+        digest = page_digest(data)
+        with self._lock:
+            entry = self._file_ids.get(digest)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._file_ids[digest]
+                return None
+            self._file_ids.move_to_end(digest)
+            return entry[1]
+
+    def remember_file_id(self, data: bytes, file_id: Optional[str]) -> None:
+        if not data or not file_id:
+            return
+        digest = page_digest(data)
+        with self._lock:
+            self._file_ids[digest] = (time.monotonic() + self.file_id_ttl, file_id)
+            self._file_ids.move_to_end(digest)
+            while len(self._file_ids) > self.max_file_ids:
+                self._file_ids.popitem(last=False)
+
+    def forget_file_id(self, data: bytes) -> None:
+        with self._lock:
+            self._file_ids.pop(page_digest(data), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+            self._file_ids.clear()
+            self._bytes = 0
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._pages),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "file_ids": len(self._file_ids),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+render_cache = RenderCache(
+    ttl=_env_number("REPORT_RENDER_CACHE_TTL", 120.0),
+    max_bytes=int(_env_number("REPORT_RENDER_CACHE_MB", 64.0) * 1024 * 1024),
+)
@@ -0,0 +1,151 @@
+"""Process pool that renders table report pages for the daily report waves.
+
+Pillow drawing, Arabic shaping and JPEG encoding hold the GIL, so rendering on
+the shared thread pool serializes a whole wave on one core. Pages are rendered
+here in worker processes instead: each worker preloads fonts (and keeps its
+page templates warm across jobs), receives plain row data plus the few
+network/chat-user fields the renderer reads, and returns encoded JPEG bytes.
+
+RENDER_PROCESSES sets the worker count (default: CPU count, 0 disables the
+pool and renders on the shared thread pool).
+"""
+import asyncio
+import inspect
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from bot.app import EXEC
+from bot.chat_user_manager import ChatUser
+from bot.font_manager import font_manager
+from bot.selected_network_manager import SelectedNetwork
+from bot.table_report import TableReportGenerator
+
+logger = logging.getLogger("YemenNetBot.render_farm")
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# Worker-process state
+_worker_generator: Optional[TableReportGenerator] = None
+
+
+def _workers() -> int:
+    raw = os.getenv("RENDER_PROCESSES", "").strip()
+    try:
+        return max(0, int(raw)) if raw else (os.cpu_count() or 1)
+    except ValueError:
+        return os.cpu_count() or 1
+
+
+def _init_worker() -> None:
+    global _worker_generator
+    font_manager.preload()
+    _worker_generator = TableReportGenerator()
+
+
+def _warm() -> int:
+    return os.getpid()
+
+
+def _init_kwargs(obj: Any, cls: type) -> Dict[str, Any]:
+    """Constructor kwargs for a plain copy of obj (only the fields cls.__init__ accepts)."""
+    params = inspect.signature(cls.__init__).parameters
+    return {name: getattr(obj, name) for name in params if name != "self" and hasattr(obj, name)}
+
+
+def _render_page(job: Dict[str, Any]) -> bytes:
+    gen = _worker_generator or TableReportGenerator()
+    gen.apply_report_extras(job["extras"])
+    gen.totals = job["totals"]
+    return gen.render_page_bytes(
+        job["rows"],
+        job["page"],
+        job["total_pages"],
+        job["lines_count"],
+        SelectedNetwork(**job["network"]),
+        ChatUser(**job["chat_user"]),
+        job["report_date"],
+    )
+
+
+def _render_pages_inline(jobs: List[Dict[str, Any]]) -> List[bytes]:
+    return [_render_page(job) for job in jobs]
+
+
+def build_page_jobs(user_reports, network: SelectedNetwork, chat_user: ChatUser, report_date: str = "") -> List[Dict[str, Any]]:
+    """Split a report into self-contained, picklable page jobs."""
+    gen = TableReportGenerator()
+    lines, chunks = gen.paginate(user_reports)
+    if not lines:
+        return []
+    base = {
+        "total_pages": len(chunks),
+        "lines_count": len(lines),
+        "totals": gen.totals,
+        "extras": gen.report_extras(),
+        "network": _init_kwargs(network, SelectedNetwork),
+        "chat_user": _init_kwargs(chat_user, ChatUser),
+        "report_date": report_date,
+    }
+    return [{**base, "rows": list(chunk), "page": page} for page, chunk in enumerate(chunks, 1)]
+
+
+def get_executor() -> Optional[ProcessPoolExecutor]:
+    global _executor
+    workers = _workers()
+    if workers <= 0:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # spawn: forking a process that already runs the event loop, the DB pools and
+                # the thread pool is not safe.
+                _executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+                logger.info("Render farm started with %d worker processes", workers)
+    return _executor
+
+
+async def start() -> int:
+    """Spawn and warm every worker up front so the first wave does not pay for imports and fonts."""
+    executor = get_executor()
+    if executor is None:
+        return 0
+    loop = asyncio.get_running_loop()
+    pids = await asyncio.gather(*(loop.run_in_executor(executor, _warm) for _ in range(_workers())))
+    return len(set(pids))
+
+
+def shutdown(wait: bool = False) -> None:
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        try:
+            executor.shutdown(wait=wait, cancel_futures=True)
+        except Exception:
+            pass
+
+
+async def render_report_pages(user_reports, network: SelectedNetwork, chat_user: ChatUser, report_date: str = "") -> List[bytes]:
+    """Render every page of a network report in parallel and return the encoded JPEG bytes in page order."""
+    jobs = build_page_jobs(user_reports, network, chat_user, report_date)
+    if not jobs:
+        return []
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    if executor is not None:
+        try:
+            return list(await asyncio.gather(*(loop.run_in_executor(executor, _render_page, job) for job in jobs)))
+        except BrokenProcessPool:
+            logger.exception("Render farm broke while rendering network %s; restarting it and rendering in-process", network.network_name)
+            shutdown(wait=False)
+    return await loop.run_in_executor(EXEC, _render_pages_inline, jobs)
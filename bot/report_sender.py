@@ -1,14 +1,18 @@
+import hashlib
 import os
 import re
 import asyncio
 import logging
 from datetime import datetime
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional, Union
 
 from aiogram import types
 import io
 from aiogram.exceptions import TelegramBadRequest, TelegramNetworkError
 
+from bot import delivery_outbox, render_farm
+from bot.page_encoder import image_extension
+from bot.render_cache import render_cache, render_key
 from bot.table_report import TableReportGenerator
 from bot.user_manager import UserManager
 from bot.utils_shared import get_token_by_network_id
@@ -51,12 +55,23 @@ async def collect_saved_user_reports(users: List[Dict[str, Any]], sem_users: asy
             except Exception:
                 return s
         return s
+    # One DISTINCT ON query for the whole list when the manager supports it; per-user reads otherwise
+    # (or when the batch read fails).
+    latest_by_id: Optional[Dict[str, Dict[str, Any]]] = None
+    batch_get = getattr(user_manager, "get_latest_account_data_for_users", None)
+    if batch_get is not None:
+        user_ids = [u["id"] for u in users if u.get("id") is not None]
+        latest_by_id = await batch_get(user_ids) if user_ids else {}
+
     async def _get(u: Dict[str, Any]):
         async with sem_users:
             # Always prefer the ADSL number from the users table for identity
             uname = _normalize_adsl(u.get("adsl_number") or u.get("username"))
             try:
-                latest = await user_manager.get_latest_account_data(u["id"])
+                if latest_by_id is not None:
+                    latest = latest_by_id.get(str(u["id"]))
+                else:
+                    latest = await user_manager.get_latest_account_data(u["id"])
                 # always return a merged dict so the report includes every user
                 if latest:
                     # Merge with precedence for identity fields from users table to avoid accidental overrides
@@ -166,80 +181,328 @@ async def collect_saved_user_reports(users: List[Dict[str, Any]], sem_users: asy
     return collected
 
 
-def generate_images(user_reports: List[Tuple[str, Dict[str, Any]]], network :SelectedNetwork, chat_user:ChatUser, report_date: str = "") -> Tuple[List[str], str]:
-    """Blocking function: generate table report images for user_reports using TableReportGenerator.
+def _debug_dump_pages(pages: List[bytes], network: SelectedNetwork) -> None:
+    """Opt-in debug output: keep a copy of rendered pages under REPORT_DEBUG_DIR."""
+    debug_dir = os.getenv("REPORT_DEBUG_DIR", "").strip()
+    if not debug_dir or not pages:
+        return
+    try:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        out_dir = os.path.join(debug_dir, f"financial_report_{timestamp}_{network.network_id}_{uuid4().hex[:8]}")
+        os.makedirs(out_dir, exist_ok=True)
+        for page, data in enumerate(pages, 1):
+            with open(os.path.join(out_dir, f"financial_report_page{page}.{image_extension(data)}"), "wb") as fh:
+                fh.write(data)
+    except Exception:
+        logger.exception("Failed to write debug copy of report pages for network %s", network.network_name)
+
 
-    Use a unique per-invocation base filename (timestamp + uuid) so concurrent calls do not produce
-    colliding file paths. The TableReportGenerator will append page numbers to this base path.
+def generate_images(user_reports: List[Tuple[str, Dict[str, Any]]], network :SelectedNetwork, chat_user:ChatUser, report_date: str = "") -> Tuple[List[bytes], Optional[str]]:
+    """Blocking function: render table report pages for user_reports as encoded JPEG bytes.
+
+    Returns (pages, cleanup_dir). Pages stay in memory, so cleanup_dir is always None; it is kept so
+    callers can hand the pair straight to `send_images`. Set REPORT_DEBUG_DIR to also write the pages to disk.
+    Identical reports requested again within REPORT_RENDER_CACHE_TTL are served from `render_cache`.
     """
+    key = render_key(user_reports, network, chat_user, report_date)
+    cached = render_cache.get(key)
+    if cached is not None:
+        logger.debug("Render cache hit for network %s (%d pages)", network.network_name, len(cached))
+        return cached, None
     gen = TableReportGenerator()
-    # create a unique per-invocation directory
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_id = uuid4().hex
-    out_dir = os.path.join("reports", f"financial_report_{timestamp}_{unique_id}")
-    os.makedirs(out_dir, exist_ok=True)
-    base_save = os.path.join(out_dir, "financial_report.jpg")
-    images = gen.generate_financial_table_report(user_reports,network, chat_user, save_path=base_save, report_date=report_date)
-    return images, out_dir
-
-
-async def send_images(bot_instance,network:SelectedNetwork, telegram_id: str, images: List[str], user_reports: List[Tuple[str, Dict[str, Any]]], tz, cleanup_dir: str = None,isDailyReport: bool = True,sendToAdmin: bool = True, scheduled_time: Tuple[int, int, int] | None = None, report_date: str = "") -> Dict[str, Any]:
-    """Send images sequentially to the chat associated with the network. Returns summary dict."""
-    sent = 0
-    skipped = 0
-    chat_not_found = False
-    
-    for page, img in enumerate(images, 1):
-        try:
-            if not img or not os.path.exists(img):
-                logger.warning("Image file missing for user %s network %s page %d: %r", network.user_name, network.network_name, page, img)
-                skipped += 1
-                continue
+    pages = gen.generate_financial_table_report_bytes(user_reports, network, chat_user, report_date=report_date)
+    render_cache.put(key, pages)
+    _debug_dump_pages(pages, network)
+    return pages, None
 
-            try:
-                size = os.path.getsize(img)
-            except Exception:
-                size = 0
 
-            if size == 0:
-                logger.warning("Image file empty for user %s network %s page %d: %r", network.user_name, network.network_name, page, img)
-                skipped += 1
+async def generate_images_parallel(user_reports: List[Tuple[str, Dict[str, Any]]], network: SelectedNetwork, chat_user: ChatUser, report_date: str = "") -> Tuple[List[bytes], Optional[str]]:
+    """Async counterpart of `generate_images` that renders the pages on the render farm processes."""
+    key = render_key(user_reports, network, chat_user, report_date)
+    cached = render_cache.get(key)
+    if cached is not None:
+        return cached, None
+    pages = await render_farm.render_report_pages(user_reports, network, chat_user, report_date)
+    render_cache.put(key, pages)
+    _debug_dump_pages(pages, network)
+    return pages, None
+
+
+def page_line_hashes(user_reports: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+    """Hash of the lines shown on each report page, split the way TableReportGenerator paginates them.
+
+    Only which lines a page shows counts, not their values, so a page re-rendered from newer data
+    still matches the page delivered earlier (the delivery outbox uses this when resuming).
+    """
+    if not isinstance(user_reports, list):
+        return []
+    names = [str(row[0]) for row in user_reports]
+    rows = TableReportGenerator.MAX_ROWS_PER_PAGE
+    return [hashlib.sha1("\n".join(names[i:i + rows]).encode("utf-8")).hexdigest() for i in range(0, len(names), rows)]
+
+
+def _photo_file_id(message: Any) -> Optional[str]:
+    """file_id of the largest size of a sent photo, or None when the response carries none."""
+    photos = getattr(message, "photo", None) or []
+    try:
+        return photos[-1].file_id
+    except (IndexError, AttributeError, TypeError):
+        return None
+
+
+async def _send_photo_reusing_file_id(bot_instance, chat_id, file_id: Optional[str], make_file_obj, caption: str):
+    """Send by Telegram file_id when one is known; upload the bytes only if there is none or it is rejected."""
+    if file_id:
+        try:
+            return await bot_instance.send_photo(chat_id=chat_id, photo=file_id, caption=caption, request_timeout=120)
+        except TelegramBadRequest as e:
+            msg = str(e).lower()
+            if "chat not found" in msg or "bot was blocked" in msg:
+                raise
+            logger.warning("Reusing file_id for chat %s failed (%s); uploading instead", chat_id, e)
+    return await bot_instance.send_photo(chat_id=chat_id, photo=make_file_obj(), caption=caption, request_timeout=120)
+
+
+def _remember_file_ids(pages: List[bytes], messages: list) -> None:
+    """Record the file_id Telegram assigned to each uploaded page so repeats can be sent by id."""
+    if len(messages or []) != len(pages):
+        return
+    for data, message in zip(pages, messages):
+        render_cache.remember_file_id(data, _photo_file_id(message))
+
+
+ALBUM_MAX_ITEMS = 10  # Telegram's media group limit
+
+
+def _album_mode_enabled() -> bool:
+    return os.getenv("REPORT_ALBUM_MODE", "1").strip().lower() not in {"0", "false", "no"}
+
+
+def _album_caption(network: SelectedNetwork, lines_count: int, tz, isDailyReport: bool, report_date: str,
+                   first_page: int, last_page: int, total_pages: int, from_partner: bool = False) -> str:
+    header = (
+        "تقرير من السجل\n"
+        if report_date
+        else f"📊 {'تقرير يومي' if isDailyReport else 'تقرير فوري'}{' من شريك' if from_partner else ''}\n"
+    )
+    time_line = (
+        f"🕒 تاريخ التقرير: {report_date}\n"
+        if report_date
+        else f"🕒 وقت التقرير: {datetime.now(tz).strftime('%Y-%m-%d %H:%M')}\n"
+    )
+    image_line = f"– الصور {first_page}-{last_page}/{total_pages}\n" if total_pages > 1 else ""
+    return (
+        f"{header}"
+        f"🛜 الشبكة: {network.network_name}\n"
+        f"{image_line}"
+        f"👥 عدد الخطوط: {lines_count}\n"
+        f"{time_line}"
+        "〰️\n"
+    )
+
+
+def _album_media(group: List[Tuple[int, bytes]], caption: str, file_ids: Optional[List[Optional[str]]] = None) -> list:
+    media = []
+    for i, (page, data) in enumerate(group):
+        file_id = file_ids[i] if file_ids else None
+        source = file_id or types.BufferedInputFile(data, filename=f"financial_report_page{page}.{image_extension(data)}")
+        media.append(types.InputMediaPhoto(media=source, caption=caption if i == 0 else None))
+    return media
+
+
+@retry(reraise=True, stop=stop_after_attempt(5),
+       wait=wait_exponential(multiplier=1.0, min=2, max=20),
+       retry=retry_if_exception(lambda exc: not isinstance(exc, TelegramBadRequest)))
+async def _send_album_with_retry(bot_instance, chat_id, media: list) -> list:
+    return await bot_instance.send_media_group(chat_id=chat_id, media=media, request_timeout=120)
+
+
+async def _send_album_to_partners(bot_instance, network: SelectedNetwork, telegram_id: str, group: List[Tuple[int, bytes]],
+                                  file_ids: List[Optional[str]], caption: str) -> None:
+    network_partners = await UserManager.get_network_partners(network.network_id, with_owner=True)
+    partners = [p for p in network_partners if p.get("is_partner_active") and p.get("telegram_id") and p.get("receive_partnered_report") and p.get("telegram_id") != telegram_id]
+    for p in partners:
+        partner_token = p.get("telegram_id")
+        try:
+            try:
+                await _send_album_with_retry(bot_instance, int(partner_token), _album_media(group, caption, file_ids))
+            except TelegramBadRequest as e:
+                if "chat not found" in str(e).lower() or not any(file_ids):
+                    raise
+                logger.warning("Reusing file_ids for partner %s failed (%s); uploading album instead", partner_token, e)
+                await _send_album_with_retry(bot_instance, int(partner_token), _album_media(group, caption))
+        except TelegramBadRequest as tbe:
+            if "chat not found" in str(tbe).lower():
+                logger.warning("Partner chat not found (%s) for network %s; deactivating partner record id=%s", partner_token, network.network_name, p.get("id"))
                 try:
-                    os.remove(img)
+                    await UserManager.deactivate_network_partner(p.get("id"))
                 except Exception:
-                    pass
-                continue
+                    logger.exception("Failed to deactivate partner record id=%s for network %s", p.get("id"), network.network_name)
+            else:
+                logger.exception("TelegramBadRequest sending album to partner %s for network %s: %s", partner_token, network.network_name, tbe)
+        except Exception as e:
+            logger.exception("Failed to send album to partner %s for network %s: %s", partner_token, network.network_name, e)
+
+
+async def _send_album_groups(bot_instance, network: SelectedNetwork, telegram_id: str, pages: List[Tuple[int, bytes]],
+                             total_pages: int, lines_count: int, tz, isDailyReport: bool, report_date: str,
+                             on_sent=None) -> Tuple[int, List[Tuple[int, bytes]]]:
+    """Send pages as albums of up to ALBUM_MAX_ITEMS, caption on the first item.
 
+    Returns (pages sent, pages to retry one by one). Any album failure hands its pages back to the
+    per-page path, which owns chat-not-found handling and admin notification. `on_sent(page, message)`
+    is awaited for every delivered page.
+    """
+    try:
+        chat_id = int(telegram_id)
+    except Exception:
+        chat_id = telegram_id
+    sent = 0
+    fallback: List[Tuple[int, bytes]] = []
+    for start in range(0, len(pages), ALBUM_MAX_ITEMS):
+        group = pages[start:start + ALBUM_MAX_ITEMS]
+        if len(group) < 2:
+            # A media group needs at least two items
+            fallback.extend(group)
+            continue
+        caption = _album_caption(network, lines_count, tz, isDailyReport, report_date, group[0][0], group[-1][0], total_pages)
+        cached_ids = [render_cache.file_id_for(data) for _page, data in group]
+        try:
+            if all(cached_ids):
+                try:
+                    messages = await _send_album_with_retry(bot_instance, chat_id, _album_media(group, caption, cached_ids))
+                except TelegramBadRequest as e:
+                    if "chat not found" in str(e).lower():
+                        raise
+                    logger.warning("Reusing cached file_ids for network %s failed (%s); uploading album", network.network_name, e)
+                    for _page, data in group:
+                        render_cache.forget_file_id(data)
+                    messages = await _send_album_with_retry(bot_instance, chat_id, _album_media(group, caption))
+            else:
+                messages = await _send_album_with_retry(bot_instance, chat_id, _album_media(group, caption))
+        except Exception as e:
+            logger.warning("Album send of pages %d-%d to network %s failed (%s); sending pages individually",
+                           group[0][0], group[-1][0], network.network_name, e)
+            fallback.extend(group)
+            continue
+        sent += len(group)
+        _remember_file_ids([data for _page, data in group], messages)
+        if on_sent is not None:
+            messages = list(messages or [])
+            for i, (page, _data) in enumerate(group):
+                await on_sent(page, messages[i] if i < len(messages) else None)
+        logger.info("Sent pages %d-%d/%d as an album to user %s network %s", group[0][0], group[-1][0], total_pages, network.user_name, network.network_name)
+        # Partners get immediate reports only (same rule as the per-page path)
+        if not isDailyReport and not report_date:
+            file_ids = [_photo_file_id(m) for m in (messages or [])]
+            if len(file_ids) != len(group):
+                file_ids = [None] * len(group)
+            partner_caption = _album_caption(network, lines_count, tz, isDailyReport, report_date, group[0][0], group[-1][0], total_pages, from_partner=True)
+            await _send_album_to_partners(bot_instance, network, telegram_id, group, file_ids, partner_caption)
+    return sent, fallback
+
+
+def _read_image_file(img: str, network: SelectedNetwork, page: int) -> bytes:
+    """Read a page rendered to disk (legacy path input); returns b"" when missing or unreadable."""
+    if not img or not os.path.exists(img):
+        logger.warning("Image file missing for user %s network %s page %d: %r", network.user_name, network.network_name, page, img)
+        return b""
+    try:
+        # Read file contents into memory to avoid aiofiles path-open race during aiohttp streaming
+        with open(img, "rb") as fh:
+            data = fh.read()
+    except Exception as e:
+        logger.warning("Failed to read image file %s before sending: %s", img, e)
+        return b""
+    if not data:
+        try:
+            os.remove(img)
+        except Exception:
+            pass
+    return data
+
+
+async def send_images(bot_instance,network:SelectedNetwork, telegram_id: str, images: List[Union[bytes, str]], user_reports: List[Tuple[str, Dict[str, Any]]], tz, cleanup_dir: str = None,isDailyReport: bool = True,sendToAdmin: bool = True, scheduled_time: Tuple[int, int, int] | None = None, report_date: str = "", album: Optional[bool] = None,
+                      outbox_run: str = "", outbox_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Send images to the chat associated with the network. Returns summary dict.
+
+    `images` holds encoded page bytes (from `generate_images`); file paths are still accepted.
+    Multi-page byte reports go out as albums (`album`, default REPORT_ALBUM_MODE=1); pages an album
+    could not deliver are retried one by one.
+    With `outbox_run` every page is recorded in the delivery outbox (bot.delivery_outbox) and pages
+    that run already delivered are not sent again (logged, not counted in the summary);
+    `outbox_context` is kept for resuming.
+    """
+    sent = 0
+    skipped = 0
+    chat_not_found = False
+
+    pending: List[Tuple[int, Union[bytes, str]]] = list(enumerate(images, 1))
+
+    async def _record(page: int, status: str, message: Any = None, error: Optional[str] = None) -> None:
+        if not outbox_run:
+            return
+        try:
+            await delivery_outbox.mark(
+                outbox_run, network.network_id, telegram_id, page, status,
+                message_id=getattr(message, "message_id", None), file_id=_photo_file_id(message) if message else None,
+                error=error,
+            )
+        except Exception as e:
+            logger.warning("Recording page %d of network %s in the outbox failed: %s", page, network.network_name, e)
+
+    if outbox_run:
+        try:
+            done = await delivery_outbox.plan(
+                outbox_run, network.network_id, telegram_id, len(images), outbox_context,
+                page_hashes=page_line_hashes(user_reports),
+            )
+        except Exception as e:
+            # The outbox is bookkeeping; never let it block a delivery
+            logger.warning("Delivery outbox unavailable for network %s (%s); sending without it", network.network_name, e)
+            outbox_run = ""
+        else:
+            if done:
+                logger.info("Outbox: %d/%d pages of run %s already delivered to network %s", len(done), len(images), outbox_run, network.network_name)
+            pending = [(page, img) for page, img in pending if page not in done]
+
+    if album is None:
+        album = _album_mode_enabled()
+    if album and len(images) > 1 and all(isinstance(img, (bytes, bytearray, memoryview)) for img in images):
+        non_empty = [(page, bytes(img)) for page, img in pending if img]
+        skipped += len(pending) - len(non_empty)
+        for page, img in pending:
+            if not img:
+                await _record(page, delivery_outbox.SKIPPED, error="empty page")
+        album_sent, pending = await _send_album_groups(
+            bot_instance, network, telegram_id, non_empty, len(images), len(user_reports), tz, isDailyReport, report_date,
+            on_sent=lambda page, message: _record(page, delivery_outbox.SENT, message),
+        )
+        sent += album_sent
+
+    for page, img in pending:
+        try:
             # prepare chat_id
             try:
                 chat_id_to_use = int(telegram_id)
             except Exception:
                 chat_id_to_use = telegram_id
 
-            # Read file contents into memory to avoid aiofiles path-open race during aiohttp streaming
-            try:
-                with open(img, "rb") as fh:
-                    data = fh.read()
-            except FileNotFoundError:
-                logger.warning("File disappeared before send for user %s network %s page %d: %s", network.user_name, network.network_name, page, img)
-                skipped += 1
-                continue
-            except Exception as e:
-                logger.exception("Failed to read image file %s before sending: %s", img, e)
-                skipped += 1
-                continue
+            if isinstance(img, (bytes, bytearray, memoryview)):
+                data = bytes(img)
+                filename = f"financial_report_page{page}.{image_extension(data)}"
+            else:
+                data = _read_image_file(img, network, page)
+                filename = os.path.basename(img) if img else f"financial_report_page{page}.jpg"
 
             if not data:
-                logger.warning("Image file empty in-memory for user %s network %s page %d: %s", network.user_name, network.network_name, page, img)
+                logger.warning("Image empty for user %s network %s page %d", network.user_name, network.network_name, page)
                 skipped += 1
-                try:
-                    os.remove(img)
-                except Exception:
-                    pass
+                await _record(page, delivery_outbox.SKIPPED, error="empty page")
                 continue
 
             def _make_file_obj():
-                return types.BufferedInputFile(data, filename=os.path.basename(img))
+                return types.BufferedInputFile(data, filename=filename)
 
             file_obj = _make_file_obj()
 
@@ -247,6 +510,10 @@ async def send_images(bot_instance,network:SelectedNetwork, telegram_id: str, im
             _reported_orphan_tokens = globals().setdefault("_reported_orphan_tokens", set())
             token_key = str(telegram_id)
 
+            # Telegram file_id of this page once the owner send succeeds; partners reuse it instead of re-uploading
+            uploaded_file_id: Optional[str] = None
+            owner_message: Any = None
+
             async def _send_to_partners(file_obj, page: int, imagesLength: int):
                 # Do not send to partners during daily reports per requirement
                 if isDailyReport or report_date:
@@ -266,6 +533,7 @@ async def send_images(bot_instance,network:SelectedNetwork, telegram_id: str, im
                         retry=retry_if_exception_type((TelegramNetworkError, asyncio.TimeoutError)),
                     )
                     async def _send_partner_with_retry():
+                        nonlocal uploaded_file_id
                         header = (
                             "تقرير من السجل\n"
                             if report_date
@@ -279,19 +547,19 @@ async def send_images(bot_instance,network:SelectedNetwork, telegram_id: str, im
                         image_line = (
                             f"– الصورة {page}/{imagesLength}\n" if imagesLength > 1 else ""
                         )
-                        await bot_instance.send_photo(
-                            chat_id=int(partner_token),
-                            photo=_make_file_obj(),
-                            caption=(
-                                f"{header}"
-                                f"🛜 الشبكة: {network.network_name}\n"
-                                f"{image_line}"
-                                f"👥 عدد الخطوط: {len(user_reports)}\n"
-                                f"{time_line}"
-                                "〰️\n"
-                            ),
-                            request_timeout=120
+                        caption = (
+                            f"{header}"
+                            f"🛜 الشبكة: {network.network_name}\n"
+                            f"{image_line}"
+                            f"👥 عدد الخطوط: {len(user_reports)}\n"
+                            f"{time_line}"
+                            "〰️\n"
+                        )
+                        partner_msg = await _send_photo_reusing_file_id(
+                            bot_instance, int(partner_token), uploaded_file_id, _make_file_obj, caption
                         )
+                        # Owner send may have failed (chat not found); the first partner upload seeds reuse
+                        uploaded_file_id = uploaded_file_id or _photo_file_id(partner_msg)
 
                     try:
                         await _send_partner_with_retry()
@@ -307,12 +575,12 @@ async def send_images(bot_instance,network:SelectedNetwork, telegram_id: str, im
                             logger.exception("TelegramBadRequest sending to partner %s for user %s network %s page %d: %s", partner_token, network.user_name, network.network_name, page, tbe)
                     except Exception as e:
                         logger.exception("Failed to send report to partner %s for user %s network %s page %d: %s", partner_token, network.user_name, network.network_name, page, e)
-                    await asyncio.sleep(0.2)
 
             @retry(reraise=True, stop=stop_after_attempt(5),
                    wait=wait_exponential(multiplier=1.0, min=2, max=20),
                    retry=retry_if_exception(lambda exc: not isinstance(exc, TelegramBadRequest)))
             async def _send_with_retry():
+                nonlocal uploaded_file_id, owner_message
                 imagesLength = len(images)
                 try:
                     header = (
@@ -328,10 +596,12 @@ async def send_images(bot_instance,network:SelectedNetwork, telegram_id: str, im
                     image_line = (
                         f"– الصورة {page}/{imagesLength}\n" if imagesLength > 1 else ""
                     )
-                    await bot_instance.send_photo(
-                        chat_id=chat_id_to_use,
-                        photo=file_obj,
-                        caption=(
+                    owner_msg = await _send_photo_reusing_file_id(
+                        bot_instance,
+                        chat_id_to_use,
+                        render_cache.file_id_for(data),
+                        _make_file_obj,
+                        (
                             f"{header}"
                             f"🛜 الشبكة: {network.network_name}\n"
                             f"{image_line}"
@@ -339,8 +609,10 @@ async def send_images(bot_instance,network:SelectedNetwork, telegram_id: str, im
                             f"{time_line}"
                             "〰️\n"
                         ),
-                        request_timeout=120
                     )
+                    owner_message = owner_msg
+                    uploaded_file_id = _photo_file_id(owner_msg)
+                    render_cache.remember_file_id(data, uploaded_file_id)
                     # Send to partners only for non-daily reports
                     if not isDailyReport:
                         await _send_to_partners(file_obj, page, imagesLength)
@@ -399,9 +671,12 @@ async def send_images(bot_instance,network:SelectedNetwork, telegram_id: str, im
             try:
                 await _send_with_retry()
                 sent += 1
+                await _record(page, delivery_outbox.SENT, owner_message)
                 logger.info("Sent page %d/%d to user %s network %s", page, len(images), network.user_name, network.network_name)
             except TelegramBadRequest as tb_final:
                 msg = str(tb_final).lower()
+                # A missing chat will not come back; a failed page would be re-rendered and retried on every resume
+                await _record(page, delivery_outbox.SKIPPED if 'chat not found' in msg else delivery_outbox.FAILED, error=str(tb_final))
                 if 'chat not found' in msg:
                     chat_not_found = True
                     # If owner's chat is invalid, only attempt partner sends for non-daily reports
@@ -421,14 +696,14 @@ async def send_images(bot_instance,network:SelectedNetwork, telegram_id: str, im
             except Exception as final_exc:
                 logger.exception("Failed to send page %d to user %s network %s after retries: %s", page, network.user_name, network.network_name, final_exc)
                 skipped += 1
+                await _record(page, delivery_outbox.FAILED, error=f"{type(final_exc).__name__}: {final_exc}")
                 # keep files for debugging; atomic cleanup happens below
                 pass
         except Exception:
             logger.exception("Failed to send daily report page %d to user %s network %s", page, network.user_name, network.network_name)
         # finished sending this page; continue to next
 
-    # small delay between pages to help Telegram
-    await asyncio.sleep(0.7)
+    # Pacing between sends is handled by bot.send_gateway (installed on the Bot session)
 
     # Atomic cleanup: remove the entire invocation directory if provided
     if cleanup_dir:
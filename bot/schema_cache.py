@@ -0,0 +1,76 @@
+"""Process-wide cache of the public schema's tables and columns.
+
+Existence checks used by `utils_shared` (does `adsl_daily_report` have
+`report_date`? does `adsl_daily_reports` exist?) used to query
+`information_schema` on every call. The catalog is read once (at startup via
+`load()`, or lazily on first use) and re-read only through `refresh()`, e.g.
+after a query hits `UndefinedTable`/`UndefinedColumn` because a migration ran.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional, Set
+
+from bot.local_postgres import fetch_all
+
+logger = logging.getLogger("YemenNetBot.schema_cache")
+
+_COLUMNS_QUERY = """
+SELECT table_name, column_name
+FROM information_schema.columns
+WHERE table_schema = %s
+""".strip()
+
+
+class SchemaCache:
+    def __init__(self, schema: str = "public"):
+        self.schema = schema
+        self._tables: Optional[Dict[str, Set[str]]] = None
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._tables is not None
+
+    @property
+    def loaded_at(self) -> Optional[float]:
+        return self._loaded_at
+
+    def _fetch_and_swap(self) -> None:
+        tables: Dict[str, Set[str]] = {}
+        for row in fetch_all(_COLUMNS_QUERY, [self.schema]):
+            tables.setdefault(row["table_name"], set()).add(row["column_name"])
+        self._tables = tables
+        self._loaded_at = time.time()
+        logger.info("Schema cache loaded: %d tables in %s", len(tables), self.schema)
+
+    def refresh(self) -> None:
+        """Re-read the catalog (one query) and swap it in atomically."""
+        with self._lock:
+            self._fetch_and_swap()
+
+    def load(self) -> None:
+        """Load the catalog unless another caller already did; concurrent first calls share one query."""
+        if self._tables is not None:
+            return
+        with self._lock:
+            if self._tables is None:
+                self._fetch_and_swap()
+
+    def _snapshot(self) -> Dict[str, Set[str]]:
+        if self._tables is None:
+            self.load()
+        return self._tables or {}
+
+    def has_table(self, table_name: str) -> bool:
+        return table_name in self._snapshot()
+
+    def has_column(self, table_name: str, column_name: str) -> bool:
+        return column_name in self._snapshot().get(table_name, ())
+
+    def columns(self, table_name: str) -> Set[str]:
+        return set(self._snapshot().get(table_name, ()))
+
+
+schema_cache = SchemaCache()
@@ -0,0 +1,318 @@
+"""Central gateway for every outbound Telegram send.
+
+Installed as an aiogram request middleware on the shared `Bot` session, so
+`bot.send_*`, `message.answer(...)`, edits and albums all pass through it
+without touching call sites. It enforces:
+
+- a global token bucket (Telegram allows ~30 messages/s per bot) and per-chat
+  buckets (~1/s for private chats, 20/min for groups);
+- priority ordering: interactive replies (the default) are granted before
+  scheduled report traffic, which runs under `send_priority(Priority.BULK)`;
+- Telegram's `retry_after`: the chat is paused for that long and the request
+  is re-queued instead of failing;
+- backpressure: producers can read `pressure()` or `await wait_for_capacity()`
+  before queueing more work.
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+logger = logging.getLogger("YemenNetBot.send_gateway")
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    NORMAL = 5
+    BULK = 10
+
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("send_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def send_priority(priority: int) -> Iterator[None]:
+    """Run sends issued in this context (and tasks spawned from it) at the given priority."""
+    token = _priority.set(int(priority))
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float, cost: float = 1.0) -> float:
+        """Seconds until `cost` tokens are available (0 when they are now)."""
+        self._refill(now)
+        blocked = max(0.0, self.blocked_until - now)
+        cost = min(cost, self.capacity)
+        missing = max(0.0, cost - self.tokens)
+        return max(blocked, missing / self.rate if self.rate > 0 else float("inf"))
+
+    def consume(self, now: float, cost: float = 1.0) -> None:
+        self._refill(now)
+        self.tokens -= min(cost, self.capacity)
+
+    def block(self, now: float, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+# Methods that count against Telegram's message limits.
+_RATE_LIMITED_PREFIXES = ("Send", "Copy", "Forward", "EditMessage")
+
+
+def _is_rate_limited(method: Any) -> bool:
+    return type(method).__name__.startswith(_RATE_LIMITED_PREFIXES)
+
+
+def _method_cost(method: Any) -> int:
+    media = getattr(method, "media", None)
+    if isinstance(media, list):
+        return max(1, len(media))
+    return 1
+
+
+class SendGateway:
+    def __init__(
+        self,
+        global_rate: float = 25.0,
+        global_burst: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: float = 3.0,
+        group_rate: float = 20.0 / 60.0,
+        group_burst: float = 5.0,
+        max_retries: int = 3,
+        high_watermark: int = 200,
+        flood_chats: int = 3,
+        flood_window: float = 2.0,
+    ):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.chat_rate, self.chat_burst = chat_rate, chat_burst
+        self.group_rate, self.group_burst = group_rate, group_burst
+        self.max_retries = max_retries
+        self.high_watermark = high_watermark
+        self.flood_chats, self.flood_window = flood_chats, flood_window
+        self._recent_retry_after: deque = deque()
+        self._chat_buckets: Dict[Any, TokenBucket] = {}
+        self._waiters: List[Tuple[int, int, Any, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._capacity: Optional[asyncio.Condition] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._stats = {"granted": 0, "retry_after": 0, "retry_after_seconds": 0.0, "wait_ms_total": 0.0, "wait_ms_max": 0.0}
+
+    # -- buckets ---------------------------------------------------------------------------------
+
+    def _chat_bucket(self, chat_id: Any) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            is_group = (isinstance(chat_id, int) and chat_id < 0) or (isinstance(chat_id, str) and chat_id.startswith(("-", "@")))
+            bucket = TokenBucket(self.group_rate, self.group_burst) if is_group else TokenBucket(self.chat_rate, self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _prune_buckets(self, now: float) -> None:
+        if len(self._chat_buckets) < 5000:
+            return
+        for chat_id, bucket in list(self._chat_buckets.items()):
+            if bucket.wait_time(now) == 0 and bucket.tokens >= bucket.capacity:
+                del self._chat_buckets[chat_id]
+
+    # -- scheduling ------------------------------------------------------------------------------
+
+    def _ensure_dispatcher(self) -> None:
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._capacity = asyncio.Condition()
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    async def acquire(self, chat_id: Any, priority: Optional[int] = None, cost: int = 1) -> None:
+        """Wait until a send to chat_id may go out, honouring priority and both bucket levels."""
+        self._ensure_dispatcher()
+        fut = asyncio.get_running_loop().create_future()
+        prio = _priority.get() if priority is None else int(priority)
+        heapq.heappush(self._waiters, (prio, next(self._seq), chat_id, cost, fut))
+        self._wakeup.set()
+        started = time.monotonic()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if not fut.done():
+                fut.cancel()
+            raise
+        waited_ms = (time.monotonic() - started) * 1000.0
+        self._stats["granted"] += 1
+        self._stats["wait_ms_total"] += waited_ms
+        self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], waited_ms)
+
+    async def _dispatch(self) -> None:
+        while True:
+            self._waiters = [w for w in self._waiters if not w[4].done()]
+            heapq.heapify(self._waiters)
+            if not self._waiters:
+                self._wakeup.clear()
+                await self._notify_capacity()
+                await self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            global_wait = self.global_bucket.wait_time(now)
+            next_wake = global_wait
+            granted = None
+            if global_wait == 0:
+                # Highest priority first; within a priority, FIFO. A waiter whose chat is still
+                # throttled does not block other chats behind it.
+                for waiter in sorted(self._waiters):
+                    prio, _seq, chat_id, cost, fut = waiter
+                    chat_wait = self._chat_bucket(chat_id).wait_time(now, cost)
+                    if chat_wait == 0:
+                        granted = waiter
+                        break
+                    next_wake = chat_wait if next_wake == 0 else min(next_wake, chat_wait)
+
+            if granted is not None:
+                _prio, _seq, chat_id, cost, fut = granted
+                self._waiters.remove(granted)
+                self.global_bucket.consume(now, cost)
+                self._chat_bucket(chat_id).consume(now, cost)
+                fut.set_result(None)
+                self._prune_buckets(now)
+                if len(self._waiters) < self.high_watermark:
+                    await self._notify_capacity()
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.005, next_wake))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _notify_capacity(self) -> None:
+        if self._capacity is not None:
+            async with self._capacity:
+                self._capacity.notify_all()
+
+    def penalize(self, chat_id: Any, retry_after: float) -> None:
+        """Apply Telegram's retry_after: pause the chat, and all sends when it looks like a global flood.
+
+        A flood is a retry_after without a chat, or flood_chats different chats throttled within
+        flood_window seconds; one slow chat only pauses itself.
+        """
+        now = time.monotonic()
+        self._stats["retry_after"] += 1
+        self._stats["retry_after_seconds"] += retry_after
+        self._chat_bucket(chat_id).block(now, retry_after)
+        recent = self._recent_retry_after
+        while recent and now - recent[0][0] > self.flood_window:
+            recent.popleft()
+        recent.append((now, chat_id))
+        if chat_id is None or len({c for _t, c in recent}) >= self.flood_chats:
+            self.global_bucket.block(now, retry_after)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # -- backpressure ----------------------------------------------------------------------------
+
+    def pressure(self) -> Dict[str, Any]:
+        queued = sum(1 for w in self._waiters if not w[4].done())
+        by_priority: Dict[str, int] = {}
+        for prio, _seq, _chat, _cost, fut in self._waiters:
+            if not fut.done():
+                name = Priority(prio).name if prio in Priority._value2member_map_ else str(prio)
+                by_priority[name] = by_priority.get(name, 0) + 1
+        rate = self.global_bucket.rate or 1.0
+        return {
+            "queued": queued,
+            "by_priority": by_priority,
+            "estimated_drain_seconds": round(queued / rate, 2),
+            "congested": queued >= self.high_watermark,
+        }
+
+    async def wait_for_capacity(self, max_queued: Optional[int] = None, timeout: Optional[float] = None) -> bool:
+        """Block a producer until the send queue drops below max_queued (default: high watermark)."""
+        limit = self.high_watermark if max_queued is None else max_queued
+        if self.pressure()["queued"] < limit:
+            return True
+        self._ensure_dispatcher()
+
+        async def _wait() -> None:
+            async with self._capacity:
+                await self._capacity.wait_for(lambda: self.pressure()["queued"] < limit)
+
+        try:
+            await asyncio.wait_for(_wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        granted = self._stats["granted"]
+        return {
+            **self._stats,
+            "wait_ms_avg": round(self._stats["wait_ms_total"] / granted, 1) if granted else 0.0,
+            **self.pressure(),
+        }
+
+
+class SendGatewayMiddleware(BaseRequestMiddleware):
+    def __init__(self, gateway: SendGateway):
+        self.gateway = gateway
+
+    async def __call__(self, make_request, bot, method):
+        if not _is_rate_limited(method):
+            return await make_request(bot, method)
+        chat_id = getattr(method, "chat_id", None)
+        cost = _method_cost(method)
+        attempt = 0
+        while True:
+            await self.gateway.acquire(chat_id, cost=cost)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                attempt += 1
+                self.gateway.penalize(chat_id, float(e.retry_after))
+                if attempt > self.gateway.max_retries:
+                    raise
+                logger.warning("Telegram flood control on %s to chat %s: retry after %ss (attempt %d/%d)",
+                               type(method).__name__, chat_id, e.retry_after, attempt, self.gateway.max_retries)
+
+
+send_gateway = SendGateway(
+    global_rate=_env_float("TG_GLOBAL_RATE", 25.0),
+    global_burst=_env_float("TG_GLOBAL_BURST", 30.0),
+    chat_rate=_env_float("TG_CHAT_RATE", 1.0),
+    chat_burst=_env_float("TG_CHAT_BURST", 3.0),
+)
+
+
+def install(bot) -> None:
+    """Route every request of `bot` through the shared gateway."""
+    bot.session.middleware(SendGatewayMiddleware(send_gateway))
@@ -2,18 +2,23 @@ from PIL import Image, ImageDraw, ImageFont, ImageEnhance
 import os
 from datetime import datetime
 from typing import List, Tuple, Dict, Optional
-import arabic_reshaper
-from bidi.algorithm import get_display
 from bot.chat_user_manager import ChatUser
 from bot.font_manager import font_manager
+from bot.page_encoder import PageEncoder
+from bot.text_metrics import LRUCache, font_key, shape_arabic, text_bbox, text_width, truncate_to_width
 import re
 from bot.selected_network_manager import selected_network_manager, SelectedNetwork
 import logging
 
 logger = logging.getLogger(__name__)
+
+# Static page layers keyed by layout; see TableReportGenerator._page_template.
+_PAGE_TEMPLATES = LRUCache(16)
 # from bot.chat_user_manager import chat_user_manager
 
 class TableReportGenerator:
+    MAX_ROWS_PER_PAGE = 30
+
     def __init__(self):
         self.fonts = {}
         self.colors = {
@@ -40,8 +45,12 @@ class TableReportGenerator:
             "black": (0, 0, 0)
         }
         self._load_fonts()
-        self.max_rows_per_page = 30
-        self.image_quality = 100
+        self.max_rows_per_page = self.MAX_ROWS_PER_PAGE
+        # Output encoding (format, quality, size target) comes from REPORT_IMAGE_* / REPORT_JPEG_* settings
+        self.encoder = PageEncoder.from_env()
+        self.image_quality = self.encoder.quality
+        # Full-frame sharpness/contrast pass; off by default (it doubled per-page time and memory).
+        self.enhance_images = False
         self.image_width = 2339
         self.image_height = 1654
         self.right_margin = 50
@@ -110,31 +119,19 @@ class TableReportGenerator:
         return font_manager.get_font('digits_bold' if is_bold else 'digits', int(size))
 
     def _get_text_bbox_draw(self, draw: ImageDraw.Draw, text: str, font: ImageFont.ImageFont):
-        try:
-            if hasattr(draw, 'textbbox'):
-                return draw.textbbox((0, 0), text, font=font)
-        except Exception:
-            pass
         return self._get_text_bbox(text, font)
 
     def _process_arabic_text(self, text: str) -> str:
         if text is None:
             return "-"
         try:
-            s = str(text)
-            # If the text doesn't contain Arabic characters, return as-is
-            if not any('\u0600' <= ch <= '\u06FF' for ch in s):
-                return s
-            reshaped_text = arabic_reshaper.reshape(s)
-            bidi_text = get_display(reshaped_text)
-            return bidi_text
+            return shape_arabic(str(text))
         except Exception:
             # Fallback to original text
             try:
                 return str(text)
             except Exception:
                 return "-"
-
         
     def _clean_text(self, text: str, max_length: int = 20) -> str:
         if not text:
@@ -160,49 +157,14 @@ class TableReportGenerator:
             return str(value)
 
     def _calculate_text_width(self, text: str, font: ImageFont.ImageFont) -> int:
-        try:
-            bbox = font.getbbox(text) if hasattr(font, 'getbbox') else font.getmask(text).getbbox()
-            return bbox[2] - bbox[0] if bbox else len(text) * 10
-        except Exception:
-            return len(text) * 10
+        return text_width(text, font)
 
     def _get_text_bbox(self, text: str, font: ImageFont.ImageFont):
-        try:
-            # Use a small temporary image and ImageDraw.textbbox when available for accurate measurement
-            tmp = Image.new('RGB', (10, 10))
-            draw = ImageDraw.Draw(tmp)
-            if hasattr(draw, 'textbbox'):
-                return draw.textbbox((0, 0), text, font=font)
-            if hasattr(font, 'getbbox'):
-                return font.getbbox(text)
-            mask_bbox = font.getmask(text).getbbox()
-            return mask_bbox
-        except Exception:
-            return (0, 0, len(str(text)) * 12, 28)
+        return text_bbox(text, font)
 
     def _truncate_to_width(self, text: str, font: ImageFont.ImageFont, max_width: int) -> str:
-        """Truncate text so it fits within max_width (pixels) using binary search on character length."""
-        if not text:
-            return text
-        text = str(text)
-        bbox = self._get_text_bbox(text, font)
-        width = bbox[2] - bbox[0] if bbox else len(text) * 8
-        if width <= max_width:
-            return text
-        ellipsis = '...'
-        lo, hi = 0, len(text)
-        best = ''
-        while lo < hi:
-            mid = (lo + hi) // 2
-            candidate = text[:mid].rstrip() + ellipsis
-            bbox_c = self._get_text_bbox(candidate, font)
-            w = bbox_c[2] - bbox_c[0] if bbox_c else len(candidate) * 8
-            if w <= max_width:
-                best = candidate
-                lo = mid + 1
-            else:
-                hi = mid
-        return best or (text[:max(1, len(text)//2)].rstrip() + ellipsis)
+        """Truncate text so it fits within max_width (pixels); memoized per (text, font, width)."""
+        return truncate_to_width(text, font, max_width)
 
     def _draw_rtl_table_header(self, draw: ImageDraw.Draw, y_pos: int):
         columns = [
@@ -579,10 +541,17 @@ class TableReportGenerator:
         delta = (parsed - today).days
         return str(max(delta, 0))
 
-    def _draw_summary_footer(self, draw: ImageDraw.Draw, y_pos: int, total_lines: int, current_page: int, total_pages: int):
+    def _draw_summary_footer_frame(self, draw: ImageDraw.Draw, y_pos: int) -> int:
         footer_height = 60
         draw.rectangle([self.left_margin, y_pos, self.image_width - self.right_margin, y_pos + footer_height],
                        fill=self.colors['accent'], outline=self.colors['border'], width=2)
+        return footer_height
+
+    def _draw_summary_footer(self, draw: ImageDraw.Draw, y_pos: int, total_lines: int, current_page: int, total_pages: int,
+                             draw_frame: bool = True):
+        footer_height = 60
+        if draw_frame:
+            self._draw_summary_footer_frame(draw, y_pos)
 
         # Prepare texts and fonts
         page_suffix = (
@@ -642,6 +611,17 @@ class TableReportGenerator:
         return footer_height
 
     def _draw_report_header(self, draw: ImageDraw.Draw, network: SelectedNetwork, chat_user: ChatUser, current_page: int, total_pages: int, report_date: str = "") -> int:
+        items, bottom = self._layout_report_header(network, chat_user, report_date)
+        for xy, text, fill, font in items:
+            draw.text(xy, text, fill=fill, font=font)
+        return bottom
+
+    def _layout_report_header(self, network: SelectedNetwork, chat_user: ChatUser, report_date: str = ""):
+        """Measure the page header and return ([(xy, text, fill, font), ...], bottom_y) without drawing.
+
+        The bottom is needed up front to pick the cached page template the texts are drawn onto.
+        """
+        items = []
         top_y = 12
         padding_x = 20
         left_x = self.left_margin + padding_x
@@ -653,62 +633,62 @@ class TableReportGenerator:
         day_count = f"الأيام المتبقية لانتهاء الاشتراك: {left_days}" if left_days not in ("-", "", None) else ""
         day_count_ar = self._process_arabic_text(day_count)
         header_font = self.fonts['header']
-        dc_bbox = self._get_text_bbox_draw(draw, day_count_ar, header_font)
+        dc_bbox = self._get_text_bbox(day_count_ar, header_font)
         dc_x0, dc_y0, dc_x1, dc_y1 = dc_bbox
         dc_h = dc_y1 - dc_y0
-        draw.text((left_x - dc_x0, top_y - dc_y0), day_count_ar, fill=self.colors['text_secondary'], font=header_font)
+        items.append(((left_x - dc_x0, top_y - dc_y0), day_count_ar, self.colors['text_secondary'], header_font))
 
         # Right: client info
         clints = self.client_name or network.user_name
         clint_name_ar = self._process_arabic_text(f"اسم المشترك : {clints}")
-        cn_bbox = self._get_text_bbox_draw(draw, clint_name_ar, header_font)
+        cn_bbox = self._get_text_bbox(clint_name_ar, header_font)
         cn_x0, cn_y0, cn_x1, cn_y1 = cn_bbox
         cn_w = cn_x1 - cn_x0
         cn_h = cn_y1 - cn_y0
         clint_name_x = right_x - cn_w - cn_x0
         clint_name_y = top_y - cn_y0
-        draw.text((clint_name_x, clint_name_y), clint_name_ar, fill=self.colors['text_secondary'], font=header_font)
+        items.append(((clint_name_x, clint_name_y), clint_name_ar, self.colors['text_secondary'], header_font))
 
         clints_chat = chat_user.chat_user_id or self.client_chat_id or "----"
         clint_chat_id_ar = self._process_arabic_text(f"معرف المشترك : {clints_chat}")
-        cc_bbox = self._get_text_bbox_draw(draw, clint_chat_id_ar, header_font)
+        cc_bbox = self._get_text_bbox(clint_chat_id_ar, header_font)
         cc_x0, cc_y0, cc_x1, cc_y1 = cc_bbox
         cc_w = cc_x1 - cc_x0
         cc_h = cc_y1 - cc_y0
         spacing = 6
         chat_x = right_x - cc_w - cc_x0
         chat_y = (clint_name_y + cn_h + spacing) - cc_y0
-        draw.text((chat_x, chat_y), clint_chat_id_ar, fill=self.colors['text_secondary'], font=header_font)
+        items.append(((chat_x, chat_y), clint_chat_id_ar, self.colors['text_secondary'], header_font))
 
         # Center: title + subtitle
         title_ar = self._process_arabic_text("تقرير خطوط النت لشبكة {}".format(network.network_name))
-        title_bbox = self._get_text_bbox_draw(draw, title_ar, self.fonts['title'])
+        title_bbox = self._get_text_bbox(title_ar, self.fonts['title'])
         t_x0, t_y0, t_x1, t_y1 = title_bbox
         t_w = t_x1 - t_x0
         t_h = t_y1 - t_y0
         title_y = top_y
         title_x = (self.image_width - t_w) // 2 - t_x0
-        draw.text((title_x, title_y - t_y0), title_ar, fill=self.colors['text_primary'], font=self.fonts['title'])
+        items.append(((title_x, title_y - t_y0), title_ar, self.colors['text_primary'], self.fonts['title']))
 
         subtitle_ar = self._process_arabic_text("تفاصيل الرصيد والاستهلاك")
-        subtitle_bbox = self._get_text_bbox_draw(draw, subtitle_ar, self.fonts['header'])
+        subtitle_bbox = self._get_text_bbox(subtitle_ar, self.fonts['header'])
         s_x0, s_y0, s_x1, s_y1 = subtitle_bbox
         s_w = s_x1 - s_x0
         s_h = s_y1 - s_y0
         subtitle_y = title_y + t_h + 6
         subtitle_x = (self.image_width - s_w) // 2 - s_x0
-        draw.text((subtitle_x, subtitle_y - s_y0), subtitle_ar, fill=self.colors['text_secondary'], font=self.fonts['header'])
+        items.append(((subtitle_x, subtitle_y - s_y0), subtitle_ar, self.colors['text_secondary'], self.fonts['header']))
 
         # Timestamp (right aligned, under subtitle)
         timestamp = datetime.now().strftime("%Y/%m/%d   الساعة : %H:%M:%S") if not report_date else report_date
         timestamp_ar = self._process_arabic_text(f"تاريخ التقرير: {timestamp}")
         timestamp_y = subtitle_y + s_h + 10
-        ts_bbox = self._get_text_bbox_draw(draw, timestamp_ar, header_font)
+        ts_bbox = self._get_text_bbox(timestamp_ar, header_font)
         ts_x0, ts_y0, ts_x1, ts_y1 = ts_bbox
         ts_w = ts_x1 - ts_x0
         ts_h = ts_y1 - ts_y0
         timestamp_x = right_x - ts_w - ts_x0
-        draw.text((timestamp_x, timestamp_y - ts_y0), timestamp_ar, fill=self.colors['text_secondary'], font=header_font)
+        items.append(((timestamp_x, timestamp_y - ts_y0), timestamp_ar, self.colors['text_secondary'], header_font))
 
         bottom = max(
             timestamp_y + ts_h,
@@ -717,7 +697,7 @@ class TableReportGenerator:
             subtitle_y + s_h,
             title_y + t_h,
         )
-        return int(bottom + 12)
+        return items, int(bottom + 12)
 
     def _enhance_image_quality(self, image: Image.Image) -> Image.Image:
         enhancer = ImageEnhance.Sharpness(image)
@@ -726,7 +706,13 @@ class TableReportGenerator:
         image = enhancer.enhance(1.15)
         return image
 
-    def  generate_financial_table_report(self, lines_data: List[Tuple[str, Dict]], network: SelectedNetwork, chat_user: ChatUser, save_path: str = None, report_date: str = "") -> List[str]:
+    # Header/footer extras carried by the (username, lines, extras) form of lines_data.
+    REPORT_EXTRA_FIELDS = (
+        "username", "status", "total_sales", "after_total_sales", "profits",
+        "client_name", "client_chat_id", "day_num",
+    )
+
+    def _prepare_lines(self, lines_data) -> List[Tuple[str, Dict]]:
         # Set optional attributes if provided in lines_data (for compatibility)
         # If lines_data is a tuple as in your new design, unpack accordingly
         if isinstance(lines_data, tuple) and len(lines_data) == 3:
@@ -738,24 +724,40 @@ class TableReportGenerator:
             self.client_name = lines_data[2].get("client_name", None)
             self.client_chat_id = lines_data[2].get("client_chat_id", None)
             self.day_num = lines_data[2].get("day_num", None)
-            lines = lines_data[1]
-        else:
-            lines = lines_data
+            return lines_data[1]
+        return lines_data
+
+    def report_extras(self) -> Dict:
+        return {k: getattr(self, k, None) for k in self.REPORT_EXTRA_FIELDS}
+
+    def apply_report_extras(self, extras: Optional[Dict]) -> None:
+        for k in self.REPORT_EXTRA_FIELDS:
+            setattr(self, k, (extras or {}).get(k))
+
+    def paginate(self, lines_data) -> Tuple[List[Tuple[str, Dict]], List[List[Tuple[str, Dict]]]]:
+        """Normalize lines_data, compute report-wide totals and split rows into pages."""
+        lines = self._prepare_lines(lines_data)
         if not lines:
-            return []
+            return [], []
         # Calculate totals for all lines and store in self.totals
         self.totals = self._calculate_page_totals(lines)
         data_chunks = [
             lines[i:i + self.max_rows_per_page]
             for i in range(0, len(lines), self.max_rows_per_page)
         ]
+        return lines, data_chunks
+
+    def  generate_financial_table_report(self, lines_data: List[Tuple[str, Dict]], network: SelectedNetwork, chat_user: ChatUser, save_path: str = None, report_date: str = "") -> List[str]:
+        lines, data_chunks = self.paginate(lines_data)
+        if not lines:
+            return []
         total_pages = len(data_chunks)
         image_paths = []
         for page_num, data_chunk in enumerate(data_chunks, 1):
             page_save_path = None
             if save_path:
                 base, ext = os.path.splitext(save_path)
-                # normalize to .jpg output
+                # extension is replaced with the encoder's output format
                 page_save_path = f"{base}_page{page_num}.jpg"
             image_path = self._generate_single_page(
                 data_chunk, page_num, total_pages, len(lines), network, chat_user, page_save_path, report_date
@@ -763,6 +765,50 @@ class TableReportGenerator:
             image_paths.append(image_path)
         return image_paths
 
+    def generate_financial_table_report_bytes(self, lines_data: List[Tuple[str, Dict]], network: SelectedNetwork, chat_user: ChatUser, report_date: str = "") -> List[bytes]:
+        """In-memory variant of `generate_financial_table_report`: one encoded JPEG per page, nothing on disk."""
+        lines, data_chunks = self.paginate(lines_data)
+        if not lines:
+            return []
+        total_pages = len(data_chunks)
+        return [
+            self.render_page_bytes(data_chunk, page_num, total_pages, len(lines), network, chat_user, report_date)
+            for page_num, data_chunk in enumerate(data_chunks, 1)
+        ]
+
+    def render_page_bytes(self, lines_data: List[Tuple[str, Dict]], current_page: int, total_pages: int, lines_count: int,
+                          network: SelectedNetwork, chat_user: ChatUser, report_date: str = "") -> bytes:
+        """Render one page (rows already paginated, self.totals already set) to encoded JPEG bytes."""
+        image = self._render_single_page(lines_data, current_page, total_pages, lines_count, network, chat_user, report_date)
+        return self._encode_page(image)
+
+    def _encode_page(self, image: Image.Image) -> bytes:
+        data, _ext = self.encoder.encode(image, quality=self.image_quality)
+        return data
+
+    def _page_template(self, table_start_y: int):
+        """Static page layers (background, borders, table header, summary footer frame) for a layout.
+
+        Rendered once per (size, palette, table position) and shared process-wide; pages draw
+        their dynamic content onto a copy.
+        """
+        key = (
+            self.image_width, self.image_height, self.left_margin, self.right_margin, table_start_y,
+            tuple(sorted(self.colors.items())),
+            font_key(self.fonts['table_header']),
+        )
+
+        def render():
+            width, height = self.image_width, self.image_height
+            image = Image.new("RGB", (width, height), self.colors['bg_primary'])
+            draw = ImageDraw.Draw(image)
+            header_h, columns = self._draw_rtl_table_header(draw, table_start_y)
+            self._draw_summary_footer_frame(draw, height - 100)
+            draw.rectangle([3, 3, width-4, height-4], outline=self.colors['border'], width=3)
+            draw.rectangle([6, 6, width-7, height-7], outline=self.colors['accent'], width=1)
+            return image, header_h, columns
+
+        return _PAGE_TEMPLATES.get_or_compute(key, render)
 
     def _generate_single_page(self, lines_data: List[Tuple[str, Dict]], current_page: int,
                           total_pages: int, lines_count: int, network: SelectedNetwork, chat_user: ChatUser, save_path: str = None, report_date: str = "") -> str:
@@ -770,17 +816,27 @@ class TableReportGenerator:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             save_path = f"reports/financial_report_{timestamp}_page{current_page}.jpg"
         os.makedirs("reports", exist_ok=True)
-        width = self.image_width
+        image = self._render_single_page(lines_data, current_page, total_pages, lines_count, network, chat_user, report_date)
+        data, ext = self.encoder.encode(image, quality=self.image_quality)
+        save_path = f"{os.path.splitext(save_path)[0]}.{ext}"
+        with open(save_path, "wb") as fh:
+            fh.write(data)
+        return save_path
+
+    def _render_single_page(self, lines_data: List[Tuple[str, Dict]], current_page: int, total_pages: int, lines_count: int,
+                            network: SelectedNetwork, chat_user: ChatUser, report_date: str = "") -> Image.Image:
         height = self.image_height
-        image = Image.new("RGB", (width, height), self.colors['bg_primary'])
-        draw = ImageDraw.Draw(image)
-        header_bottom = self._draw_report_header(draw,network, chat_user, current_page, total_pages, report_date)
+        header_items, header_bottom = self._layout_report_header(network, chat_user, report_date)
         table_start_y = max(175, header_bottom + 20)
-        header_h, columns = self._draw_rtl_table_header(draw, table_start_y)
+        template, header_h, columns = self._page_template(table_start_y)
+        image = template.copy()
+        draw = ImageDraw.Draw(image)
+        for xy, text, fill, font in header_items:
+            draw.text(xy, text, fill=fill, font=font)
         current_y = table_start_y + header_h
         max_table_height = height - 200
         for i, line_data in enumerate(lines_data):
-            logger.info("Drawing row %d for line %s", i + 1, line_data)
+            logger.debug("Drawing row %d for line %s", i + 1, line_data)
             if current_y + 25 > max_table_height:
                 break
             row_h = self._draw_rtl_table_row(draw,network, line_data, current_y, columns, i)
@@ -793,15 +849,10 @@ class TableReportGenerator:
             page_totals = None
         self._draw_rtl_table_footer(draw, current_y, totals=page_totals)
         footer_y = height - 100
-        self._draw_summary_footer(draw, footer_y, lines_count, current_page, total_pages)
-        draw.rectangle([3, 3, width-4, height-4], outline=self.colors['border'], width=3)
-        draw.rectangle([6, 6, width-7, height-7], outline=self.colors['accent'], width=1)
-        image = self._enhance_image_quality(image)
-        # ensure RGB and save as JPEG to maximize Telegram compatibility
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        image.save(save_path, "JPEG", optimize=True, quality=self.image_quality)
-        return save_path
+        self._draw_summary_footer(draw, footer_y, lines_count, current_page, total_pages, draw_frame=False)
+        if self.enhance_images:
+            image = self._enhance_image_quality(image)
+        return image
 
 
 def extract_date(text):
@@ -0,0 +1,161 @@
+"""Process-wide memo caches for Arabic shaping and glyph metrics.
+
+Report rendering reshapes and measures the same column labels, statuses and
+plan names thousands of times per run. These helpers keep bounded LRU maps of
+text -> shaped text and (text, font) -> bbox / advance, shared by every
+generator instance and safe to use from the executor threads.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Tuple
+
+import arabic_reshaper
+from bidi.algorithm import get_display
+from PIL import ImageFont
+
+BBox = Tuple[int, int, int, int]
+
+_ELLIPSIS = "..."
+
+
+class LRUCache:
+    """Small thread-safe LRU map with hit/miss counters."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            try:
+                value = self._data[key]
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            except KeyError:
+                self.misses += 1
+        value = compute()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+_shaped = LRUCache(8192)
+_bboxes = LRUCache(32768)
+_advances = LRUCache(8192)
+_truncated = LRUCache(16384)
+
+
+def font_key(font: ImageFont.ImageFont) -> Hashable:
+    """Identify a font by what determines its metrics, so equal fonts share cache entries."""
+    path = getattr(font, "path", None)
+    if path is None:
+        return ("id", id(font))
+    return (path, getattr(font, "size", None), getattr(font, "index", 0), getattr(font, "layout_engine", None))
+
+
+def _has_arabic(s: str) -> bool:
+    return any('\u0600' <= ch <= '\u06FF' for ch in s)
+
+
+def shape_arabic(text: str) -> str:
+    """Reshape + bidi-reorder text containing Arabic; other text is returned unchanged."""
+    if not _has_arabic(text):
+        return text
+    return _shaped.get_or_compute(text, lambda: get_display(arabic_reshaper.reshape(text)))
+
+
+def _measure_bbox(text: str, font: ImageFont.ImageFont) -> BBox:
+    try:
+        # Same result as ImageDraw.textbbox((0, 0), ...) without allocating a scratch image.
+        if hasattr(font, "getbbox"):
+            return tuple(font.getbbox(text))
+        mask_bbox = font.getmask(text).getbbox()
+        return tuple(mask_bbox) if mask_bbox else (0, 0, 0, 0)
+    except Exception:
+        return (0, 0, len(str(text)) * 12, 28)
+
+
+def text_bbox(text: str, font: ImageFont.ImageFont) -> BBox:
+    return _bboxes.get_or_compute((text, font_key(font)), lambda: _measure_bbox(text, font))
+
+
+def text_width(text: str, font: ImageFont.ImageFont) -> int:
+    x0, _, x1, _ = text_bbox(text, font)
+    return x1 - x0
+
+
+def _advance(ch: str, font: ImageFont.ImageFont) -> float:
+    def compute() -> float:
+        try:
+            return float(font.getlength(ch))
+        except Exception:
+            return float(text_width(ch, font))
+
+    return _advances.get_or_compute((ch, font_key(font)), compute)
+
+
+def _prefix_advances(text: str, font: ImageFont.ImageFont) -> List[float]:
+    widths = [0.0]
+    total = 0.0
+    for ch in text:
+        total += _advance(ch, font)
+        widths.append(total)
+    return widths
+
+
+def _truncate(text: str, font: ImageFont.ImageFont, max_width: int) -> str:
+    if text_width(text, font) <= max_width:
+        return text
+    # Pick the longest prefix whose summed glyph advances leave room for the ellipsis,
+    # then confirm with one real measurement (kerning/shaping can shift it by a pixel or two).
+    budget = max_width - text_width(_ELLIPSIS, font)
+    prefix = _prefix_advances(text, font)
+    n = 0
+    for i in range(1, len(text) + 1):
+        if prefix[i] > budget:
+            break
+        n = i
+    while n > 0:
+        candidate = text[:n].rstrip() + _ELLIPSIS
+        if text_width(candidate, font) <= max_width:
+            return candidate
+        n -= 1
+    return text[:max(1, len(text) // 2)].rstrip() + _ELLIPSIS
+
+
+def truncate_to_width(text: str, font: ImageFont.ImageFont, max_width: int) -> str:
+    """Truncate text with '...' so it fits within max_width pixels."""
+    if not text:
+        return text
+    text = str(text)
+    return _truncated.get_or_compute((text, font_key(font), max_width), lambda: _truncate(text, font, max_width))
+
+
+def cache_stats() -> dict:
+    return {
+        "shaped": _shaped.stats(),
+        "bbox": _bboxes.stats(),
+        "advance": _advances.stats(),
+        "truncate": _truncated.stats(),
+    }
+
+
+def clear_caches() -> None:
+    for cache in (_shaped, _bboxes, _advances, _truncated):
+        cache.clear()
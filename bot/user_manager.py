@@ -1,6 +1,10 @@
+from functools import partial
 from typing import Any, Dict, List, Optional
 import logging
+from bot.cache import CacheManager
 from bot.utils_shared import (
+    TAG_CHAT_NETWORKS,
+    TAG_NETWORK_USERS,
     activate_chat_user,
     activate_network,
     approve_registration,
@@ -22,11 +26,13 @@ from bot.utils_shared import (
     insert_user_account,
     get_users_by_network_db,
     get_latest_account_data_db,
+    get_latest_account_data_for_users_db,
     get_user_logs_db,
     get_all_users_by_network_id,
     remove_network,
     set_selected_network,
     get_all_tokens,
+    get_due_report_deliveries,
     get_token_by_network_id,
     sync_users_exists,
     update_chat_user,
@@ -52,6 +58,18 @@ LOG_FORMAT = "%(asctime)s | %(levelname)-8s | %(name)s | %(message)s"
 logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
 logger = logging.getLogger("YemenNetBot.user_manager")
 
+# Hot lookups go through CacheManager.get_or_load: concurrent misses share one query and an expired
+# list is served while it reloads. The write helpers in bot.utils_shared invalidate the tags right
+# away; TTLs stay short for writes made outside them (e.g. the scraper).
+USERS_CACHE_TTL = 30.0
+NETWORKS_CACHE_TTL = 60.0
+STALE_CACHE_TTL = 120.0
+
+
+async def _load_data(fetch, *args) -> List[Dict[str, Any]]:
+    resp = await fetch(*args)
+    return getattr(resp, "data", None) or []
+
 
 def _extract_success_message(result: Any) -> tuple[Optional[bool], Optional[str]]:
     """Normalize success/message extraction from varied response shapes.
@@ -132,8 +150,13 @@ class UserManager:
     @staticmethod
     async def get_users_by_network(network_id: str):
         try:
-            resp = await get_users_by_network_db(network_id)
-            return getattr(resp, "data", None) or []
+            return await CacheManager.get_or_load(
+                f"network_users:{network_id}",
+                partial(_load_data, get_users_by_network_db, network_id),
+                ttl=USERS_CACHE_TTL,
+                stale_ttl=STALE_CACHE_TTL,
+                tags=(TAG_NETWORK_USERS, f"network:{network_id}"),
+            )
         except Exception as e:
             logger.error(f"get_users_by_network error for network {network_id}: {e}")
             return []
@@ -160,6 +183,17 @@ class UserManager:
             logger.debug(f"get_latest_account_data persistent error for user_id {user_id}: {e}")
             return None
 
+    @staticmethod
+    async def get_latest_account_data_for_users(user_ids: List[str], is_admin: bool = False) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Latest saved row per user, keyed by str(user_id). Returns None when the batch read fails."""
+        try:
+            resp = await get_latest_account_data_for_users_db(user_ids, is_admin=is_admin)
+            data = getattr(resp, "data", None) or []
+            return {str(row.get("user_id")): row for row in data if row.get("user_id") is not None}
+        except Exception as e:
+            logger.warning(f"get_latest_account_data_for_users error for {len(user_ids)} users: {e}")
+            return None
+
     @staticmethod
     async def get_available_report_dates(user_ids: List[str], limit: int = 120) -> List[str]:
         try:
@@ -279,6 +313,16 @@ class UserManager:
             logger.error(f"get_all_tokens error: {e}")
             return []
         
+    @staticmethod
+    async def get_due_report_deliveries(slot_bit: int, today) -> List[Dict[str, Any]]:
+        """Every (recipient, network) due at a report slot, each with its active lines under "lines"."""
+        try:
+            resp = await get_due_report_deliveries(slot_bit, today)
+            return getattr(resp, "data", None) or []
+        except Exception as e:
+            logger.error(f"get_due_report_deliveries error for slot bit {slot_bit}: {e}")
+            return []
+
     @staticmethod
     async def get_chat_user(telegram_id: str) -> Optional[tuple[int, str, bool,str]]:
         try:
@@ -429,8 +473,13 @@ class UserManager:
     @staticmethod
     async def get_networks_for_user(chat_user_id: str) -> List[Dict[str, Any]]:
         try:
-            resp = await get_networks_for_user(chat_user_id)
-            return getattr(resp, "data", None) or []
+            return await CacheManager.get_or_load(
+                f"user_networks:{chat_user_id}",
+                partial(_load_data, get_networks_for_user, chat_user_id),
+                ttl=NETWORKS_CACHE_TTL,
+                stale_ttl=STALE_CACHE_TTL,
+                tags=(TAG_CHAT_NETWORKS, f"chat_user:{chat_user_id}"),
+            )
         except Exception as e:
             logger.error(f"get_networks_for_user error for chat_user_id {chat_user_id}: {e}")
             return []
@@ -456,8 +505,13 @@ class UserManager:
     @staticmethod
     async def get_network_partners(network_id: int,with_owner: bool=False) -> List[Dict[str, Any]]:
         try:
-            resp = await get_all_partnered_networks(network_id,with_owner)
-            data = getattr(resp, "data", None) or []
+            data = await CacheManager.get_or_load(
+                f"network_partners:{network_id}:{int(bool(with_owner))}",
+                partial(_load_data, get_all_partnered_networks, network_id, with_owner),
+                ttl=NETWORKS_CACHE_TTL,
+                stale_ttl=STALE_CACHE_TTL,
+                tags=(TAG_CHAT_NETWORKS, f"network:{network_id}"),
+            )
             if isinstance(data, dict):
                 return data
             elif isinstance(data, list):
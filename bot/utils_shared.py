@@ -4,14 +4,16 @@ import logging
 import os
 import re
 from datetime import date, datetime
-from functools import partial
+from functools import partial, wraps
 from typing import Any, Callable, Dict, Optional
 
 import psycopg2
 from psycopg2 import errors as pg_errors
 
+from bot import async_postgres as async_pg
 from bot.app import EXEC
 from bot.cache import CacheManager
+from bot.schema_cache import schema_cache
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 from bot.local_postgres import (
@@ -25,6 +27,35 @@ from bot.local_postgres import (
     insert_returning_one,
 )
 
+# Cache tags of UserManager's cached lookups (users by network; networks_details rows per chat user,
+# which carry adsls_count). Every write helper below that changes those rows drops its tags, so
+# callers that write through this module directly never leave a stale cached read behind.
+TAG_NETWORK_USERS = "network_users"
+TAG_CHAT_NETWORKS = "chat_networks"
+
+
+def _invalidates(*tags: str):
+    """Drop cached lookups under tags once the wrapped write has run (even if it failed halfway)."""
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def wrapper(*args, **kwargs):
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    for tag in tags:
+                        CacheManager.invalidate(tag)
+        else:
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    for tag in tags:
+                        CacheManager.invalidate(tag)
+        return wrapper
+    return decorator
+
 
 def _sync_count_table(tbl: str,filter_column: Optional[str] = None, filter_value: Optional[Any] = None):
     try:
@@ -383,13 +414,51 @@ def _sync_get_user_data(username: str, network_id: str, is_admin: bool = False):
     rows = fetch_all(base, params)
     return DBResponse(data=rows)
 
+# Queries with an async twin (bot.async_postgres) are shared so both layers read the same rows
+_USERS_BY_NETWORK_SQL = 'SELECT id, username, adsl_number, status, order_index FROM users_accounts WHERE network_id = %s AND is_active = TRUE ORDER BY id DESC'
+_CHAT_USER_SQL = 'SELECT * FROM chats_users WHERE telegram_id = %s LIMIT 1'
+_NETWORKS_FOR_USER_SQL = 'SELECT * FROM networks_details WHERE chat_user_id = %s'
+
 def _sync_get_users_by_network(network_id: str):
-    rows = fetch_all(
-        'SELECT id, username, adsl_number, status, order_index FROM users_accounts WHERE network_id = %s AND is_active = TRUE ORDER BY id DESC',
-        [network_id],
-    )
+    rows = fetch_all(_USERS_BY_NETWORK_SQL, [network_id])
     return DBResponse(data=rows)
 
+# Daily report fan-out plan: one row per (recipient, network) due at a report slot, with the
+# network's active lines attached. Mirrors the per-token walk (selected recipients -> all their
+# networks -> active lines) with the expiry / is_active / times_to_send_reports checks in SQL;
+# a times_to_send_reports of 0 means "no restriction", as in the Python check it replaces.
+_DUE_REPORT_DELIVERIES_SQL = '''
+SELECT cu.telegram_id, cu.id AS chat_user_id, cu.user_name AS chat_user_name,
+       cu.receive_partnered_report, cu.is_active AS chat_user_is_active, cu.order_by,
+       cn.id, cn.network_id, cn.network_type, cn.permissions, cn.times_to_send_reports,
+       cn.warning_count_remaining_days, cn.danger_count_remaining_days,
+       cn.warning_percentage_remaining_balance, cn.danger_percentage_remaining_balance,
+       cn.is_active AS is_partner_active, cu.user_name, n.network_name,
+       n.is_active AS is_network_active, n.expiration_date, lines.lines
+FROM chats_users cu
+JOIN chats_networks cn ON cn.chat_user_id = cu.id
+JOIN networks n ON n.id = cn.network_id
+CROSS JOIN LATERAL (
+    SELECT json_agg(json_build_object(
+               'id', ua.id, 'username', ua.username, 'adsl_number', ua.adsl_number,
+               'status', ua.status, 'order_index', ua.order_index
+           ) ORDER BY ua.id DESC) AS lines
+    FROM users_accounts ua
+    WHERE ua.network_id = n.id AND ua.is_active = TRUE
+) lines
+WHERE EXISTS (SELECT 1 FROM chats_networks sel WHERE sel.chat_user_id = cu.id AND sel.is_selected_network = TRUE)
+  AND n.is_active = TRUE
+  AND (n.expiration_date IS NULL OR n.expiration_date >= %s)
+  AND (cn.times_to_send_reports = 0 OR (cn.times_to_send_reports & %s) <> 0)
+  AND lines.lines IS NOT NULL
+ORDER BY cu.telegram_id, cn.id DESC
+'''
+
+
+def _sync_get_due_report_deliveries(slot_bit: int, today: date):
+    return DBResponse(data=fetch_all(_DUE_REPORT_DELIVERIES_SQL, [today, slot_bit]))
+
+
 def _sync_get_all_users_for_admin():
     return DBResponse(
         data=fetch_all(
@@ -526,46 +595,63 @@ def _sync_delete_partnered_networks(chat_network_id: int):
     execute("DELETE FROM chats_networks WHERE id = %s AND network_type = 'partner'", [chat_network_id])
     return DBResponse(data=[])
 
+def _latest_account_data_query(is_admin: bool) -> str:
+    base = "SELECT * FROM adsl_daily_report WHERE user_id = %s"
+    if not is_admin:
+        base += " AND is_active = TRUE"
+    # Prefer report_date when present; otherwise fall back to LIMIT 1 without ordering.
+    if schema_cache.has_column("adsl_daily_report", "report_date"):
+        return base + " ORDER BY report_date DESC LIMIT 1"
+    return base + " LIMIT 1"
+
 def _sync_get_latest_account_data(user_id: str, is_admin: bool = False):
-    def _has_col(table_name: str, column_name: str) -> bool:
-        try:
-            return bool(
-                fetch_value(
-                    """
-                    SELECT 1
-                    FROM information_schema.columns
-                    WHERE table_schema = 'public'
-                      AND table_name = %s
-                      AND column_name = %s
-                    LIMIT 1
-                    """.strip(),
-                    [table_name, column_name],
-                )
-            )
-        except Exception:
-            return False
+    try:
+        row = fetch_one(_latest_account_data_query(is_admin), [user_id])
+    except (pg_errors.UndefinedTable, pg_errors.UndefinedColumn):
+        # Schema changed since the cache was loaded; re-read it and retry once.
+        schema_cache.refresh()
+        row = fetch_one(_latest_account_data_query(is_admin), [user_id])
+    return DBResponse(data=[row] if row else [])
 
-    def _fetch_latest(table: str) -> DBResponse:
-        base = f"SELECT * FROM {table} WHERE user_id = %s"
-        params: list[Any] = [user_id]
-        if not is_admin:
-            base += " AND is_active = TRUE"
+async def _async_get_latest_account_data(user_id: str, is_admin: bool = False):
+    """Event-loop native twin of `_sync_get_latest_account_data`."""
+    await _ensure_schema_cache()
+    try:
+        row = await async_pg.fetch_one(_latest_account_data_query(is_admin), [user_id])
+    except async_pg.SCHEMA_ERRORS:
+        await refresh_schema_cache()
+        row = await async_pg.fetch_one(_latest_account_data_query(is_admin), [user_id])
+    return DBResponse(data=[row] if row else [])
 
-        # Prefer report_date when present; otherwise fall back to LIMIT 1 without ordering.
-        order_col = "report_date" if _has_col(table, "report_date") else None
-        if order_col:
-            base += f" ORDER BY {order_col} DESC LIMIT 1"
-        else:
-            base += " LIMIT 1"
+def _latest_for_users_query(is_admin: bool) -> str:
+    q = "SELECT DISTINCT ON (user_id) * FROM adsl_daily_report WHERE user_id = ANY(%s::uuid[])"
+    if not is_admin:
+        q += " AND is_active = TRUE"
+    if schema_cache.has_column("adsl_daily_report", "report_date"):
+        return q + " ORDER BY user_id, report_date DESC"
+    return q + " ORDER BY user_id"
 
-        row = fetch_one(base, params)
-        return DBResponse(data=[row] if row else [])
+def _sync_get_latest_account_data_for_users(user_ids: list, is_admin: bool = False):
+    if not user_ids:
+        return DBResponse(data=[])
+    try:
+        rows = fetch_all(_latest_for_users_query(is_admin), [list(user_ids)])
+    except (pg_errors.UndefinedTable, pg_errors.UndefinedColumn):
+        schema_cache.refresh()
+        rows = fetch_all(_latest_for_users_query(is_admin), [list(user_ids)])
+    return DBResponse(data=rows)
 
+async def _async_get_latest_account_data_for_users(user_ids: list, is_admin: bool = False):
+    if not user_ids:
+        return DBResponse(data=[])
+    await _ensure_schema_cache()
     try:
-        return _fetch_latest("adsl_daily_report")
-    except psycopg2.errors.UndefinedTable:
-        # Back-compat if the object name differs in some deployments
-        return _fetch_latest("adsl_daily_report")
+        rows = await async_pg.fetch_all(_latest_for_users_query(is_admin), [list(user_ids)])
+    except async_pg.SCHEMA_ERRORS:
+        await refresh_schema_cache()
+        rows = await async_pg.fetch_all(_latest_for_users_query(is_admin), [list(user_ids)])
+    return DBResponse(data=rows)
+
 def _sync_get_user_logs(user_id: str, limit: int = 5):
     return DBResponse(
         data=fetch_all(
@@ -583,20 +669,37 @@ def _sync_get_users_ordered():
     )
 
 
+def _daily_reports_for_users_query() -> str:
+    q = "SELECT * FROM adsl_daily_reports WHERE user_id = ANY(%s::uuid[]) AND report_date = %s"
+    if not schema_cache.has_table("adsl_daily_reports"):
+        # Let the database report the missing table (refreshed and retried below, then raised)
+        return q
+    if schema_cache.has_column("adsl_daily_reports", "username"):
+        return q + " ORDER BY username ASC"
+    if schema_cache.has_column("adsl_daily_reports", "order_index"):
+        return q + " ORDER BY order_index ASC"
+    return q
+
 def _sync_get_daily_reports_for_users(user_ids: list, report_date: str):
     if not user_ids:
         return {"data": []}
-    try:
-        rows = fetch_all(
-            'SELECT * FROM adsl_daily_reports WHERE user_id = ANY(%s::uuid[]) AND report_date = %s ORDER BY username ASC',
-            [user_ids, report_date],
-        )
-    except psycopg2.errors.UndefinedColumn:
-        rows = fetch_all(
-            'SELECT * FROM adsl_daily_reports WHERE user_id = ANY(%s::uuid[]) AND report_date = %s ORDER BY order_index ASC, username ASC',
-            [user_ids, report_date],
-        )
-    return DBResponse(data=rows)
+    for attempt in (1, 2):
+        query = _daily_reports_for_users_query()
+        try:
+            return DBResponse(data=fetch_all(query, [user_ids, report_date]))
+        except (pg_errors.UndefinedTable, pg_errors.UndefinedColumn):
+            if attempt == 2:
+                raise
+            schema_cache.refresh()
+
+
+async def _ensure_schema_cache() -> None:
+    if not schema_cache.loaded:
+        await run_blocking(schema_cache.load)
+
+async def refresh_schema_cache() -> None:
+    """(Re)load the schema introspection cache; called at startup and after migrations."""
+    await run_blocking(schema_cache.refresh)
 
 
 async def get_daily_reports_for_users(user_ids: list, report_date: str):
@@ -626,7 +729,7 @@ def _sync_get_account_available_balance(user_id: str, offset: int = 0):
     return DBResponse(data=rows)
 
 def _sync_get_chat_user(telegram_id: str):
-    row = fetch_one('SELECT * FROM chats_users WHERE telegram_id = %s LIMIT 1', [telegram_id])
+    row = fetch_one(_CHAT_USER_SQL, [telegram_id])
     return DBResponse(data=row or {})
 
 def _sync_get_chats_users():
@@ -695,7 +798,7 @@ def _sync_get_network_by_network_id(network_id: int):
     return DBResponse(data=row or {})
 
 def _sync_get_networks_for_user(chat_user_id: int):
-    rows = fetch_all('SELECT * FROM networks_details WHERE chat_user_id = %s', [chat_user_id])
+    rows = fetch_all(_NETWORKS_FOR_USER_SQL, [chat_user_id])
     return DBResponse(data=rows)
 
 def _sync_update_chat_user(telegram_id: str, user_name: str):
@@ -1078,17 +1181,21 @@ async def user_exists(username: str):
     return await run_blocking(partial(_sync_user_exists, username))
 
 
+@_invalidates(TAG_NETWORK_USERS, TAG_CHAT_NETWORKS)
 async def insert_user_account(username: str, password: str, network_id: str, adsl: Optional[str] = None):
     return await run_blocking(partial(_sync_insert_user_account, username, password, network_id, adsl))
 
+@_invalidates(TAG_NETWORK_USERS, TAG_CHAT_NETWORKS)
 async def insert_users_accounts(usernames: list, network_id: str, adsl: Optional[str] = None):
     return await run_blocking(partial(_sync_insert_users_accounts, usernames, network_id, adsl))
 
 
+@_invalidates(TAG_NETWORK_USERS, TAG_CHAT_NETWORKS)
 async def delete_user_account(username: str):
     return await run_blocking(partial(_sync_delete_user, username))
 
 
+@_invalidates(TAG_NETWORK_USERS, TAG_CHAT_NETWORKS)
 async def update_user_status(username: str, status: str):
     return await run_blocking(partial(_sync_update_user_status, username, status))
 
@@ -1105,12 +1212,42 @@ async def get_user_data_db(username: str, network_id: str, is_admin: bool = Fals
     return await run_blocking(partial(_sync_get_user_data, username, network_id, is_admin))
 
 
+async def _read_async_or_blocking(name: str, read_async, sync_fn, retries: int = 2, initial_backoff: float = 0.2):
+    """Run a hot read on the async pool, retrying transient errors, then fall back to the psycopg2 path."""
+    if async_pg.is_available():
+        backoff = initial_backoff
+        for attempt in range(1, retries + 1):
+            try:
+                return await read_async()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("%s async attempt %s/%s failed: %s", name, attempt, retries, e or type(e).__name__)
+            if attempt < retries:
+                await asyncio.sleep(backoff)
+                backoff *= 2
+        logger.warning("%s: async pool unavailable, falling back to the blocking driver", name)
+    return await run_blocking(sync_fn)
+
+
 async def get_users_by_network_db(network_id: str):
-    return await run_blocking(partial(_sync_get_users_by_network, network_id))
+    async def read():
+        return DBResponse(data=await async_pg.fetch_all(_USERS_BY_NETWORK_SQL, [network_id]))
+
+    return await _read_async_or_blocking(
+        "get_users_by_network_db", read, partial(_sync_get_users_by_network, network_id)
+    )
+
+async def get_due_report_deliveries(slot_bit: int, today: date):
+    if async_pg.is_available():
+        rows = await async_pg.fetch_all(_DUE_REPORT_DELIVERIES_SQL, [today, slot_bit])
+        return DBResponse(data=rows)
+    return await run_blocking(partial(_sync_get_due_report_deliveries, slot_bit, today))
 
 async def get_all_users_for_admin():
     return await run_blocking(_sync_get_all_users_for_admin)
 
+@_invalidates(TAG_NETWORK_USERS, TAG_CHAT_NETWORKS)
 async def activate_users(users_ids: list):
     return await run_blocking(partial(_sync_set_users_active, users_ids))
 
@@ -1126,6 +1263,8 @@ async def get_latest_account_data_db(user_id: str, retries: int = 4, initial_bac
     backoff = initial_backoff
     for attempt in range(1, retries + 1):
         try:
+            if async_pg.is_available():
+                return await _async_get_latest_account_data(user_id, is_admin)
             return await run_blocking(partial(_sync_get_latest_account_data, user_id, is_admin))
         except asyncio.TimeoutError:
             logger.warning("get_latest_account_data_db timeout for user %s (attempt %s/%s)", user_id, attempt, retries)
@@ -1144,6 +1283,30 @@ async def get_latest_account_data_db(user_id: str, retries: int = 4, initial_bac
         raise last_exc
 
 
+async def get_latest_account_data_for_users_db(user_ids: list, retries: int = 4, initial_backoff: float = 0.5, is_admin: bool = False):
+    """Batched `get_latest_account_data_db`: one DISTINCT ON query for all users, same retry policy."""
+    last_exc = None
+    backoff = initial_backoff
+    for attempt in range(1, retries + 1):
+        try:
+            if async_pg.is_available():
+                return await _async_get_latest_account_data_for_users(user_ids, is_admin)
+            return await run_blocking(partial(_sync_get_latest_account_data_for_users, user_ids, is_admin))
+        except asyncio.TimeoutError:
+            logger.warning("get_latest_account_data_for_users_db timeout for %s users (attempt %s/%s)", len(user_ids), attempt, retries)
+            last_exc = asyncio.TimeoutError()
+        except Exception as e:
+            logger.warning("get_latest_account_data_for_users_db attempt %s/%s failed for %s users: %s", attempt, retries, len(user_ids), e)
+            last_exc = e
+
+        if attempt < retries:
+            await asyncio.sleep(backoff)
+            backoff *= 2
+
+    if last_exc:
+        raise last_exc
+
+
 async def get_users_accounts2(limit: int = 20, offset: int = 0):
     return await run_blocking(partial(_sync_get_users_accounts2, limit, offset))
 
@@ -1161,7 +1324,10 @@ async def get_user_logs_db(user_id: str, limit: int = 5):
     return await run_blocking(partial(_sync_get_user_logs, user_id, limit))
 
 async def get_chat_user(telegram_id: str):
-    return await run_blocking(partial(_sync_get_chat_user, telegram_id))
+    async def read():
+        return DBResponse(data=await async_pg.fetch_one(_CHAT_USER_SQL, [telegram_id]) or {})
+
+    return await _read_async_or_blocking("get_chat_user", read, partial(_sync_get_chat_user, telegram_id))
 
 async def get_chats_users():
     return await run_blocking(_sync_get_chats_users)
@@ -1169,15 +1335,23 @@ async def get_chats_users():
 async def get_chat_users_tokens(chats_users_ids: list):
     return await run_blocking(partial(_sync_get_chat_users_tokens, chats_users_ids))
 
+@_invalidates(TAG_CHAT_NETWORKS)
 async def create_chat_user(telegram_id: str, user_name: str):
     return await run_blocking(partial(_sync_create_chat_user, telegram_id, user_name))
 
+@_invalidates(TAG_CHAT_NETWORKS)
 async def create_network(chat_user_id: int, network_name: str):
     return await run_blocking(partial(_sync_create_network, chat_user_id, network_name))
 
 async def get_networks_for_user(chat_user_id: int):
-    return await run_blocking(partial(_sync_get_networks_for_user, chat_user_id))
+    async def read():
+        return DBResponse(data=await async_pg.fetch_all(_NETWORKS_FOR_USER_SQL, [chat_user_id]))
+
+    return await _read_async_or_blocking(
+        "get_networks_for_user", read, partial(_sync_get_networks_for_user, chat_user_id)
+    )
 
+@_invalidates(TAG_CHAT_NETWORKS)
 async def set_selected_network(chat_network_id: int, chat_user_id: int):
     return await run_blocking(partial(_sync_set_selected_network, chat_network_id, chat_user_id))
 
@@ -1190,35 +1364,45 @@ async def get_token_by_network_id(network_id: str):
 async def get_all_tokens():
     return await run_blocking(_sync_get_all_tokens)
 
+@_invalidates(TAG_CHAT_NETWORKS)
 async def update_chat_user(telegram_id: str, user_name: str):
     return await run_blocking(partial(_sync_update_chat_user, telegram_id, user_name))
 
+@_invalidates(TAG_CHAT_NETWORKS)
 async def update_network(chat_network_id: int, network_name: str, times_to_send_reports: int):
     return await run_blocking(partial(_sync_update_network, chat_network_id, network_name, times_to_send_reports))
 
+@_invalidates(TAG_NETWORK_USERS, TAG_CHAT_NETWORKS)
 async def change_users_network(users_ids: list, old_network_id: int, new_network_id: int):
     return await run_blocking(partial(_sync_change_users_network, users_ids, old_network_id, new_network_id))
 
+@_invalidates(TAG_CHAT_NETWORKS)
 async def add_network_partner(network_id: int, chat_user_id: int, permissions: int = 1):
     return await run_blocking(partial(_sync_add_network_partner, network_id, chat_user_id, permissions))
 
+@_invalidates(TAG_CHAT_NETWORKS)
 async def activate_partnered_networks(chat_network_id: int):
     return await run_blocking(partial(_sync_activate_partnered_networks, chat_network_id))
 
 async def get_all_partnered_networks(network_id: int,with_owner: bool=False):
     return await run_blocking(partial(_sync_get_all_partnered_networks, network_id, with_owner))
+@_invalidates(TAG_CHAT_NETWORKS)
 async def deactivate_partnered_networks(chat_network_id: int):
     return await run_blocking(partial(_sync_deactivate_partnered_networks, chat_network_id))
 
+@_invalidates(TAG_CHAT_NETWORKS)
 async def change_partner_permissions(chat_network_id: int, permissions: int):
     return await run_blocking(partial(_sync_change_partner_permissions, chat_network_id, permissions))
 
+@_invalidates(TAG_CHAT_NETWORKS)
 async def delete_partnered_networks(chat_network_id: int):
     return await run_blocking(partial(_sync_delete_partnered_networks, chat_network_id))
 
+@_invalidates(TAG_NETWORK_USERS, TAG_CHAT_NETWORKS)
 async def delete_users_by_ids(users_ids: list):
     return await run_blocking(partial(_sync_delete_users_by_ids, users_ids))
 
+@_invalidates(TAG_NETWORK_USERS, TAG_CHAT_NETWORKS)
 async def remove_network(network_id: int):
     return await run_blocking(partial(_sync_remove_network, network_id))
 
@@ -1231,27 +1415,35 @@ async def users_exists(adsls: list):
 async def users_exists_accounts2(adsls: list):
     return await run_blocking(partial(_sync_users_exists_accounts2, adsls))
 
+@_invalidates(TAG_CHAT_NETWORKS)
 async def change_chat_networks_times_to_send_reports(chat_network_id: int, times_to_send_reports: int):
     return await run_blocking(partial(_sync_change_chat_networks_times_to_send_reports, chat_network_id, times_to_send_reports))
 
+@_invalidates(TAG_CHAT_NETWORKS)
 async def change_warning_and_danger_settings(chat_network_id: int, warning_count_remaining_days: int, danger_count_remaining_days: int, warning_percentage_remaining_balance: int, danger_percentage_remaining_balance: int):
     return await run_blocking(partial(_sync_change_warning_and_danger_settings, chat_network_id, warning_count_remaining_days, danger_count_remaining_days, warning_percentage_remaining_balance, danger_percentage_remaining_balance))
 
+@_invalidates(TAG_CHAT_NETWORKS)
 async def change_receive_partnered_reports(chat_user_id: int, receive_partnered_report: bool):
     return await run_blocking(partial(_sync_change_receive_partnered_reports, chat_user_id, receive_partnered_report))
 
+@_invalidates(TAG_CHAT_NETWORKS)
 async def activate_chat_user(telegram_id: str):
     return await run_blocking(partial(_sync_active_chat_user, telegram_id))
 
+@_invalidates(TAG_CHAT_NETWORKS)
 async def deactivate_chat_user(telegram_id: str):
     return await run_blocking(partial(_sync_deactivate_chat_user, telegram_id))
 
+@_invalidates(TAG_NETWORK_USERS, TAG_CHAT_NETWORKS)
 async def activate_network(network_id: int):
     return await run_blocking(partial(_sync_active_network, network_id))
 
+@_invalidates(TAG_NETWORK_USERS, TAG_CHAT_NETWORKS)
 async def deactivate_network(network_id: int):
     return await run_blocking(partial(_sync_deactivate_network, network_id))
 
+@_invalidates(TAG_NETWORK_USERS, TAG_CHAT_NETWORKS)
 async def approve_registration(
     users_ids: list,
     telegram_id: str,
@@ -1277,6 +1469,7 @@ async def approve_registration(
 async def get_network_by_network_id(network_id: int):
     return await run_blocking(partial(_sync_get_network_by_network_id, network_id))
 
+@_invalidates(TAG_CHAT_NETWORKS)
 async def change_order_by(telegram_id: str, order_by: str):
     return await run_blocking(partial(_sync_change_order_by, telegram_id, order_by))
 
@@ -1286,6 +1479,7 @@ async def get_adsls_order_indexed(network_id: int):
 async def get_adsl_order_index(id: str):
     return await run_blocking(partial(_sync_get_adsl_order_index, id))
 
+@_invalidates(TAG_NETWORK_USERS, TAG_CHAT_NETWORKS)
 async def update_adsl_order_index(id: str, order_index: int):
     return await run_blocking(partial(_sync_update_adsl_order_index, id, order_index))
 
@@ -1298,6 +1492,7 @@ def sync_get_account_available_balance(user_id: str, offset: int = 0):
     """Synchronous helper returning a DBResponse for available_balance."""
     return _sync_get_account_available_balance(user_id, offset)
 
+@_invalidates(TAG_NETWORK_USERS, TAG_CHAT_NETWORKS)
 def sync_insert_user_account(username: str, password: str, network_id: str, adsl: Optional[str] = None):
     """Synchronous helper for inserting a user account."""
     return _sync_insert_user_account(username, password, network_id, adsl)
@@ -0,0 +1,47 @@
+"""Standalone job worker: runs queued report jobs without polling Telegram.
+
+Start as many as needed next to the bot (all of them share the `bot_jobs` table):
+
+    python -m bot.worker
+
+JOB_WORKER_CONCURRENCY sets how many jobs one process runs at a time (default 4).
+"""
+import asyncio
+import logging
+import os
+
+from bot import job_queue, render_farm
+from bot.app import bot, shutdown_executor
+from bot.async_postgres import close_pool as close_async_pool
+from bot.handlers.background_tasks import JOB_HANDLERS
+from bot.local_postgres import close_pool
+from bot.utils_shared import run_blocking
+
+LOG_FORMAT = "%(asctime)s | %(levelname)-8s | %(name)s | %(message)s"
+logger = logging.getLogger("YemenNetBot.worker")
+
+
+async def main() -> None:
+    await run_blocking(job_queue.ensure_schema)
+    try:
+        await render_farm.start()
+    except Exception as e:
+        logger.warning("Render farm warm-up failed: %s", e)
+    worker = job_queue.JobWorker(JOB_HANDLERS, concurrency=int(os.getenv("JOB_WORKER_CONCURRENCY", "4") or 4))
+    try:
+        await worker.run()
+    finally:
+        worker.stop()
+        await bot.session.close()
+        shutdown_executor(wait=False)
+        render_farm.shutdown(wait=False)
+        close_pool()
+        await close_async_pool()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Stopped by user")
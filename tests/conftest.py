@@ -0,0 +1,30 @@
+import os
+
+import psycopg2
+import pytest
+
+from bot import local_postgres
+
+
+@pytest.fixture
+def pg_db(monkeypatch):
+    """Point bot.local_postgres at the throwaway database named by TEST_PG_DB.
+
+    Host, port and credentials come from the usual LOCAL_PG_* variables. The database must be UTF8
+    (psycopg 3 returns text as bytes from a SQL_ASCII one). Tests using this fixture
+    create and drop their own tables, so never point it at a real database; they are skipped
+    when TEST_PG_DB is unset or the server is unreachable.
+    """
+    dbname = os.getenv("TEST_PG_DB")
+    if not dbname:
+        pytest.skip("TEST_PG_DB is not set")
+    monkeypatch.setenv("LOCAL_PG_DB", dbname)
+    monkeypatch.setenv("LOCAL_PG_CONNECT_TIMEOUT", "3")
+    local_postgres.close_pool()
+    try:
+        local_postgres.fetch_one("SELECT 1")
+    except psycopg2.OperationalError as e:
+        local_postgres.close_pool()
+        pytest.skip(f"test database unreachable: {e}")
+    yield local_postgres
+    local_postgres.close_pool()
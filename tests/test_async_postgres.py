@@ -0,0 +1,111 @@
+import pytest
+
+from bot import async_postgres as async_pg
+from bot import utils_shared
+
+pytest.importorskip("psycopg")
+
+
+def test_is_available_can_be_switched_off(monkeypatch):
+    monkeypatch.setenv("LOCAL_PG_ASYNC", "0")
+    assert not async_pg.is_available()
+    monkeypatch.setenv("LOCAL_PG_ASYNC", "1")
+    assert async_pg.is_available()
+
+
+def test_conninfo_carries_the_statement_timeout(monkeypatch):
+    monkeypatch.setenv("LOCAL_PG_STATEMENT_TIMEOUT_MS", "1500")
+    assert "statement_timeout=1500" in async_pg._conninfo()
+    monkeypatch.setenv("LOCAL_PG_STATEMENT_TIMEOUT_MS", "0")
+    assert "statement_timeout" not in async_pg._conninfo()
+
+
+@pytest.mark.asyncio
+async def test_get_pool_refuses_when_unavailable(monkeypatch):
+    monkeypatch.setenv("LOCAL_PG_ASYNC", "0")
+    with pytest.raises(RuntimeError):
+        await async_pg.get_pool()
+
+
+# -- against a database (needs TEST_PG_DB, see conftest.pg_db) ------------------------------------
+
+@pytest.fixture
+def accounts(pg_db):
+    pg_db.execute("DROP TABLE IF EXISTS users_accounts")
+    pg_db.execute(
+        "CREATE TABLE users_accounts (id uuid PRIMARY KEY, username TEXT, adsl_number TEXT, status TEXT, "
+        "order_index INTEGER, network_id TEXT, is_active BOOLEAN, balance NUMERIC, updated_at TIMESTAMPTZ)"
+    )
+    pg_db.execute(
+        "INSERT INTO users_accounts VALUES "
+        "('00000000-0000-0000-0000-000000000001', 'a', '011', 'ok', 2, 'n1', TRUE, 12.50, now()), "
+        "('00000000-0000-0000-0000-000000000002', 'b', '012', 'ok', 1, 'n1', TRUE, NULL, now()), "
+        "('00000000-0000-0000-0000-000000000003', 'c', '013', 'ok', 3, 'n1', FALSE, 0, now())"
+    )
+    yield pg_db
+    pg_db.execute("DROP TABLE IF EXISTS users_accounts")
+
+
+@pytest.mark.asyncio
+async def test_rows_match_the_psycopg2_layer(accounts):
+    try:
+        query = "SELECT * FROM users_accounts WHERE network_id = %s ORDER BY username"
+        rows = await async_pg.fetch_all(query, ["n1"])
+        assert rows == accounts.fetch_all(query, ["n1"])
+        # uuid columns come back as str on both paths
+        assert rows[0]["id"] == "00000000-0000-0000-0000-000000000001"
+        assert type(rows[0]) is dict
+
+        assert await async_pg.fetch_one("SELECT username FROM users_accounts WHERE username = %s", ["zz"]) is None
+        assert await async_pg.fetch_value("SELECT count(*) FROM users_accounts") == 3
+        assert await async_pg.execute("UPDATE users_accounts SET status = 'x' WHERE network_id = %s", ["n1"]) == 3
+    finally:
+        await async_pg.close_pool()
+
+
+@pytest.mark.asyncio
+async def test_pool_is_shared_and_reopened_after_close(accounts):
+    try:
+        pool = await async_pg.get_pool()
+        assert await async_pg.get_pool() is pool
+        await async_pg.fetch_value("SELECT 1")
+        assert async_pg.pool_stats()
+        await async_pg.close_pool()
+        assert async_pg.pool_stats() == {}
+        assert await async_pg.fetch_value("SELECT 1") == 1
+        assert await async_pg.get_pool() is not pool
+    finally:
+        await async_pg.close_pool()
+
+
+@pytest.mark.asyncio
+async def test_async_twin_returns_what_the_sync_query_does(accounts):
+    try:
+        resp = await utils_shared.get_users_by_network_db("n1")
+        assert [row["username"] for row in resp.data] == ["b", "a"]
+        assert resp.data == utils_shared._sync_get_users_by_network("n1").data
+    finally:
+        await async_pg.close_pool()
+
+
+@pytest.mark.asyncio
+async def test_hot_reads_retry_then_fall_back_to_the_blocking_driver(monkeypatch):
+    attempts = []
+
+    async def failing_fetch_all(query, params=None):
+        attempts.append(params)
+        raise OSError("pool exhausted")
+
+    async def blocking(fn):
+        return fn()
+
+    monkeypatch.setattr(async_pg, "is_available", lambda: True)
+    monkeypatch.setattr(async_pg, "fetch_all", failing_fetch_all)
+    monkeypatch.setattr(utils_shared, "run_blocking", blocking)
+    monkeypatch.setattr(
+        utils_shared, "_sync_get_networks_for_user", lambda chat_user_id: utils_shared.DBResponse(data=[{"id": 1}])
+    )
+
+    resp = await utils_shared.get_networks_for_user(7)
+    assert resp.data == [{"id": 1}]
+    assert attempts == [[7], [7]]
@@ -0,0 +1,168 @@
+import asyncio
+import time
+
+import pytest
+
+from bot.cache import CacheManager, TTLCache, cache
+
+
+def test_lru_eviction_by_entry_count():
+    c = TTLCache(max_entries=2, jitter=0)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # "b" is now least recently used
+    c.set("c", 3)
+    assert "b" not in c and c.get("a") == 1 and c.get("c") == 3
+    assert c.stats()["evictions"] == 1
+
+
+def test_eviction_by_size():
+    c = TTLCache(max_entries=100, max_bytes=2000, jitter=0)
+    for i in range(10):
+        c.set(f"k{i}", "x" * 500)
+    assert 0 < len(c) < 10
+    assert c.stats()["bytes"] <= 2000
+    assert "k9" in c
+
+
+def test_per_key_ttl_and_sweep(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    c = TTLCache(default_ttl=60, jitter=0)
+    c.set("short", 1, ttl=5)
+    c.set("default", 2)
+    now[0] += 10
+    assert c.get("short") is None
+    assert c.get("default") == 2
+    c.set("gone", 3, ttl=1)
+    now[0] += 100
+    assert c.expire() == 2
+    assert len(c) == 0
+
+
+def test_jitter_spreads_expiry(monkeypatch):
+    monkeypatch.setattr(time, "monotonic", lambda: 0.0)
+    c = TTLCache(default_ttl=100, jitter=0.2)
+    for i in range(50):
+        c.set(str(i), i)
+    expiries = {entry.expires_at for entry in c._entries.values()}
+    assert len(expiries) > 1
+    assert all(80 <= e <= 120 for e in expiries)
+
+
+def test_tag_invalidation():
+    c = TTLCache(jitter=0)
+    c.set("users:1", [1], tags=["network:1"])
+    c.set("partners:1", [2], tags=["network:1", "partners"])
+    c.set("users:2", [3], tags=["network:2"])
+    assert c.invalidate_tag("network:1") == 2
+    assert "users:1" not in c and "partners:1" not in c and c.get("users:2") == [3]
+    assert c.invalidate_tag("partners") == 0
+
+
+def test_cache_manager_keeps_its_api():
+    CacheManager.clear()
+    CacheManager.set("user_1_a", {"balance": 1})
+    assert CacheManager.get("user_1_a") == {"balance": 1}
+    CacheManager.clear("user_1_a")
+    assert CacheManager.get("user_1_a") is None
+    CacheManager.set("x", 1)
+    CacheManager.clear()
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_shares_one_load_between_concurrent_misses():
+    c = TTLCache(jitter=0)
+    calls = []
+    release = asyncio.Event()
+
+    async def loader():
+        calls.append(1)
+        await release.wait()
+        return ["row"]
+
+    waiters = [asyncio.create_task(c.get_or_load("users:1", loader, ttl=30)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(*waiters) == [["row"]] * 5
+    assert len(calls) == 1
+    assert await c.get_or_load("users:1", loader) == ["row"] and len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_serves_stale_while_revalidating(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    c = TTLCache(jitter=0)
+    versions = iter(["v1", "v2"])
+
+    async def loader():
+        return next(versions)
+
+    assert await c.get_or_load("k", loader, ttl=10, stale_ttl=60) == "v1"
+    now[0] += 20
+    # Expired but within the stale window: old value now, reload in the background
+    assert await c.get_or_load("k", loader, ttl=10, stale_ttl=60) == "v1"
+    await asyncio.sleep(0)
+    assert c.get("k") == "v2"
+    assert c.stats()["stale_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_does_not_cache_errors():
+    c = TTLCache(jitter=0)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("db down")
+        return 42
+
+    with pytest.raises(RuntimeError):
+        await c.get_or_load("k", flaky)
+    assert await c.get_or_load("k", flaky) == 42
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_load_discards_the_loaded_value():
+    c = TTLCache(jitter=0)
+    release = asyncio.Event()
+
+    async def loader():
+        await release.wait()
+        return "old"
+
+    waiter = asyncio.create_task(c.get_or_load("users:7", loader, tags=["network:7"]))
+    await asyncio.sleep(0)
+    c.invalidate_tag("network:7")
+    release.set()
+    assert await waiter == "old"
+    assert "users:7" not in c
+
+
+@pytest.mark.asyncio
+async def test_shared_write_helpers_invalidate_user_manager_lookups(monkeypatch):
+    from bot import user_manager, utils_shared
+    from bot.utils_shared import DBResponse
+
+    loads = []
+
+    async def fetch(chat_user_id):
+        loads.append(chat_user_id)
+        return DBResponse(data=[{"network_id": len(loads)}])
+
+    async def blocking(fn):
+        return DBResponse(data=[{"id": 9}])
+
+    monkeypatch.setattr(user_manager, "get_networks_for_user", fetch)
+    monkeypatch.setattr(utils_shared, "run_blocking", blocking)
+    CacheManager.invalidate("chat_user:5")
+
+    assert await user_manager.UserManager.get_networks_for_user(5) == [{"network_id": 1}]
+    assert await user_manager.UserManager.get_networks_for_user(5) == [{"network_id": 1}]
+    # Handlers call the helper directly, not through UserManager
+    await utils_shared.create_network(5, "home")
+    assert await user_manager.UserManager.get_networks_for_user(5) == [{"network_id": 2}]
+    assert loads == [5, 5]
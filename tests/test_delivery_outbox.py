@@ -0,0 +1,65 @@
+import pytest
+
+from bot import delivery_outbox as outbox
+from bot.report_sender import page_line_hashes
+from bot.table_report import TableReportGenerator
+
+RUN = "daily:2024-05-01T06:00:00"
+
+
+@pytest.fixture
+def outbox_table(pg_db):
+    pg_db.execute("DROP TABLE IF EXISTS report_outbox")
+    outbox._schema_ready = False
+    yield pg_db
+    pg_db.execute("DROP TABLE IF EXISTS report_outbox")
+    outbox._schema_ready = False
+
+
+def _send(pages, statuses=outbox.SENT):
+    for page in pages:
+        outbox._sync_mark(RUN, "7", "100", page, statuses, None, None, None)
+
+
+def test_page_line_hashes_follow_pagination_not_values():
+    rows = TableReportGenerator.MAX_ROWS_PER_PAGE
+    reports = [(f"line{i}", {"balance": i}) for i in range(rows + 5)]
+    hashes = page_line_hashes(reports)
+    assert len(hashes) == 2
+    assert page_line_hashes([(name, {"balance": -1}) for name, _ in reports]) == hashes
+    assert page_line_hashes([("new", {})] + reports)[0] != hashes[0]
+
+
+def test_resume_skips_only_pages_whose_lines_were_delivered(outbox_table):
+    assert outbox._sync_plan(RUN, "7", "100", ["a", "b", "c"], {"token": "100"}) == set()
+    _send([1, 2])
+
+    # Re-rendered from current data: a line joined page 2, pushing page 2's lines to page 3
+    assert outbox._sync_plan(RUN, "7", "100", ["a", "x", "b", "c"], {"token": "100"}) == {1, 3}
+    rows = outbox_table.fetch_all(
+        "SELECT page, status, content_hash FROM report_outbox WHERE run_key = %s ORDER BY page", [RUN]
+    )
+    assert [(r["page"], r["status"], r["content_hash"]) for r in rows] == [
+        (1, "sent", "a"), (2, "pending", "x"), (3, "sent", "b"), (4, "pending", "c"),
+    ]
+
+
+def test_pages_recorded_without_hashes_match_by_number(outbox_table):
+    outbox._sync_plan(RUN, "7", "100", [None, None], None)
+    _send([1])
+    assert outbox._sync_plan(RUN, "7", "100", ["a", "b"], None) == {1}
+    # A shorter re-render expires the leftover pages of the earlier one
+    assert outbox._sync_plan(RUN, "7", "100", ["a"], None) == {1}
+    row = outbox_table.fetch_one("SELECT status FROM report_outbox WHERE run_key = %s AND page = 2", [RUN])
+    assert row["status"] == outbox.EXPIRED
+
+
+def test_open_deliveries_leave_out_skipped_pages(outbox_table):
+    outbox._sync_plan(RUN, "7", "100", ["a", "b"], {"token": "100"})
+    outbox._sync_plan(RUN, "8", "200", ["c"], {"token": "200"})
+    _send([1])
+    outbox._sync_mark(RUN, "7", "100", 2, outbox.FAILED, None, None, "timeout")
+    outbox._sync_mark(RUN, "8", "200", 1, outbox.SKIPPED, None, None, "chat not found")
+
+    rows = outbox._sync_open_deliveries(6, 3)
+    assert [(r["network_id"], r["open_pages"], r["context"]) for r in rows] == [("7", 1, {"token": "100"})]
@@ -0,0 +1,29 @@
+import threading
+
+from bot.font_manager import FontManager
+
+
+def test_get_font_returns_shared_instance_per_type_and_size():
+    fm = FontManager()
+    assert fm.get_font("arabic", 20) is fm.get_font("arabic", 20)
+    assert fm.get_font("arabic", 20) is not fm.get_font("arabic", 21)
+
+
+def test_get_font_is_safe_across_threads():
+    fm = FontManager()
+    seen = []
+
+    def worker():
+        seen.append(fm.get_font("digits_bold", 30))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(f) for f in seen}) == 1
+
+
+def test_preload_fills_cache():
+    fm = FontManager()
+    assert fm.preload({"arabic": (15, 18), "digits": (20,)}) == 3
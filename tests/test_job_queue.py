@@ -0,0 +1,216 @@
+import asyncio
+import time
+
+import psycopg2
+import pytest
+
+from bot import job_queue
+from bot.job_queue import JobWorker
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """In-memory stand-in for the claim/complete/fail round trips."""
+    state = {"queued": [], "done": {}, "failed": {}, "claims": []}
+
+    async def claim(worker_id, job_types, limit=1, lease_seconds=60.0):
+        job_types = list(job_types)
+        state["claims"].append((worker_id, job_types, limit))
+        taken = [j for j in state["queued"] if j["job_type"] in job_types][:limit]
+        for j in taken:
+            state["queued"].remove(j)
+            j["attempts"] = j.get("attempts", 0) + 1
+        return taken
+
+    async def complete(job_id, worker_id, result=None):
+        state["done"][job_id] = result
+        return True
+
+    async def fail(job_id, worker_id, error):
+        state["failed"][job_id] = error
+        return "queued"
+
+    async def heartbeat(job_id, worker_id, lease_seconds=60.0):
+        return True
+
+    for name, fn in (("claim", claim), ("complete", complete), ("fail", fail), ("heartbeat", heartbeat)):
+        monkeypatch.setattr(job_queue, name, fn)
+    return state
+
+
+async def _drain(worker, state, expected):
+    task = asyncio.create_task(worker.run())
+    for _ in range(200):
+        if len(state["done"]) + len(state["failed"]) >= expected:
+            break
+        await asyncio.sleep(0.01)
+    worker.stop()
+    await asyncio.wait_for(task, timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_worker_runs_handlers_and_records_outcomes(fake_db):
+    async def ok(payload):
+        return {"echo": payload["n"]}
+
+    async def boom(payload):
+        raise ValueError("portal down")
+
+    fake_db["queued"] = [
+        {"id": 1, "job_type": "ok", "payload": {"n": 1}},
+        {"id": 2, "job_type": "boom", "payload": {}},
+        {"id": 3, "job_type": "other", "payload": {}},
+    ]
+    worker = JobWorker({"ok": ok, "boom": boom}, concurrency=2, poll_interval=0.01, worker_id="w1")
+    await _drain(worker, fake_db, expected=2)
+
+    assert fake_db["done"] == {1: {"echo": 1}}
+    assert fake_db["failed"] == {2: "ValueError: portal down"}
+    # Jobs of types this worker does not serve are never claimed
+    assert [j["id"] for j in fake_db["queued"]] == [3]
+    assert all(set(types) == {"ok", "boom"} for _w, types, _l in fake_db["claims"])
+
+
+@pytest.mark.asyncio
+async def test_worker_never_claims_more_than_its_free_slots(fake_db):
+    release = asyncio.Event()
+
+    async def slow(payload):
+        await release.wait()
+
+    fake_db["queued"] = [{"id": i, "job_type": "slow", "payload": {}} for i in range(5)]
+    worker = JobWorker({"slow": slow}, concurrency=2, poll_interval=0.01, worker_id="w1")
+    task = asyncio.create_task(worker.run())
+    await asyncio.sleep(0.05)
+    assert len(fake_db["queued"]) == 3
+    assert all(limit <= 2 for _w, _t, limit in fake_db["claims"])
+    release.set()
+    for _ in range(200):
+        if len(fake_db["done"]) == 5:
+            break
+        await asyncio.sleep(0.01)
+    worker.stop()
+    await asyncio.wait_for(task, timeout=1)
+    assert sorted(fake_db["done"]) == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_job_is_cancelled_when_its_lease_is_lost(fake_db, monkeypatch):
+    cancelled = asyncio.Event()
+
+    async def lost(job_id, worker_id, lease_seconds=60.0):
+        return False
+
+    async def hangs(payload):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    monkeypatch.setattr(job_queue, "heartbeat", lost)
+    fake_db["queued"] = [{"id": 1, "job_type": "hangs", "payload": {}}]
+    worker = JobWorker({"hangs": hangs}, concurrency=1, lease_seconds=0.03, poll_interval=0.01, worker_id="w1")
+    task = worker.start()
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+    worker.stop()
+    await asyncio.wait_for(task, timeout=1)
+    # Neither completed nor failed: the row stays with whichever worker now holds the lease
+    assert fake_db["done"] == {} and fake_db["failed"] == {}
+
+
+
+@pytest.mark.asyncio
+async def test_bookkeeping_errors_are_logged_and_left_to_lease_expiry(fake_db, monkeypatch, caplog):
+    async def db_down(*args, **kwargs):
+        raise psycopg2.OperationalError("connection reset")
+
+    async def ok(payload):
+        return {}
+
+    async def boom(payload):
+        raise ValueError("portal down")
+
+    monkeypatch.setattr(job_queue, "complete", db_down)
+    monkeypatch.setattr(job_queue, "fail", db_down)
+    worker = JobWorker({"ok": ok, "boom": boom}, worker_id="w1")
+
+    await worker._run_job({"id": 1, "job_type": "ok", "payload": {}})
+    await worker._run_job({"id": 2, "job_type": "boom", "payload": {}})
+
+    errors = [r for r in caplog.records if r.levelname == "ERROR"]
+    assert len(errors) == 2 and all(r.exc_info for r in errors)
+
+# -- SQL (needs TEST_PG_DB, see conftest.pg_db) ----------------------------------------------------
+
+@pytest.fixture
+def jobs_table(pg_db):
+    pg_db.execute("DROP TABLE IF EXISTS bot_jobs")
+    job_queue.ensure_schema()
+    yield pg_db
+    pg_db.execute("DROP TABLE IF EXISTS bot_jobs")
+
+
+def test_enqueue_is_idempotent_and_claims_follow_priority(jobs_table):
+    first = job_queue._sync_enqueue("t", {"n": 1}, "key-1", None, 5, 5)
+    assert job_queue._sync_enqueue("t", {"n": 2}, "key-1", None, 0, 5) == first
+    urgent = job_queue._sync_enqueue("t", {"n": 3}, None, None, 0, 5)
+    job_queue._sync_enqueue("other", {}, None, None, 0, 5)
+
+    claimed = job_queue._sync_claim("w1", ["t"], 1, 60) + job_queue._sync_claim("w1", ["t"], 1, 60)
+    assert [j["id"] for j in claimed] == [urgent, first]
+    assert claimed[1]["payload"] == {"n": 1}
+    assert all(j["status"] == "running" and j["locked_by"] == "w1" and j["attempts"] == 1 for j in claimed)
+    assert job_queue._sync_claim("w2", ["t"], 10, 60) == []
+
+
+def test_claim_skips_rows_locked_by_another_worker(jobs_table):
+    ids = [job_queue._sync_enqueue("t", {}, None, None, 0, 5) for _ in range(3)]
+    # Another worker mid-claim holds a row lock on the first job (pooled connections autocommit)
+    conn = psycopg2.connect(**jobs_table._db_config())
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id FROM bot_jobs WHERE id = %s FOR UPDATE", [ids[0]])
+            claimed = job_queue._sync_claim("w2", ["t"], 10, 60)
+        conn.rollback()
+    finally:
+        conn.close()
+    assert sorted(j["id"] for j in claimed) == ids[1:]
+    assert [j["id"] for j in job_queue._sync_claim("w3", ["t"], 10, 60)] == ids[:1]
+
+
+def test_expired_lease_returns_job_to_queue_and_fences_old_worker(jobs_table):
+    job_id = job_queue._sync_enqueue("t", {}, None, None, 0, 5)
+    assert [j["id"] for j in job_queue._sync_claim("w1", ["t"], 1, 0.05)] == [job_id]
+    assert job_queue._sync_heartbeat(job_id, "w1", 0.05)
+    time.sleep(0.1)
+
+    # The reaper puts it back with backoff; make it due now to re-claim it
+    assert job_queue._sync_claim("w2", ["t"], 1, 60) == []
+    row = jobs_table.fetch_one("SELECT status, locked_by, last_error FROM bot_jobs WHERE id = %s", [job_id])
+    assert row["status"] == "queued" and row["locked_by"] is None and "lease expired (worker w1)" in row["last_error"]
+    jobs_table.execute("UPDATE bot_jobs SET run_at = now() WHERE id = %s", [job_id])
+    reclaimed = job_queue._sync_claim("w2", ["t"], 1, 60)
+    assert [(j["id"], j["attempts"]) for j in reclaimed] == [(job_id, 2)]
+
+    assert not job_queue._sync_heartbeat(job_id, "w1", 60)
+    assert not job_queue._sync_complete(job_id, "w1", {"late": True})
+    assert job_queue._sync_fail(job_id, "w1", "late") is None
+    assert job_queue._sync_complete(job_id, "w2", {"ok": True})
+    row = jobs_table.fetch_one("SELECT status, result, finished_at FROM bot_jobs WHERE id = %s", [job_id])
+    assert row["status"] == "done" and row["result"] == {"ok": True} and row["finished_at"] is not None
+
+
+def test_failures_back_off_then_go_dead(jobs_table):
+    job_id = job_queue._sync_enqueue("t", {}, None, None, 0, 2)
+    job_queue._sync_claim("w1", ["t"], 1, 60)
+    assert job_queue._sync_fail(job_id, "w1", "boom 1") == "queued"
+    row = jobs_table.fetch_one("SELECT run_at > now() AS later FROM bot_jobs WHERE id = %s", [job_id])
+    assert row["later"]
+    assert job_queue._sync_claim("w1", ["t"], 1, 60) == []
+
+    jobs_table.execute("UPDATE bot_jobs SET run_at = now() WHERE id = %s", [job_id])
+    job_queue._sync_claim("w1", ["t"], 1, 60)
+    assert job_queue._sync_fail(job_id, "w1", "boom 2") == "dead"
+    row = jobs_table.fetch_one("SELECT status, last_error, finished_at FROM bot_jobs WHERE id = %s", [job_id])
+    assert row["status"] == "dead" and row["last_error"] == "boom 2" and row["finished_at"] is not None
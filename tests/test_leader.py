@@ -0,0 +1,167 @@
+import asyncio
+
+import pytest
+
+from bot import leader
+from bot.leader import LeaderElector
+
+
+class FakeLocks:
+    """Advisory locks and the term table of one database, shared by all electors."""
+
+    def __init__(self):
+        self.holder = {}
+        self.terms = {}
+
+    def acquire(self, name, holder):
+        if name in self.holder:
+            return None
+        self.holder[name] = holder
+        self.terms[name] = self.terms.get(name, 0) + 1
+        return holder, self.terms[name]
+
+    def check(self, conn, name):
+        return self.holder.get(name) == conn
+
+    def release(self, conn, name):
+        if self.holder.get(name) == conn:
+            del self.holder[name]
+
+    def current_term(self, name):
+        return self.terms.get(name)
+
+
+@pytest.fixture
+def locks(monkeypatch):
+    fake = FakeLocks()
+    monkeypatch.setattr(leader, "_sync_acquire", fake.acquire)
+    monkeypatch.setattr(leader, "_sync_check", fake.check)
+    monkeypatch.setattr(leader, "_sync_release", fake.release)
+    monkeypatch.setattr(leader, "_sync_current_term", fake.current_term)
+    return fake
+
+
+async def _wait_for(predicate, steps=200):
+    for _ in range(steps):
+        if predicate():
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+
+@pytest.mark.asyncio
+async def test_only_one_replica_runs_the_loop_and_leadership_fails_over(locks):
+    running = []
+
+    def loop_for(replica):
+        async def loop():
+            running.append(replica)
+            await asyncio.Event().wait()
+        return loop
+
+    a = LeaderElector("daily-report", holder="a", retry_interval=0.01, check_interval=0.01)
+    b = LeaderElector("daily-report", holder="b", retry_interval=0.01, check_interval=0.01)
+    task_a = asyncio.create_task(a.run(loop_for("a")))
+    assert await _wait_for(lambda: running == ["a"])
+    task_b = asyncio.create_task(b.run(loop_for("b")))
+    await asyncio.sleep(0.05)
+    assert running == ["a"] and a.is_leader and not b.is_leader
+
+    # a's session dies: the lock goes away, b takes over with a new term, a stops its loop
+    del locks.holder["daily-report"]
+    assert await _wait_for(lambda: running == ["a", "b"])
+    assert b.term == 2
+    assert await _wait_for(lambda: not a.is_leader)
+
+    a.stop()
+    b.stop()
+    await asyncio.wait_for(asyncio.gather(task_a, task_b), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_still_leader_fences_a_deposed_leader(locks):
+    seen = []
+    release = asyncio.Event()
+
+    async def loop():
+        seen.append(await leader.still_leader())
+        await release.wait()
+        seen.append(await leader.still_leader())
+        await asyncio.Event().wait()
+
+    elector = LeaderElector("all-users-refresh", holder="a", retry_interval=0.01, check_interval=5)
+    task = asyncio.create_task(elector.run(loop))
+    assert await _wait_for(lambda: seen == [True])
+
+    # Another replica won a newer term before this one's periodic check noticed
+    locks.terms["all-users-refresh"] += 1
+    release.set()
+    assert await _wait_for(lambda: len(seen) == 2)
+    assert seen == [True, False]
+
+    elector.stop()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_still_leader_outside_an_elected_loop_is_true():
+    assert await leader.still_leader() is True
+
+
+@pytest.mark.asyncio
+async def test_failed_checks_do_not_depose_the_leader(locks, monkeypatch):
+    outcomes = iter([TimeoutError("pool busy"), RuntimeError("server hiccup")])
+    checks = []
+
+    def flaky_check(conn, name):
+        checks.append(name)
+        outcome = next(outcomes, None)
+        if outcome is not None:
+            raise outcome
+        return locks.check(conn, name)
+
+    monkeypatch.setattr(leader, "_sync_check", flaky_check)
+    started = []
+
+    async def loop():
+        started.append(1)
+        await asyncio.Event().wait()
+
+    elector = LeaderElector("daily-report", holder="a", retry_interval=0.01, check_interval=0.01)
+    task = asyncio.create_task(elector.run(loop))
+    assert await _wait_for(lambda: len(checks) >= 4)
+    assert elector.is_leader and started == [1]
+    assert elector.stats()["failed_checks"] == 2
+
+    # A definitive "not held" still deposes it
+    del locks.holder["daily-report"]
+    assert await _wait_for(lambda: elector.stats()["leadership_lost"] == 1)
+
+    elector.stop()
+    await asyncio.wait_for(task, timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_failed_fencing_checks_are_retried_not_taken_as_lost(locks, monkeypatch):
+    elector = LeaderElector("daily-report", holder="a")
+    elector._conn, elector.term = "a", 1
+    locks.terms["daily-report"] = 1
+    outcomes = [RuntimeError("server hiccup")]
+
+    def flaky_term(name):
+        if outcomes:
+            raise outcomes.pop()
+        return locks.current_term(name)
+
+    monkeypatch.setattr(leader, "_sync_current_term", flaky_term)
+    assert await elector.still_leader(backoff=0) is True
+    assert elector.stats()["failed_checks"] == 1
+
+    # Unreachable term table: keep going while the lock connection is open
+    outcomes.extend(RuntimeError("down") for _ in range(3))
+    assert await elector.still_leader(backoff=0) is True
+
+    # Only a newer term in the database fences us
+    locks.terms["daily-report"] = 2
+    assert await elector.still_leader(backoff=0) is False
@@ -0,0 +1,128 @@
+import threading
+import time
+
+import psycopg2
+import pytest
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+
+from bot.local_postgres import ConnectionPool, PoolTimeoutError
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+    def fetchone(self):
+        return (1,)
+
+
+class FakeConn:
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = False
+        self.broken = False
+
+    def get_transaction_status(self):
+        return TRANSACTION_STATUS_UNKNOWN if self.broken else TRANSACTION_STATUS_IDLE
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+def _pool(**kwargs):
+    created = []
+
+    def connect():
+        conn = FakeConn()
+        created.append(conn)
+        return conn
+
+    kwargs.setdefault("timeout", 0.2)
+    return ConnectionPool(kwargs.pop("minconn", 0), kwargs.pop("maxconn", 2), connect=connect, **kwargs), created
+
+
+def test_pool_reuses_connections_and_sets_autocommit():
+    pool, created = _pool()
+    with pool.connection() as c1:
+        assert c1.autocommit is True
+    with pool.connection() as c2:
+        assert c2 is c1
+    assert len(created) == 1
+    assert pool.stats()["checkouts"] == 2
+
+
+def test_pool_checkout_times_out_when_exhausted():
+    pool, _ = _pool(maxconn=1)
+    conn = pool.getconn()
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn(timeout=0.05)
+    pool.putconn(conn)
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_pool_waiter_gets_returned_connection():
+    pool, created = _pool(maxconn=1, timeout=2.0)
+    conn = pool.getconn()
+    got = []
+
+    def worker():
+        with pool.connection() as c:
+            got.append(c)
+
+    t = threading.Thread(target=worker)
+    t.start()
+    time.sleep(0.05)
+    pool.putconn(conn)
+    t.join(2)
+    assert got == [conn]
+    assert pool.stats()["waits"] == 1
+    assert len(created) == 1
+
+
+def test_pool_replaces_broken_connection_on_checkout():
+    pool, created = _pool()
+    with pool.connection() as c1:
+        pass
+    c1.broken = True
+    with pool.connection() as c2:
+        assert c2 is not c1
+    assert c1.closed
+    assert pool.stats()["reconnects"] == 1
+    assert len(created) == 2
+
+
+def test_pool_discards_connection_after_operational_error():
+    pool, created = _pool()
+    with pytest.raises(psycopg2.OperationalError):
+        with pool.connection():
+            raise psycopg2.OperationalError("boom")
+    assert pool.stats()["idle"] == 0
+    assert created[0].closed
+
+
+def test_pool_reaps_idle_connections_above_min():
+    pool, created = _pool(minconn=1, maxconn=3, max_idle=0.0)
+    a = pool.getconn()
+    b = pool.getconn()
+    pool.putconn(a)
+    time.sleep(0.01)
+    pool.putconn(b)
+    stats = pool.stats()
+    assert stats["size"] == 1
+    assert sum(1 for c in created if c.closed) == 1
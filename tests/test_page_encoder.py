@@ -0,0 +1,50 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image, ImageDraw
+
+from bot.page_encoder import PageEncoder, image_extension
+
+
+def _page():
+    image = Image.new("RGB", (600, 400), (248, 249, 250))
+    draw = ImageDraw.Draw(image)
+    for i in range(0, 400, 20):
+        draw.rectangle([0, i, 600, i + 10], fill=(52, 73, 94) if i % 40 else (41, 128, 185))
+        draw.text((10, i), f"row {i} 1234.56", fill=(255, 255, 255))
+    return image
+
+
+@pytest.mark.parametrize("fmt,ext", [("jpeg", "jpg"), ("png", "png"), ("webp", "webp")])
+def test_encode_formats_match_extension(fmt, ext):
+    data, got_ext = PageEncoder(fmt).encode(_page())
+    assert got_ext == ext
+    assert image_extension(data) == ext
+
+
+def test_jpeg_steps_quality_down_to_meet_target():
+    page = _page()
+    unbounded, _ = PageEncoder("jpeg", quality=95).encode(page)
+    target_kb = len(unbounded) / 1024 * 0.6
+    bounded, _ = PageEncoder("jpeg", quality=95, target_kb=target_kb, min_quality=30).encode(page)
+    assert len(bounded) <= target_kb * 1024
+
+
+def test_auto_falls_back_to_jpeg_when_png_misses_target():
+    data, ext = PageEncoder("auto", target_kb=0.5, min_quality=90).encode(_page())
+    assert ext == "jpg"
+    data, ext = PageEncoder("auto").encode(_page())
+    assert ext == "png"
+
+
+def test_scale_downsizes_page():
+    data, _ = PageEncoder("jpeg", scale=0.5).encode(_page())
+    assert Image.open(BytesIO(data)).size == (300, 200)
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("REPORT_IMAGE_FORMAT", "bogus")
+    monkeypatch.setenv("REPORT_JPEG_QUALITY", "80")
+    monkeypatch.setenv("REPORT_JPEG_SUBSAMPLING", "420")
+    encoder = PageEncoder.from_env()
+    assert (encoder.format, encoder.quality, encoder.subsampling) == ("jpeg", 80, 2)
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from bot import refresh_coordinator as rc
+from bot.refresh_coordinator import RefreshCoordinator
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_scrape_and_fresh_lines_are_skipped(monkeypatch):
+    calls = []
+
+    async def fake_save(username, network_id):
+        calls.append((username, network_id))
+        await asyncio.sleep(0.01)
+        return True
+
+    monkeypatch.setattr(rc, "save_scraped_account", fake_save)
+    coordinator = RefreshCoordinator(concurrency=4)
+
+    results = await asyncio.gather(*(coordinator.ensure_fresh(7, "line1", max_age=60) for _ in range(3)))
+    assert results == [True, True, True]
+    assert calls == [("line1", 7)]
+
+    assert await coordinator.ensure_fresh(7, "line1", max_age=60) is True
+    assert calls == [("line1", 7)]
+    assert coordinator.last_refreshed(7, "line1") is not None
+
+    assert await coordinator.ensure_fresh(7, "line1", max_age=0) is True
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_deadline_returns_early_and_scrape_completes_in_background(monkeypatch):
+    release = asyncio.Event()
+
+    async def slow_save(username, network_id):
+        await release.wait()
+        return True
+
+    monkeypatch.setattr(rc, "save_scraped_account", slow_save)
+    coordinator = RefreshCoordinator()
+
+    fresh, total = await coordinator.ensure_fresh_many(1, ["a", "b", "a"], timeout=0.01)
+    assert (fresh, total) == (0, 2)
+    assert coordinator.stats()["inflight"] == 2
+
+    release.set()
+    await asyncio.sleep(0.01)
+    assert coordinator.is_fresh(1, "a", max_age=60)
+    assert coordinator.stats()["inflight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_false_result_is_final_and_exceptions_are_retried(monkeypatch):
+    attempts = []
+
+    async def save(username, network_id):
+        attempts.append(username)
+        if username == "flaky":
+            raise ConnectionError("portal reset")
+        return False
+
+    async def no_sleep(_delay):
+        return None
+
+    monkeypatch.setattr(rc, "save_scraped_account", save)
+    monkeypatch.setattr(rc.asyncio, "sleep", no_sleep)
+    coordinator = RefreshCoordinator(attempts=3)
+
+    assert await coordinator.ensure_fresh(1, "x") is False
+    assert attempts == ["x"]
+    assert coordinator.age(1, "x") is None
+
+    assert await coordinator.ensure_fresh(1, "flaky") is False
+    assert attempts == ["x", "flaky", "flaky", "flaky"]
+    assert coordinator.stats()["failures"] == 2
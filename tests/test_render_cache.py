@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+from bot.render_cache import RenderCache, render_key
+
+
+def _network(**overrides):
+    fields = dict(network_id=1, network_name="net", user_name="owner", expiration_date="2026-12-31",
+                  warning_count_remaining_days=7, danger_count_remaining_days=3,
+                  warning_percentage_remaining_balance=30, danger_percentage_remaining_balance=10)
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+def test_render_key_tracks_rows_settings_and_date():
+    rows = [("u1", {"balance": 10, "usage": 2}), ("u2", {"balance": 5})]
+    chat_user = SimpleNamespace(order_by="usage")
+    key = render_key(rows, _network(), chat_user)
+
+    assert key == render_key([("u1", {"usage": 2, "balance": 10}), ("u2", {"balance": 5})], _network(), chat_user)
+    assert key != render_key(list(reversed(rows)), _network(), chat_user)
+    assert key != render_key(rows, _network(danger_count_remaining_days=1), chat_user)
+    assert key != render_key(rows, _network(), SimpleNamespace(order_by="balance"))
+    assert key != render_key(rows, _network(), chat_user, report_date="2026-01-01")
+
+
+def test_pages_expire_and_are_evicted_by_size(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("bot.render_cache.time.monotonic", lambda: clock[0])
+    cache = RenderCache(ttl=60, max_bytes=10)
+
+    cache.put("a", [b"12345"])
+    cache.put("b", [b"1234"])
+    assert cache.get("a") == [b"12345"]
+    cache.put("c", [b"123"])  # over budget: evicts "b", the least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") == [b"12345"]
+    assert cache.stats()["bytes"] == 8
+
+    clock[0] += 61
+    assert cache.get("a") is None
+    assert cache.get("c") is None
+
+
+def test_file_ids_are_keyed_by_page_bytes():
+    cache = RenderCache()
+    cache.remember_file_id(b"page-1", "FILE1")
+    assert cache.file_id_for(b"page-1") == "FILE1"
+    assert cache.file_id_for(b"page-2") is None
+    cache.forget_file_id(b"page-1")
+    assert cache.file_id_for(b"page-1") is None
@@ -0,0 +1,31 @@
+import pickle
+
+import pytest
+
+from bot import render_farm
+from bot.chat_user_manager import ChatUser
+from bot.selected_network_manager import SelectedNetwork
+
+
+def _network():
+    return SelectedNetwork(1, 1, "net", "user", 15, 5, 2, 30, 10, True, "2026-12-01")
+
+
+def _rows(n):
+    return [(f"0{1000000 + i}", {"order_index": i, "today_balance": "20", "plan_limit": "100"}) for i in range(n)]
+
+
+def test_build_page_jobs_splits_pages_and_is_picklable():
+    jobs = render_farm.build_page_jobs(_rows(45), _network(), ChatUser(1, "1", "u", True, True, "usage"))
+    assert [j["page"] for j in jobs] == [1, 2]
+    assert all(j["total_pages"] == 2 and j["lines_count"] == 45 for j in jobs)
+    assert len(jobs[1]["rows"]) == 15
+    assert pickle.loads(pickle.dumps(jobs))[0]["network"]["network_name"] == "net"
+
+
+@pytest.mark.asyncio
+async def test_render_report_pages_inline_returns_jpeg_bytes(monkeypatch):
+    monkeypatch.setenv("RENDER_PROCESSES", "0")
+    pages = await render_farm.render_report_pages(_rows(3), _network(), ChatUser(1, "1", "u", True, True, "usage"))
+    assert len(pages) == 1
+    assert pages[0][:2] == b"\xff\xd8"
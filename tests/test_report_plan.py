@@ -0,0 +1,105 @@
+"""The daily report planning query (utils_shared._DUE_REPORT_DELIVERIES_SQL) against a database.
+
+It replaced per-network Python checks in periodic_daily_report; these tests pin the same rules:
+a recipient needs a selected network, a network must be active and not expired (expiring today
+still counts), times_to_send_reports 0 means every slot, and networks without active lines are left out.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from bot import utils_shared
+from bot.handlers.background_tasks import _chat_user_from_row, _network_from_row
+from bot.selected_network_manager import SelectedNetwork
+
+TODAY = date(2024, 5, 1)
+SLOT_18 = SelectedNetwork.from_times_list_to_bitmask(["18:00:00"])
+SLOT_12 = SelectedNetwork.from_times_list_to_bitmask(["12:00:00"])
+
+_TABLES = ("users_accounts", "chats_networks", "networks", "chats_users")
+
+
+@pytest.fixture
+def plan_db(pg_db):
+    for table in _TABLES:
+        pg_db.execute(f"DROP TABLE IF EXISTS {table}")
+    pg_db.execute(
+        "CREATE TABLE chats_users (id SERIAL PRIMARY KEY, telegram_id TEXT, user_name TEXT, "
+        "receive_partnered_report BOOLEAN, is_active BOOLEAN, order_by TEXT)"
+    )
+    pg_db.execute("CREATE TABLE networks (id TEXT PRIMARY KEY, network_name TEXT, is_active BOOLEAN, expiration_date DATE)")
+    pg_db.execute(
+        "CREATE TABLE chats_networks (id SERIAL PRIMARY KEY, chat_user_id INTEGER, network_id TEXT, "
+        "network_type TEXT DEFAULT 'owner', permissions TEXT DEFAULT 'owner', times_to_send_reports INTEGER, "
+        "warning_count_remaining_days INTEGER DEFAULT 7, danger_count_remaining_days INTEGER DEFAULT 3, "
+        "warning_percentage_remaining_balance INTEGER DEFAULT 30, danger_percentage_remaining_balance INTEGER DEFAULT 10, "
+        "is_active BOOLEAN DEFAULT TRUE, is_selected_network BOOLEAN DEFAULT FALSE)"
+    )
+    pg_db.execute(
+        "CREATE TABLE users_accounts (id SERIAL PRIMARY KEY, username TEXT, adsl_number TEXT, status TEXT, "
+        "order_index INTEGER, network_id TEXT, is_active BOOLEAN)"
+    )
+
+    pg_db.execute(
+        "INSERT INTO chats_users (telegram_id, user_name, receive_partnered_report, is_active, order_by) VALUES "
+        "('100', 'owner', TRUE, TRUE, 'balance'), ('200', 'unselected', FALSE, TRUE, NULL)"
+    )
+    networks = [
+        # id, active, expiration, bitmask, has lines
+        ("all-slots", True, None, 0, True),
+        ("noon-only", True, None, SLOT_12, True),
+        ("evening", True, TODAY, SLOT_18 | SLOT_12, True),
+        ("expired", True, TODAY - timedelta(days=1), 0, True),
+        ("inactive", False, None, 0, True),
+        ("no-lines", True, None, 0, False),
+    ]
+    for network_id, active, expiration, bitmask, has_lines in networks:
+        pg_db.execute("INSERT INTO networks VALUES (%s, %s, %s, %s)", [network_id, f"net {network_id}", active, expiration])
+        pg_db.execute(
+            "INSERT INTO chats_networks (chat_user_id, network_id, times_to_send_reports, is_selected_network) "
+            "VALUES (1, %s, %s, %s)",
+            [network_id, bitmask, network_id == "all-slots"],
+        )
+        # The unselected recipient has the same networks but no selected one
+        pg_db.execute(
+            "INSERT INTO chats_networks (chat_user_id, network_id, times_to_send_reports) VALUES (2, %s, %s)",
+            [network_id, bitmask],
+        )
+        if has_lines:
+            pg_db.execute(
+                "INSERT INTO users_accounts (username, adsl_number, status, order_index, network_id, is_active) VALUES "
+                "(%s, '01', 'ok', 1, %s, TRUE), (%s, '02', 'ok', 2, %s, TRUE), ('gone', '03', 'ok', 3, %s, FALSE)",
+                [f"{network_id}-a", network_id, f"{network_id}-b", network_id, network_id],
+            )
+    yield pg_db
+    for table in _TABLES:
+        pg_db.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def _due(slot_bit):
+    return utils_shared._sync_get_due_report_deliveries(slot_bit, TODAY).data
+
+
+def test_plan_applies_schedule_expiry_selection_and_lines_filters(plan_db):
+    assert [(r["telegram_id"], r["network_id"]) for r in _due(SLOT_18)] == [("100", "evening"), ("100", "all-slots")]
+    assert [r["network_id"] for r in _due(SLOT_12)] == ["evening", "noon-only", "all-slots"]
+
+
+def test_plan_row_maps_to_report_inputs(plan_db):
+    row = next(r for r in _due(SLOT_18) if r["network_id"] == "evening")
+
+    # Active lines only, newest first, as get_users_by_network returns them
+    assert [line["username"] for line in row["lines"]] == ["evening-b", "evening-a"]
+    assert set(row["lines"][0]) == {"id", "username", "adsl_number", "status", "order_index"}
+
+    network = _network_from_row({k: v for k, v in row.items() if k != "lines"})
+    assert (network.network_id, network.network_name, network.user_name) == ("evening", "net evening", "owner")
+    assert network.times_to_send_reports == SLOT_18 | SLOT_12
+    assert network.is_active is True and network.expiration_date == TODAY
+    assert (network.telegram_id, network.chat_user_id, network.network_type) == ("100", 1, "owner")
+    assert network.warning_count_remaining_days == 7 and network.danger_percentage_remaining_balance == 10
+
+    chat_user = _chat_user_from_row(row)
+    assert (chat_user.chat_user_id, chat_user.telegram_id, chat_user.user_name) == (1, "100", "owner")
+    assert chat_user.receive_partnered_reports is True and chat_user.is_active is True
+    assert chat_user.order_by == "balance"
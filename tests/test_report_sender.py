@@ -70,3 +70,147 @@ async def test_collect_saved_user_reports_filters_none():
     assert isinstance(reports, list)
     assert len(reports) == 1
     assert reports[0][0] == "a"
+
+
+class BatchUserManager(DummyUserManager):
+    def __init__(self, data_map):
+        super().__init__(data_map)
+        self.batch_calls = []
+
+    async def get_latest_account_data_for_users(self, user_ids):
+        self.batch_calls.append(list(user_ids))
+        return {str(k): v for k, v in self.data_map.items() if v is not None}
+
+    async def get_latest_account_data(self, user_id):
+        raise AssertionError("per-user read should not be used when the batch API exists")
+
+
+@pytest.mark.asyncio
+async def test_collect_saved_user_reports_uses_single_batch_read():
+    users = [
+        {"id": "u1", "username": "a"},
+        {"id": "u2", "username": "b"},
+    ]
+    manager = BatchUserManager({"u1": {"balance": 10, "usage": 5}, "u2": None})
+
+    reports = await collect_saved_user_reports(users, asyncio.Semaphore(2), manager)
+
+    assert manager.batch_calls == [["u1", "u2"]]
+    by_name = dict(reports)
+    assert by_name["a"]["balance"] == 10
+    assert by_name["b"]["notes"] == "لا توجد بيانات"
+
+
+class RecordingBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_photo(self, chat_id, photo, caption=None, **kwargs):
+        self.sent.append((chat_id, photo.filename, photo.data))
+
+
+@pytest.mark.asyncio
+async def test_send_images_sends_in_memory_pages(monkeypatch):
+    from bot.selected_network_manager import SelectedNetwork
+
+    monkeypatch.setattr(asyncio, "sleep", _no_sleep)
+    bot = RecordingBot()
+    network = SelectedNetwork(1, 1, "net", "user", 15, 5, 2, 30, 10, True, "")
+
+    result = await send_images(bot, network, "12345", [b"\xff\xd8page1", b""], [("u1", {})], timezone.utc)
+
+    assert result == {"sent": 1, "skipped": 1, "chat_not_found": False}
+    assert bot.sent == [(12345, "financial_report_page1.jpg", b"\xff\xd8page1")]
+
+
+async def _no_sleep(*_args, **_kwargs):
+    return None
+
+
+@pytest.mark.asyncio
+async def test_send_photo_reusing_file_id_falls_back_to_upload():
+    from aiogram.exceptions import TelegramBadRequest
+    from bot.report_sender import _send_photo_reusing_file_id
+
+    calls = []
+
+    class FlakyBot:
+        async def send_photo(self, chat_id, photo, caption=None, **kwargs):
+            calls.append(photo)
+            if isinstance(photo, str):
+                raise TelegramBadRequest(method=None, message="Bad Request: wrong file identifier")
+            return "ok"
+
+    result = await _send_photo_reusing_file_id(FlakyBot(), 1, "FILEID", lambda: b"upload", "cap")
+
+    assert result == "ok"
+    assert calls == ["FILEID", b"upload"]
+
+
+class AlbumBot(RecordingBot):
+    def __init__(self, fail_albums=False):
+        super().__init__()
+        self.albums = []
+        self.fail_albums = fail_albums
+
+    async def send_media_group(self, chat_id, media, **kwargs):
+        if self.fail_albums:
+            raise RuntimeError("album rejected")
+        self.albums.append((chat_id, [m.caption for m in media]))
+        return []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fail_albums", [False, True])
+async def test_send_images_album_mode_keeps_summary(monkeypatch, fail_albums):
+    import bot.report_sender as report_sender
+    from bot.selected_network_manager import SelectedNetwork
+
+    monkeypatch.setattr(asyncio, "sleep", _no_sleep)
+    monkeypatch.setattr(report_sender._send_album_with_retry.retry, "stop", lambda *_: True)
+    bot = AlbumBot(fail_albums=fail_albums)
+    network = SelectedNetwork(1, 1, "net", "user", 15, 5, 2, 30, 10, True, "")
+    pages = [b"\xff\xd8p%d" % i for i in range(12)] + [b""]
+
+    result = await send_images(bot, network, "12345", pages, [("u1", {})], timezone.utc, album=True)
+
+    assert result == {"sent": 12, "skipped": 1, "chat_not_found": False}
+    if fail_albums:
+        assert len(bot.sent) == 12
+    else:
+        assert [len(captions) for _, captions in bot.albums] == [10, 2]
+        assert bot.albums[0][1][0] and bot.albums[0][1][1] is None
+        assert bot.sent == []
+
+
+@pytest.mark.asyncio
+async def test_send_images_with_outbox_skips_delivered_pages_and_records_the_rest(monkeypatch):
+    import bot.report_sender as report_sender
+    from bot.selected_network_manager import SelectedNetwork
+
+    marks = []
+    plans = []
+
+    async def plan(run_key, network_id, recipient, page_count, context=None, page_hashes=None):
+        plans.append((run_key, network_id, recipient, page_count, context))
+        return {1}
+
+    async def mark(run_key, network_id, recipient, page, status, **kwargs):
+        marks.append((page, status))
+
+    monkeypatch.setattr(asyncio, "sleep", _no_sleep)
+    monkeypatch.setattr(report_sender.delivery_outbox, "plan", plan)
+    monkeypatch.setattr(report_sender.delivery_outbox, "mark", mark)
+    bot = RecordingBot()
+    network = SelectedNetwork(1, 1, "net", "user", 15, 5, 2, 30, 10, True, "")
+    pages = [b"\xff\xd8p1", b"\xff\xd8p2", b""]
+
+    result = await send_images(
+        bot, network, "12345", pages, [("u1", {})], timezone.utc, album=False,
+        outbox_run="daily:2024-05-01T06:00:00", outbox_context={"token": "12345"},
+    )
+
+    assert plans == [("daily:2024-05-01T06:00:00", 1, "12345", 3, {"token": "12345"})]
+    assert result == {"sent": 1, "skipped": 1, "chat_not_found": False}
+    assert [data for _chat, _name, data in bot.sent] == [b"\xff\xd8p2"]
+    assert marks == [(2, "sent"), (3, "skipped")]
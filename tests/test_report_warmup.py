@@ -0,0 +1,42 @@
+from datetime import datetime
+
+import pytest
+
+from bot.handlers import background_tasks
+
+
+@pytest.mark.asyncio
+async def test_warm_up_report_slot_refreshes_due_lines_once_per_network(monkeypatch):
+    planned = []
+    refreshed = []
+    due = [
+        {"telegram_id": "100", "chat_user_id": 1, "chat_user_name": "a", "receive_partnered_report": True,
+         "chat_user_is_active": True, "order_by": "usage", "network_id": 7,
+         "lines": [{"username": "u1"}, {"username": "u2"}]},
+        {"telegram_id": "200", "chat_user_id": 2, "chat_user_name": "b", "receive_partnered_report": False,
+         "chat_user_is_active": True, "order_by": "balance", "network_id": 7,
+         "lines": [{"username": "u2"}]},
+    ]
+
+    async def get_due(slot_bit, today):
+        planned.append((slot_bit, today))
+        return due
+
+    async def ensure_fresh_many(network_id, usernames, max_age, timeout):
+        refreshed.append((network_id, sorted(usernames), max_age))
+        return len(usernames) - 1, len(usernames)
+
+    async def start():
+        return 0
+
+    monkeypatch.setattr(background_tasks.UserManager, "get_due_report_deliveries", get_due)
+    monkeypatch.setattr(background_tasks.refresh_coordinator, "ensure_fresh_many", ensure_fresh_many)
+    monkeypatch.setattr(background_tasks.render_farm, "start", start)
+
+    slot = datetime(2024, 5, 1, 18, 0, 0)
+    result = await background_tasks.warm_up_report_slot(slot, max_age=30, timeout=50)
+
+    assert planned == [(4, slot.date())]
+    # One refresh per network, over the union of its lines
+    assert refreshed == [(7, ["u1", "u2"], 30)]
+    assert result == {"networks": 2, "lines": 2, "fresh": 1}
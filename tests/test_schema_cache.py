@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from bot import schema_cache as schema_cache_module
+from bot.schema_cache import SchemaCache
+
+
+def test_schema_cache_loads_catalog_once(monkeypatch):
+    calls = []
+
+    def fake_fetch_all(query, params=None):
+        calls.append(params)
+        return [
+            {"table_name": "adsl_daily_report", "column_name": "user_id"},
+            {"table_name": "adsl_daily_report", "column_name": "report_date"},
+            {"table_name": "users_accounts", "column_name": "id"},
+        ]
+
+    monkeypatch.setattr(schema_cache_module, "fetch_all", fake_fetch_all)
+    cache = SchemaCache()
+
+    assert cache.has_column("adsl_daily_report", "report_date")
+    assert not cache.has_column("adsl_daily_report", "order_index")
+    assert cache.has_table("users_accounts")
+    assert not cache.has_table("adsl_daily_reports")
+    assert calls == [["public"]]
+
+    cache.refresh()
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_async_latest_account_data_refreshes_schema_on_psycopg_error(monkeypatch):
+    psycopg = pytest.importorskip("psycopg")
+    from bot import utils_shared
+
+    cache = SchemaCache()
+    catalogs = [
+        [{"table_name": "adsl_daily_report", "column_name": "report_date"}],
+        [{"table_name": "adsl_daily_report", "column_name": "user_id"}],
+    ]
+    monkeypatch.setattr(schema_cache_module, "fetch_all", lambda query, params=None: catalogs.pop(0))
+    monkeypatch.setattr(utils_shared, "schema_cache", cache)
+    queries = []
+
+    async def fetch_one(query, params=None):
+        queries.append(query)
+        if "report_date" in query:
+            raise psycopg.errors.UndefinedColumn('column "report_date" does not exist')
+        return {"user_id": params[0]}
+
+    monkeypatch.setattr(utils_shared.async_pg, "fetch_one", fetch_one)
+
+    resp = await utils_shared._async_get_latest_account_data("u1")
+
+    assert resp.data == [{"user_id": "u1"}]
+    assert len(queries) == 2 and "report_date" not in queries[1]
+    assert catalogs == []
+
+
+def test_concurrent_first_loads_share_one_query(monkeypatch):
+    calls = []
+
+    def slow_fetch_all(query, params=None):
+        calls.append(params)
+        time.sleep(0.05)
+        return [{"table_name": "users_accounts", "column_name": "id"}]
+
+    monkeypatch.setattr(schema_cache_module, "fetch_all", slow_fetch_all)
+    cache = SchemaCache()
+    threads = [threading.Thread(target=cache.has_table, args=("users_accounts",)) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == [["public"]]
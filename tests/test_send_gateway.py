@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+
+from bot.send_gateway import Priority, SendGateway, SendGatewayMiddleware, TokenBucket, send_priority
+
+
+def test_token_bucket_wait_time_and_block():
+    bucket = TokenBucket(rate=2.0, capacity=2.0)
+    now = bucket.updated
+    assert bucket.wait_time(now) == 0
+    bucket.consume(now)
+    bucket.consume(now)
+    assert bucket.wait_time(now) == pytest.approx(0.5)
+    bucket.block(now, 3.0)
+    assert bucket.wait_time(now) == pytest.approx(3.0)
+
+
+@pytest.mark.asyncio
+async def test_interactive_sends_are_granted_before_bulk():
+    gateway = SendGateway(global_rate=20.0, global_burst=1.0, chat_rate=100.0, chat_burst=100.0)
+    await gateway.acquire(0)  # drain the single global token
+    order = []
+
+    async def send(name, chat_id, prio):
+        await gateway.acquire(chat_id, priority=prio)
+        order.append(name)
+
+    bulk = [asyncio.create_task(send(f"bulk{i}", 100 + i, Priority.BULK)) for i in range(3)]
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(send("reply", 1, Priority.INTERACTIVE))
+    await asyncio.gather(*bulk, interactive)
+    assert order[0] == "reply"
+
+
+@pytest.mark.asyncio
+async def test_send_priority_context_applies_to_acquire():
+    gateway = SendGateway()
+    with send_priority(Priority.BULK):
+        await gateway.acquire(1)
+    assert gateway.stats()["granted"] == 1
+
+
+class SendMessage:
+    def __init__(self, chat_id):
+        self.chat_id = chat_id
+
+
+@pytest.mark.asyncio
+async def test_middleware_honours_retry_after_and_retries():
+    gateway = SendGateway(chat_rate=100.0, chat_burst=100.0)
+    middleware = SendGatewayMiddleware(gateway)
+    calls = []
+
+    async def make_request(bot, method):
+        calls.append(method.chat_id)
+        if len(calls) == 1:
+            raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=0)
+        return "ok"
+
+    assert await middleware(make_request, None, SendMessage(42)) == "ok"
+    assert calls == [42, 42]
+    assert gateway.stats()["retry_after"] == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_after_for_one_chat_does_not_delay_other_chats():
+    gateway = SendGateway(chat_rate=100.0, chat_burst=100.0)
+    gateway.penalize(1, 30.0)
+    await asyncio.wait_for(gateway.acquire(2), timeout=0.5)
+    assert gateway._chat_bucket(1).wait_time(time.monotonic()) > 25
+
+    # Several chats throttled at once looks like a bot-wide flood
+    gateway.penalize(3, 30.0)
+    gateway.penalize(4, 30.0)
+    assert gateway.global_bucket.wait_time(time.monotonic()) > 25
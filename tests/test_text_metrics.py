@@ -0,0 +1,31 @@
+from PIL import ImageFont
+
+from bot import text_metrics
+from bot.text_metrics import shape_arabic, text_width, truncate_to_width
+
+
+def test_truncate_to_width_fits_and_is_memoized():
+    font = ImageFont.load_default()
+    text = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+    max_width = text_width(text, font) // 2
+
+    out = truncate_to_width(text, font, max_width)
+    assert out.endswith("...")
+    assert text_width(out, font) <= max_width
+    assert text.startswith(out[:-3])
+
+    misses = text_metrics._truncated.misses
+    assert truncate_to_width(text, font, max_width) == out
+    assert text_metrics._truncated.misses == misses
+
+
+def test_truncate_to_width_keeps_short_text():
+    font = ImageFont.load_default()
+    assert truncate_to_width("12", font, 500) == "12"
+
+
+def test_shape_arabic_passes_latin_through_and_caches_arabic():
+    assert shape_arabic("123 abc") == "123 abc"
+    first = shape_arabic("حساب نشط")
+    assert first != "حساب نشط"
+    assert shape_arabic("حساب نشط") is first
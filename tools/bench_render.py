@@ -0,0 +1,334 @@
+"""Rendering benchmark for TableReportGenerator and ReportImageGenerator.
+
+Builds synthetic networks (mixed Arabic/numeric rows covering every status
+colour and threshold band) and reports, per size and mode:
+per-page render time, JPEG encode time, output bytes and peak memory. A
+second table encodes one page with every PageEncoder choice and reports encode
+time and bytes saved against the legacy JPEG quality-100 encoding.
+
+Examples:
+    python tools/bench_render.py
+    python tools/bench_render.py --sizes 30,300 --modes memory,disk,thread,process --quality 100,85
+    python tools/bench_render.py --sizes 3000 --modes process --workers 4 --repeat 1
+    python tools/bench_render.py --sizes 30 --encoders legacy-jpeg-q100,png-palette-128,auto-300kb
+
+Modes:
+    memory   generate pages in-process, encoded to bytes (also reports the JPEG encode share)
+    disk     generate_financial_table_report writing JPEG files to a temp dir
+    thread   pages rendered concurrently on a thread pool
+    process  pages rendered on a spawn process pool (same path as bot.render_farm)
+"""
+import argparse
+import io
+import logging
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Ensure project root is on sys.path so 'bot' package can be imported when run as a script
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+# bot.app (pulled in by render_farm) builds the Bot at import time
+os.environ.setdefault("BOT_TOKEN", "123456:BENCHMARKBENCHMARKBENCHMARKBENCHMARK")
+
+from bot import render_farm, text_metrics
+from bot.chat_user_manager import ChatUser
+from bot.page_encoder import PageEncoder
+from bot.report_image import ReportImageGenerator
+from bot.selected_network_manager import SelectedNetwork
+from bot.table_report import _PAGE_TEMPLATES, TableReportGenerator
+from bot.user_report import AccountData, UserReport
+
+STATUSES = ["حساب نشط", "بلا رصيد", "معلق", "فصلت الخدمة", "غير نشط", "active", "suspended", "-"]
+PLANS = [("100 جيجابايت", "5000"), ("250 جيجابايت", "10000"), ("50 جيجابايت", "2800"), ("-", "-")]
+NOTES = ["تم تسديد", "", "يحتاج متابعة", "رصيد منخفض", "-"]
+
+
+def synthetic_network() -> SelectedNetwork:
+    return SelectedNetwork(1, 1, "شبكة الاختبار", "benchmark", 15, 5, 2, 30, 10, True, "2030-12-31")
+
+
+def synthetic_chat_user() -> ChatUser:
+    return ChatUser(1, "1", "benchmark", True, True, "usage")
+
+
+def synthetic_rows(n: int):
+    rows = []
+    for i in range(n):
+        plan_limit, plan_price = PLANS[i % len(PLANS)]
+        today = (i * 7) % 120
+        rows.append((f"0{1000000 + i}", {
+            "order_index": i + 1,
+            "plan_limit": plan_limit,
+            "plan_price": plan_price,
+            "account_status": STATUSES[i % len(STATUSES)],
+            "yesterday_balance": f"{today + (i % 9)} جيجابايت",
+            "today_balance": f"{today} جيجابايت" if i % 11 else "-",
+            "usage": f"{(i % 9) * 1.25:.2f}",
+            "remaining_days": str(i % 40) if i % 13 else "-",
+            "finishing_balance_estimate": str((i * 3) % 45) if i % 5 else "-",
+            "balance_value": f"{(i * 137) % 20000:,}.00",
+            "usage_value": f"{(i % 9) * 62.5:.2f}",
+            "notes": NOTES[i % len(NOTES)],
+        }))
+    return rows
+
+
+def synthetic_user_report(i: int) -> UserReport:
+    return UserReport(
+        account=AccountData(
+            username=f"0{1000000 + i}",
+            account_type="ADSL",
+            status=STATUSES[i % len(STATUSES)],
+            expiry_date="31/12/2030",
+            remaining_days=str(i % 40),
+            package=PLANS[i % len(PLANS)][0],
+            balance=f"{(i * 7) % 120} جيجابايت",
+            available_balance=f"{(i * 137) % 20000} ريال",
+            subscription_date="01/01/2024",
+            plan=PLANS[i % len(PLANS)][0],
+        ),
+        requested_by="benchmark",
+    )
+
+
+def reset_caches() -> None:
+    text_metrics.clear_caches()
+    _PAGE_TEMPLATES.clear()
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(who).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _page_jobs(rows, quality: int):
+    jobs = render_farm.build_page_jobs(rows, synthetic_network(), synthetic_chat_user())
+    for job in jobs:
+        job["quality"] = quality
+    return jobs
+
+
+def _render_job(job) -> bytes:
+    # Mirrors render_farm._render_page, with the quality setting applied
+    gen = render_farm._worker_generator or TableReportGenerator()
+    gen.image_quality = job["quality"]
+    gen.apply_report_extras(job["extras"])
+    gen.totals = job["totals"]
+    return gen.render_page_bytes(
+        job["rows"], job["page"], job["total_pages"], job["lines_count"],
+        SelectedNetwork(**job["network"]), ChatUser(**job["chat_user"]), job["report_date"],
+    )
+
+
+def bench_memory(rows, quality: int, workers: int):
+    gen = TableReportGenerator()
+    gen.image_quality = quality
+    network, chat_user = synthetic_network(), synthetic_chat_user()
+    lines, chunks = gen.paginate(rows)
+    render_s, encode_s, sizes = [], [], []
+    for page, chunk in enumerate(chunks, 1):
+        t0 = time.perf_counter()
+        image = gen._render_single_page(chunk, page, len(chunks), len(lines), network, chat_user)
+        t1 = time.perf_counter()
+        data = gen._encode_page(image)
+        t2 = time.perf_counter()
+        render_s.append(t2 - t0)
+        encode_s.append(t2 - t1)
+        sizes.append(len(data))
+    return render_s, encode_s, sizes
+
+
+def bench_disk(rows, quality: int, workers: int):
+    gen = TableReportGenerator()
+    gen.image_quality = quality
+    with tempfile.TemporaryDirectory() as out_dir:
+        t0 = time.perf_counter()
+        paths = gen.generate_financial_table_report(rows, synthetic_network(), synthetic_chat_user(),
+                                                    save_path=os.path.join(out_dir, "bench.jpg"))
+        elapsed = time.perf_counter() - t0
+        sizes = [os.path.getsize(p) for p in paths]
+    per_page = elapsed / max(1, len(paths))
+    return [per_page] * len(paths), [], sizes
+
+
+def bench_thread(rows, quality: int, workers: int):
+    jobs = _page_jobs(rows, quality)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        t0 = time.perf_counter()
+        pages = list(pool.map(_render_job, jobs))
+        elapsed = time.perf_counter() - t0
+    return [elapsed / max(1, len(pages))] * len(pages), [], [len(p) for p in pages]
+
+
+_process_pool = None
+
+
+def _init_bench_worker() -> None:
+    logging.disable(logging.INFO)
+    render_farm._init_worker()
+
+
+def start_process_pool(workers: int) -> None:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_init_bench_worker)
+        # Warm the workers so spawn/import cost is not billed to the first size
+        for fut in [_process_pool.submit(render_farm._warm) for _ in range(workers)]:
+            fut.result()
+
+
+def bench_process(rows, quality: int, workers: int):
+    start_process_pool(workers)
+    jobs = _page_jobs(rows, quality)
+    t0 = time.perf_counter()
+    pages = list(_process_pool.map(_render_job, jobs))
+    elapsed = time.perf_counter() - t0
+    return [elapsed / max(1, len(pages))] * len(pages), [], [len(p) for p in pages]
+
+
+MODES = {"memory": bench_memory, "disk": bench_disk, "thread": bench_thread, "process": bench_process}
+
+
+def bench_user_report(count: int):
+    gen = ReportImageGenerator()
+    times, sizes = [], []
+    with tempfile.TemporaryDirectory() as out_dir:
+        for i in range(count):
+            path = os.path.join(out_dir, f"user_{i}.png")
+            t0 = time.perf_counter()
+            gen.generate_user_report_image(synthetic_user_report(i), save_path=path)
+            times.append(time.perf_counter() - t0)
+            sizes.append(os.path.getsize(path))
+    return times, sizes
+
+
+class LegacyEncoder:
+    """Encoding used before PageEncoder: JPEG quality 100 with optimize (Pillow's default subsampling)."""
+
+    def encode(self, image, quality=None):
+        buf = io.BytesIO()
+        image.convert("RGB").save(buf, "JPEG", optimize=True, quality=100)
+        return buf.getvalue(), "jpg"
+
+
+ENCODERS = {
+    "legacy-jpeg-q100": LegacyEncoder(),
+    "jpeg-q90-444": PageEncoder("jpeg", quality=90, subsampling=0),
+    "jpeg-q90-444-opt": PageEncoder("jpeg", quality=90, subsampling=0, optimize=True),
+    "jpeg-q85-420": PageEncoder("jpeg", quality=85, subsampling=2),
+    "jpeg-target-400kb": PageEncoder("jpeg", quality=90, subsampling=0, target_kb=400),
+    "png-palette-128": PageEncoder("png", png_colors=128),
+    "png-palette-64": PageEncoder("png", png_colors=64),
+    "webp-q85": PageEncoder("webp", quality=85),
+    "auto-300kb": PageEncoder("auto", target_kb=300),
+    "jpeg-q85-scale-0.66": PageEncoder("jpeg", quality=85, subsampling=0, scale=0.66),
+}
+
+
+def bench_encoders(names, lines: int, repeat: int) -> None:
+    """Encode one rendered page with every choice; savings are relative to the legacy encoder."""
+    gen = TableReportGenerator()
+    all_lines, chunks = gen.paginate(synthetic_rows(lines))
+    image = gen._render_single_page(chunks[0], 1, len(chunks), len(all_lines), synthetic_network(), synthetic_chat_user())
+    results = []
+    for name in names:
+        encoder = ENCODERS[name]
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            data, ext = encoder.encode(image)
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+        results.append((name, ext, best, len(data)))
+    baseline = len(LegacyEncoder().encode(image)[0])
+    print(f"\n{'encoder':>22} {'fmt':>5} {'encode ms':>10} {'KiB':>8} {'saved':>7}")
+    for name, ext, elapsed, size in results:
+        print(f"{name:>22} {ext:>5} {elapsed * 1000:>10.1f} {size / 1024:>8.1f} {(1 - size / baseline) * 100:>6.1f}%")
+
+
+def _ms(values) -> str:
+    if not values:
+        return "-"
+    return f"{statistics.mean(values) * 1000:8.1f}"
+
+
+def run(args) -> None:
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    qualities = [int(q) for q in args.quality.split(",") if q.strip()]
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        raise SystemExit(f"unknown mode(s): {', '.join(unknown)}; choose from {', '.join(MODES)}")
+
+    if "process" in modes:
+        start_process_pool(args.workers)
+
+    print(f"{'lines':>6} {'mode':>8} {'q':>4} {'pages':>6} {'page ms':>9} {'encode ms':>10} "
+          f"{'KiB/page':>9} {'total s':>8} {'py peak MiB':>12} {'rss MiB':>8}")
+    for n in sizes:
+        rows = synthetic_rows(n)
+        for mode in modes:
+            for quality in qualities:
+                best = None
+                for attempt in range(args.repeat):
+                    if args.cold or (attempt == 0 and args.cold_first):
+                        reset_caches()
+                    tracemalloc.start()
+                    t0 = time.perf_counter()
+                    page_s, encode_s, out_sizes = MODES[mode](rows, quality, args.workers)
+                    total = time.perf_counter() - t0
+                    _cur, py_peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    if best is None or total < best[0]:
+                        best = (total, page_s, encode_s, out_sizes, py_peak)
+                total, page_s, encode_s, out_sizes, py_peak = best
+                rss = peak_rss_mb() + (peak_rss_mb(resource.RUSAGE_CHILDREN) if mode == "process" else 0.0)
+                kib = statistics.mean(out_sizes) / 1024 if out_sizes else 0.0
+                print(f"{n:>6} {mode:>8} {quality:>4} {len(out_sizes):>6} {_ms(page_s):>9} {_ms(encode_s):>10} "
+                      f"{kib:>9.1f} {total:>8.2f} {py_peak / (1024 * 1024):>12.1f} {rss:>8.1f}")
+
+    if args.encoders != "none":
+        names = list(ENCODERS) if args.encoders == "all" else [e.strip() for e in args.encoders.split(",") if e.strip()]
+        unknown = [e for e in names if e not in ENCODERS]
+        if unknown:
+            raise SystemExit(f"unknown encoder(s): {', '.join(unknown)}; choose from {', '.join(ENCODERS)}")
+        bench_encoders(names, args.encode_lines, args.repeat)
+
+    if args.user_reports:
+        times, out_sizes = bench_user_report(args.user_reports)
+        print(f"\nReportImageGenerator.generate_user_report_image x{len(times)}: "
+              f"{_ms(times).strip()} ms/image, {statistics.mean(out_sizes) / 1024:.1f} KiB/image (PNG)")
+
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,30,300,3000", help="comma-separated line counts per synthetic network")
+    parser.add_argument("--modes", default="memory", help=f"comma-separated render modes: {','.join(MODES)}")
+    parser.add_argument("--quality", default=str(PageEncoder.from_env().quality), help="comma-separated JPEG quality settings to compare")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="pool size for thread/process modes")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per combination; the fastest is reported")
+    parser.add_argument("--cold", action="store_true", help="clear text-metric and page-template caches before every run")
+    parser.add_argument("--cold-first", action="store_true", help="clear caches before the first run of each combination only")
+    parser.add_argument("--encoders", default="all", help=f"encoder choices to compare on one page ('all', 'none' or names: {','.join(ENCODERS)})")
+    parser.add_argument("--encode-lines", type=int, default=30, help="rows on the page used for the encoder comparison")
+    parser.add_argument("--user-reports", type=int, default=20, help="user report images to time (0 to skip)")
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()